@@ -0,0 +1,36 @@
+import os
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from app.api.deps import get_current_user
+from app.models import User
+
+router = APIRouter(prefix='/backtests', tags=['backtests'])
+
+BACKTEST_SERVICE_URL = os.getenv('BACKTEST_SERVICE_URL', 'http://backtest_service:8040')
+
+
+async def _forward(path: str, request: Request, params: Optional[dict] = None) -> Response:
+    # the caller's bearer token goes along unchanged; the service verifies it and only returns results owned by its subject
+    try:
+        async with httpx.AsyncClient(base_url=BACKTEST_SERVICE_URL, timeout=15) as c:
+            r = await c.get(path, params={k: v for k, v in (params or {}).items() if v is not None}, headers={'Authorization': request.headers['authorization']})
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail='Backtest service unavailable')
+    return Response(r.content, status_code=r.status_code, media_type=r.headers.get('content-type', 'application/json'))
+
+
+@router.get('/results/{result_id}')
+async def get_result(result_id: str, request: Request, user: User = Depends(get_current_user)):
+    # metrics plus the stored display-resolution equity curve
+    return await _forward(f'/results/{result_id}', request)
+
+
+@router.get('/results/{result_id}/equity')
+async def get_equity(result_id: str, request: Request, start: Optional[datetime] = None, end: Optional[datetime] = None, points: int = Query(2000, ge=3, le=100_000), user: User = Depends(get_current_user)):
+    # full-resolution slice of the curve for a zoomed window
+    return await _forward(f'/results/{result_id}/equity', request, {'start': start.isoformat() if start else None, 'end': end.isoformat() if end else None, 'points': points})
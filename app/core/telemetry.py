@@ -15,6 +15,9 @@ order_status_changes_total = Counter("order_status_changes_total", "Order status
 mt5_connection_status = Gauge("mt5_connection_status", "MT5 connection status")
 risk_incidents_total = Counter("risk_incidents_total", "Risk incidents", ["rule"])
 backtest_jobs_running = Gauge("backtest_jobs_running", "Backtest jobs running")
+tick_ingest_flush_seconds = Histogram("tick_ingest_flush_seconds", "Tick ingestion COPY flush duration", buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+tick_ingest_queue_depth = Gauge("tick_ingest_queue_depth", "Ticks buffered or in flight, not yet committed")
+tick_ingest_rows_total = Counter("tick_ingest_rows_total", "Ticks handled by the ingestor", ["outcome"])
 
 
 def configure_telemetry(app=None, otlp_endpoint: str | None = None, service_name: str = "mtrader"):
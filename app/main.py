@@ -9,7 +9,7 @@ from fastapi.responses import JSONResponse, RedirectResponse, Response
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from redis.asyncio import Redis
 
-from app.api.routes import auth, health, vault
+from app.api.routes import auth, backtests, health, vault
 from app.core.config import settings
 from app.db import Base, engine
 from api_gateway.src.routes.ws import router as distributed_ws_router
@@ -44,6 +44,7 @@ app = FastAPI(title="MTrader API Gateway", lifespan=lifespan)
 app.include_router(health.router)
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(vault.router, prefix="/api/v1")
+app.include_router(backtests.router, prefix="/api/v1")
 app.include_router(distributed_ws_router)
 
 
@@ -1,14 +1,80 @@
 from __future__ import annotations
 
+import base64
+import json
+import os
 from datetime import datetime
+from typing import Dict, List, Optional
 
 import pandas as pd
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from pydantic import BaseModel
 
-from backtest_service.src.engine.backtester import BacktestEngine
+from backtest_service.src.engine.backtester import BacktestEngine, BacktestResult
+from backtest_service.src.engine.cache import BacktestCache
+from backtest_service.src.jobs import Job, JobLimitExceeded, JobManager
+from backtest_service.src.results import ResultRepository
+from market_data_service.src.storage import MarketDataStore
+
+try:
+    from app.core.telemetry import backtest_jobs_running
+except Exception:  # pragma: no cover
+    backtest_jobs_running = None
 
 app = FastAPI(title="backtest_service")
-engine = BacktestEngine()
+engine = BacktestEngine(cache=BacktestCache(max_entries=int(os.getenv("BACKTEST_CACHE_ENTRIES", "256")), directory=os.getenv("BACKTEST_CACHE_DIR") or None, max_disk_bytes=int(os.getenv("BACKTEST_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))))
+
+# bars exported by the market data service (POST /store/{symbol}/{timeframe} into the same MARKET_DATA_DIR); every
+# worker maps the same files, so runs share one copy in memory
+store = MarketDataStore(os.environ["MARKET_DATA_DIR"]) if os.getenv("MARKET_DATA_DIR") else None
+results = ResultRepository(os.environ["BACKTEST_DATABASE_URL"]) if os.getenv("BACKTEST_DATABASE_URL") else None
+jobs = JobManager(max_running=int(os.getenv("BACKTEST_MAX_RUNNING_JOBS", "2")), max_per_user=int(os.getenv("BACKTEST_MAX_JOBS_PER_USER", "2")), gauge=backtest_jobs_running, workers_per_job=int(os.getenv("BACKTEST_WORKERS_PER_JOB", "0")) or None)
+
+# the gateway's RS256 access tokens (app.core.security), forwarded as-is; JWT_PUBLIC_KEY is the same base64 PEM
+bearer = HTTPBearer(auto_error=True)
+JWT_PUBLIC_KEY = base64.b64decode(os.getenv("JWT_PUBLIC_KEY", ""))
+JWT_ISSUER = os.getenv("JWT_ISSUER")
+JWT_AUDIENCE = os.getenv("JWT_AUDIENCE")
+
+
+def current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> str:
+    # jobs and stored results are keyed by the token subject, never by anything the caller can set directly
+    try:
+        payload = jwt.decode(creds.credentials, JWT_PUBLIC_KEY, algorithms=["RS256"], issuer=JWT_ISSUER, audience=JWT_AUDIENCE, options={"require_jti": True, "require_exp": True, "require_iat": True})
+    except JWTError:
+        raise HTTPException(401, "invalid token")
+    if payload.get("typ") != "access" or not payload.get("sub"):
+        raise HTTPException(401, "invalid token")
+    return str(payload["sub"])
+
+
+@app.on_event("startup")
+async def startup():
+    if results is not None:
+        await results.connect()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if results is not None:
+        await results.close()
+
+
+SAMPLE_TRADES = [{"pnl": 1.0}, {"pnl": -0.5}, {"pnl": 0.8}]
+
+
+class JobIn(BaseModel):
+    type: str = "walk_forward"
+    symbol: Optional[str] = None
+    timeframe: str = "D1"
+    optimization_iterations: int = 2
+    param_space: Dict[str, List] = {"window": [5, 10]}
+    optimizer: str = "random"
+    trades: List[Dict] = SAMPLE_TRADES
+    iterations: int = 200
 
 
 def _strategy(df: pd.DataFrame, **_):
@@ -17,20 +83,133 @@ def _strategy(df: pd.DataFrame, **_):
     return out
 
 
-@app.post("/walk-forward")
-async def run_walk_forward():
+def _market_data(symbol: Optional[str], timeframe: str):
+    if store is not None and symbol and store.exists(symbol, timeframe):
+        return store.slice(symbol, timeframe)
     idx = pd.date_range(end=datetime.utcnow(), periods=360, freq="D")
-    data = pd.DataFrame({"open": 1.0, "high": 1.1, "low": 0.9, "close": 1.0}, index=idx)
-    results = await engine.run_walk_forward(_strategy, data, optimization_iterations=2, param_space={"window": [5, 10]})
+    return pd.DataFrame({"open": 1.0, "high": 1.1, "low": 0.9, "close": 1.0}, index=idx)
+
+
+def _segment(index: int, result: BacktestResult) -> Dict:
+    return {
+        "segment": index,
+        "start": result.start_date.isoformat(),
+        "end": result.end_date.isoformat(),
+        "parameters": {k: v.item() if hasattr(v, "item") else v for k, v in result.parameters.items()},
+        "total_return": result.total_return,
+        "sharpe_ratio": result.sharpe_ratio,
+        "max_drawdown": result.max_drawdown,
+        "total_trades": result.total_trades,
+        "final_capital": result.final_capital,
+    }
+
+
+async def _walk_forward_job(job: Job) -> Dict:
+    p = job.params
+    segments = await engine.run_walk_forward(_strategy, _market_data(p["symbol"], p["timeframe"]), optimization_iterations=p["optimization_iterations"], param_space=p["param_space"], optimizer=p["optimizer"], max_workers=jobs.workers_per_job, on_segment=lambda i, n, r: job.publish(_segment(i, r), total=n))
+    if results is None:
+        return {"segments": len(segments)}
+    return {"segments": len(segments), "result_ids": [await results.save(r, job.user) for r in segments]}
+
+
+async def _monte_carlo_job(job: Job) -> Dict:
+    result = await engine.monte_carlo(job.params["trades"], iterations=job.params["iterations"])
+    job.publish(result, total=1)
+    return {"mean": result["mean"], "std": result["std"]}
+
+
+JOB_TYPES = {"walk_forward": _walk_forward_job, "monte_carlo": _monte_carlo_job}
+
+
+@app.post("/walk-forward")
+async def run_walk_forward(symbol: Optional[str] = None, timeframe: str = "D1"):
+    results = await engine.run_walk_forward(_strategy, _market_data(symbol, timeframe), optimization_iterations=2, param_space={"window": [5, 10]})
     return {"segments": len(results)}
 
 
 @app.post("/monte-carlo")
 async def monte_carlo():
-    result = await engine.monte_carlo([{"pnl": 1.0}, {"pnl": -0.5}, {"pnl": 0.8}], iterations=200)
+    result = await engine.monte_carlo(SAMPLE_TRADES, iterations=200)
     return {"mean": result["mean"], "std": result["std"]}
 
 
+@app.post("/jobs", status_code=202)
+async def submit_job(payload: JobIn, user: str = Depends(current_user)):
+    if payload.type not in JOB_TYPES:
+        raise HTTPException(400, f"unsupported job type; expected one of {sorted(JOB_TYPES)}")
+    try:
+        job = jobs.submit(user, payload.type, JOB_TYPES[payload.type], payload.model_dump())
+    except JobLimitExceeded as exc:
+        raise HTTPException(429, str(exc))
+    return job.to_dict()
+
+
+@app.get("/jobs")
+async def list_jobs(user: str = Depends(current_user)):
+    return [j.to_dict() for j in jobs.list(user)]
+
+
+def _job(job_id: str, user: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None or job.user != user:
+        raise HTTPException(404, "job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, user: str = Depends(current_user)):
+    job = _job(job_id, user)
+    return job.to_dict() | {"result": job.summary}
+
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str, user: str = Depends(current_user)):
+    # newline-delimited JSON, one line per finished segment as it completes, then a final status line
+    job = _job(job_id, user)
+
+    async def lines():
+        async for item in jobs.stream(job.id):
+            yield json.dumps(item, default=str) + "\n"
+        yield json.dumps({"status": job.status.value, "error": job.error, "result": job.summary}, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, user: str = Depends(current_user)):
+    job = _job(job_id, user)
+    return {"cancelled": jobs.cancel(job.id), "status": job.status.value}
+
+
+def _results() -> ResultRepository:
+    if results is None:
+        raise HTTPException(503, "result storage not configured")
+    return results
+
+
+@app.get("/results/{result_id}")
+async def result_summary(result_id: str, user: str = Depends(current_user)):
+    # metrics plus the display-resolution equity curve
+    row = await _results().display(result_id, user)
+    if row is None:
+        raise HTTPException(404, "result not found")
+    return row
+
+
+@app.get("/results/{result_id}/equity")
+async def result_equity(result_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None, points: int = Query(2000, ge=3, le=100_000), user: str = Depends(current_user)):
+    # the full-resolution curve for a zoomed window, downsampled only while the window exceeds `points`
+    row = await _results().equity(result_id, user, start, end, points)
+    if row is None:
+        raise HTTPException(404, "result not found")
+    return row
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return engine.cache.stats()
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
@@ -1,13 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import os
 import time
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Type
+from uuid import uuid4
 
 import numpy as np
 import pandas as pd
 
+from backtest_service.src.engine.batch import evaluate_grid
+from backtest_service.src.engine.cache import BacktestCache
+from backtest_service.src.engine.fills import FillModel, encode_orders, has_orders, simulate_orders
+from backtest_service.src.engine.metrics import OnlineMetrics, drawdown_curve
+from backtest_service.src.engine.optimizers import Optimizer, Trial, TrialPruned, make_optimizer
+from backtest_service.src.engine.montecarlo import bootstrap, histogram_summary, quantile_summary
+from backtest_service.src.engine.portfolio import PortfolioCosts, align_panel, simulate_portfolio
+from backtest_service.src.engine.scenarios import RESULT_COLUMNS, Scenario, apply, parse, result_row
+from backtest_service.src.engine.strategy import Bar, StrategyRunner
+from backtest_service.src.engine.ticks import TickSimulator, aiter_chunks
+from backtest_service.src.engine.vectorized import encode_signals, simulate_signals
+from backtest_service.src.engine.windows import WindowPlanner
+
 
 @dataclass(slots=True)
 class CommissionModel:
@@ -18,6 +35,9 @@ class CommissionModel:
     def calculate(self, volume, price) -> float:
         return max(self.min_commission, abs(float(volume)) * self.commission_per_lot)
 
+    def calculate_array(self, volume, price) -> np.ndarray:
+        return np.maximum(self.min_commission, np.abs(np.asarray(volume, dtype=float)) * self.commission_per_lot)
+
 
 @dataclass(slots=True)
 class SlippageModel:
@@ -28,6 +48,10 @@ class SlippageModel:
         mult = 1.0 + (abs(float(volatility)) if (self.volatility_multiplier and volatility is not None) else 0)
         return float(price) * self.base_slippage * mult * np.log1p(abs(float(volume)))
 
+    def calculate_array(self, price, volume, volatility=None) -> np.ndarray:
+        mult = 1.0 + (np.abs(np.asarray(volatility, dtype=float)) if (self.volatility_multiplier and volatility is not None) else 0)
+        return np.asarray(price, dtype=float) * self.base_slippage * mult * np.log1p(np.abs(np.asarray(volume, dtype=float)))
+
 
 @dataclass(slots=True)
 class MarginModel:
@@ -37,6 +61,10 @@ class MarginModel:
         rate = self.margin_rates.get(asset_class, self.margin_rates["forex"])
         return abs(float(volume) * float(price)) * rate
 
+    def calculate_required_array(self, symbol, volume, price, asset_class="forex") -> np.ndarray:
+        rate = self.margin_rates.get(asset_class, self.margin_rates["forex"])
+        return np.abs(np.asarray(volume, dtype=float) * np.asarray(price, dtype=float)) * rate
+
 
 @dataclass
 class BacktestResult:
@@ -75,24 +103,162 @@ class BacktestResult:
     optimization_iterations: int
 
 
+TRADE_DTYPE = np.dtype([("symbol", "i4"), ("entry_time", "datetime64[ns]"), ("exit_time", "datetime64[ns]"), ("side", "i1"), ("entry", "f8"), ("exit", "f8"), ("qty", "f8"), ("pnl", "f8"), ("commission", "f8")])
+
+
+def trades_to_array(trades: List[Dict], symbols: List[str]) -> np.ndarray:
+    out = np.zeros(len(trades), dtype=TRADE_DTYPE)
+    if not trades:
+        return out
+    lookup = {s: i for i, s in enumerate(symbols)}
+    out["symbol"] = [lookup.get(t.get("symbol", symbols[0]), 0) for t in trades]
+    out["entry_time"] = pd.DatetimeIndex([t["entry_time"] for t in trades]).tz_localize(None).values
+    out["exit_time"] = pd.DatetimeIndex([t["exit_time"] for t in trades]).tz_localize(None).values
+    out["side"] = [1 if t["side"] == "buy" else -1 for t in trades]
+    for name in ("entry", "exit", "qty", "pnl", "commission"):
+        out[name] = [t[name] for t in trades]
+    return out
+
+
+def trade_records(trades: np.ndarray, symbols: List[str]) -> List[Dict]:
+    entry_times = pd.DatetimeIndex(trades["entry_time"])
+    exit_times = pd.DatetimeIndex(trades["exit_time"])
+    records = []
+    for i, row in enumerate(trades.tolist()):
+        record = {"entry_time": entry_times[i], "exit_time": exit_times[i], "side": "buy" if row[3] > 0 else "sell", "entry": row[4], "exit": row[5], "qty": row[6], "pnl": row[7], "commission": row[8]}
+        if len(symbols) > 1:
+            record["symbol"] = symbols[row[0]]
+        records.append(record)
+    return records
+
+
+@dataclass(slots=True)
+class CompactBacktestResult:
+    strategy_id: str
+    strategy_name: str
+    symbols: List[str]
+    timeframe: str
+    start_date: datetime
+    end_date: datetime
+    initial_capital: float
+    final_capital: float
+    total_return: float
+    annualized_return: float
+    sharpe_ratio: float
+    sortino_ratio: float
+    calmar_ratio: float
+    max_drawdown: float
+    max_drawdown_percent: float
+    max_drawdown_duration: int
+    win_rate: float
+    profit_factor: float
+    expectancy: float
+    total_trades: int
+    winning_trades: int
+    losing_trades: int
+    avg_win: float
+    avg_loss: float
+    largest_win: float
+    largest_loss: float
+    parameters: Dict
+    trades: np.ndarray
+    execution_time_ms: int
+    optimization_iterations: int
+    equity_curve: Optional[np.ndarray] = None
+    drawdown_curve: Optional[np.ndarray] = None
+    index: Optional[pd.DatetimeIndex] = None
+
+    def trade_records(self) -> List[Dict]:
+        return trade_records(self.trades, self.symbols)
+
+    def to_result(self) -> BacktestResult:
+        if self.equity_curve is None or self.index is None:
+            raise ValueError("curves were dropped for this result; rerun with keep_curves=True")
+        eq = pd.Series(self.equity_curve, index=self.index)
+        ret = eq.pct_change().fillna(0)
+        metrics = {f: getattr(self, f) for f in self.__slots__ if f not in ("trades", "equity_curve", "drawdown_curve", "index")}
+        return BacktestResult(
+            **metrics,
+            equity_curve=eq,
+            drawdown_curve=pd.Series(self.drawdown_curve, index=self.index),
+            monthly_returns=ret.resample("M").apply(lambda x: (1 + x).prod() - 1),
+            trades=self.trade_records(),
+        )
+
+
 class BacktestEngine:
-    def __init__(self, commission_model=None, slippage_model=None, margin_model=None):
+    def __init__(self, commission_model=None, slippage_model=None, margin_model=None, cache: Optional[BacktestCache] = None, fill_model: Optional[FillModel] = None):
         self.commission_model = commission_model or CommissionModel()
         self.slippage_model = slippage_model or SlippageModel()
         self.margin_model = margin_model or MarginModel()
+        self.fill_model = fill_model or FillModel()
+        self.cache = cache
 
-    async def run(self, strategy: Callable, data: pd.DataFrame, initial_capital=10000, commission=True, slippage=True, margin=True, **strategy_params) -> BacktestResult:
+    async def run(self, strategy: Callable, data: pd.DataFrame, initial_capital=10000, commission=True, slippage=True, margin=True, vectorized=False, compact=False, keep_curves=True, **strategy_params) -> BacktestResult | CompactBacktestResult:
+        return self._run(strategy, _frame(data), initial_capital, commission, slippage, margin, vectorized, compact, keep_curves, **strategy_params)
+
+    def _run(self, strategy: Callable, data: pd.DataFrame, initial_capital=10000, commission=True, slippage=True, margin=True, vectorized=False, compact=False, keep_curves=True, stop_drawdown=None, **strategy_params) -> BacktestResult | CompactBacktestResult:
+        args = (strategy, data, initial_capital, commission, slippage, margin, vectorized, compact, keep_curves, stop_drawdown)
+        if self.cache is None:
+            return self._execute(*args, **strategy_params)
+        options = {"initial_capital": initial_capital, "commission": commission, "slippage": slippage, "margin": margin, "vectorized": vectorized, "compact": compact, "keep_curves": keep_curves, "stop_drawdown": stop_drawdown}
+        key = self.cache.key(self, strategy, data, options, strategy_params)
+        if key is None:
+            return self._execute(*args, **strategy_params)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._execute(*args, **strategy_params)
+            self.cache.put(key, result)
+        return result
+
+    def _execute(self, strategy: Callable, data: pd.DataFrame, initial_capital=10000, commission=True, slippage=True, margin=True, vectorized=False, compact=False, keep_curves=True, stop_drawdown=None, **strategy_params) -> BacktestResult | CompactBacktestResult:
+        # stop_drawdown aborts the run with TrialPruned once equity falls that fraction below its running peak
         start_ms = time.time()
-        df = data.copy().sort_index()
+        # The strategy gets a private frame over read-only views of the caller's columns: adding or replacing
+        # columns stays off the caller's frame (which the cache digests by identity, and which may be a memory-mapped
+        # store slice), nothing is copied, and an in-place write raises instead of leaking back. A global pandas
+        # Copy-on-Write switch would also do it, but that option is process-wide and runs share threads.
+        df = _read_only(data) if data.index.is_monotonic_increasing else data.sort_index()
+        layout = {"compact": compact, "keep_curves": keep_curves}
+        if vectorized or getattr(strategy, "vectorized", False):
+            return self._run_vectorized(strategy, df, initial_capital, commission, slippage, margin, start_ms, strategy_params, layout, stop_drawdown)
+        if hasattr(strategy, "on_bar"):
+            return self._run_events(strategy, df, initial_capital, commission, slippage, margin, start_ms, strategy_params, layout, stop_drawdown)
+        equity_curve, trades = self._simulate_loop(df, lambda i, _: strategy(df.iloc[: i + 1], **strategy_params), initial_capital, commission, slippage, margin, strategy_params, stop_drawdown)
+        return self._build_result(strategy, df, equity_curve, trades, initial_capital, start_ms, strategy_params, **layout)
+
+    def _run_events(self, strategy, df, initial_capital, commission, slippage, margin, start_ms, strategy_params, layout, stop_drawdown=None) -> BacktestResult | CompactBacktestResult:
+        runner = StrategyRunner(strategy, strategy_params, strategy_params.get("window_size"))
+        state = runner.start(initial_capital)
+        close = df["close"].to_numpy(dtype=float)
+        columns = {f: (df[f].to_numpy(dtype=float) if f in df.columns else close) for f in ("open", "high", "low")}
+        volume = df["volume"].to_numpy(dtype=float) if "volume" in df.columns else np.ones(len(df))
+        volatility = df["volatility"].to_numpy(dtype=float) if "volatility" in df.columns else None
+        index = df.index
+        opens, highs, lows = columns["open"], columns["high"], columns["low"]
+
+        def next_signal(i, book):
+            state.position, state.equity = book
+            bar = Bar(index[i], opens[i], highs[i], lows[i], close[i], volume[i], None if volatility is None else volatility[i])
+            return runner.on_bar(bar)
+
+        equity_curve, trades = self._simulate_loop(df, next_signal, initial_capital, commission, slippage, margin, strategy_params, stop_drawdown)
+        return self._build_result(strategy, df, equity_curve, trades, initial_capital, start_ms, strategy_params, **layout)
+
+    def _simulate_loop(self, df, next_signal, initial_capital, commission, slippage, margin, strategy_params, stop_drawdown=None):
         equity = initial_capital
+        peak = float(initial_capital)
         equity_curve = []
         trades = []
         position = None
+        index = df.index
+        close = df["close"].to_numpy(dtype=float)
+        volatility = df["volatility"].to_numpy(dtype=float) if "volatility" in df.columns else None
 
-        for i, (ts, row) in enumerate(df.iterrows()):
-            signal = strategy(df.iloc[: i + 1], **strategy_params)
-            price = float(row["close"])
-            vol = float(row.get("volume", 1.0))
+        for i in range(len(df)):
+            signal = next_signal(i, (position, equity))
+            price = float(close[i])
+            vol_i = None if volatility is None else float(volatility[i])
 
             if position is None and signal in ("buy", "sell"):
                 qty = float(strategy_params.get("size", 1.0))
@@ -102,118 +268,304 @@ class BacktestEngine:
                     continue
                 entry_price = price
                 if slippage:
-                    entry_price += self.slippage_model.calculate(price, qty, row.get("volatility", None)) * (1 if signal == "buy" else -1)
-                position = {"side": signal, "qty": qty, "entry": entry_price, "time": ts}
+                    entry_price += self.slippage_model.calculate(price, qty, vol_i) * (1 if signal == "buy" else -1)
+                position = {"side": signal, "qty": qty, "entry": entry_price, "time": index[i]}
             elif position is not None and signal == "close":
                 exit_price = price
                 if slippage:
-                    exit_price -= self.slippage_model.calculate(price, position["qty"], row.get("volatility", None)) * (1 if position["side"] == "buy" else -1)
+                    exit_price -= self.slippage_model.calculate(price, position["qty"], vol_i) * (1 if position["side"] == "buy" else -1)
                 pnl = (exit_price - position["entry"]) * position["qty"] * (1 if position["side"] == "buy" else -1)
                 fee = self.commission_model.calculate(position["qty"], exit_price) if commission else 0.0
                 pnl -= fee
                 equity += pnl
-                trades.append({"entry_time": position["time"], "exit_time": ts, "side": position["side"], "entry": position["entry"], "exit": exit_price, "qty": position["qty"], "pnl": pnl, "commission": fee})
+                trades.append({"entry_time": position["time"], "exit_time": index[i], "side": position["side"], "entry": position["entry"], "exit": exit_price, "qty": position["qty"], "pnl": pnl, "commission": fee})
                 position = None
+            if stop_drawdown is not None:
+                # marked to market every bar, so a losing position that is never closed is pruned too
+                marked = equity if position is None else equity + (price - position["entry"]) * position["qty"] * (1 if position["side"] == "buy" else -1)
+                if marked < peak * (1 - stop_drawdown):
+                    raise TrialPruned(f"drawdown beyond {stop_drawdown:.2%} at {index[i]}")
+                peak = max(peak, marked)
             equity_curve.append(equity)
+        return equity_curve, trades
 
-        eq = pd.Series(equity_curve, index=df.index)
-        ret = eq.pct_change().fillna(0)
-        dd_curve = (eq / eq.cummax()) - 1
-        max_dd = float(dd_curve.min()) if not dd_curve.empty else 0.0
-        ann = (1 + ret.mean()) ** 252 - 1 if len(ret) else 0
-        sharpe = (ret.mean() / (ret.std() + 1e-9)) * np.sqrt(252)
-        downside = ret[ret < 0]
-        sortino = (ret.mean() / (downside.std() + 1e-9)) * np.sqrt(252)
-        calmar = ann / (abs(max_dd) + 1e-9)
-        wins = [t["pnl"] for t in trades if t["pnl"] > 0]
-        losses = [t["pnl"] for t in trades if t["pnl"] <= 0]
-        profit_factor = (sum(wins) / abs(sum(losses))) if losses else float("inf")
-        expectancy = np.mean([t["pnl"] for t in trades]) if trades else 0.0
-        monthly = ret.resample("M").apply(lambda x: (1 + x).prod() - 1)
+    def _run_vectorized(self, strategy, df, initial_capital, commission, slippage, margin, start_ms, strategy_params, layout, stop_drawdown=None) -> BacktestResult | CompactBacktestResult:
+        raw = strategy(df, **strategy_params)
+        qty = float(strategy_params.get("size", 1.0))
+        close = df["close"].to_numpy(dtype=float)
+        volatility = df["volatility"].to_numpy(dtype=float) if "volatility" in df.columns else None
+        if has_orders(raw):
+            # order types or stop-loss / take-profit levels: fills come from each bar's open/high/low range
+            bars = [df[f].to_numpy(dtype=float) if f in df.columns else close for f in ("open", "high", "low")]
+            equity_curve, fills = simulate_orders(self, encode_orders(raw, len(df)), *bars, close, volatility, qty, initial_capital, commission, slippage, margin)
+        else:
+            equity_curve, fills = simulate_signals(self, encode_signals(raw, len(df)), close, volatility, qty, initial_capital, commission, slippage, margin)
+        if stop_drawdown is not None:
+            _check_drawdown(_marked_to_market(equity_curve, close, fills, qty), stop_drawdown, df.index)
+        fills["qty"] = np.full(len(fills["pnl"]), qty)
+        trades = self._trade_log(df.index, fills, None, layout["compact"])
+        return self._build_result(strategy, df, equity_curve, trades, initial_capital, start_ms, strategy_params, **layout)
 
-        return BacktestResult(
+    @staticmethod
+    def _trade_log(index, fills, symbols, compact):
+        if compact:
+            out = np.zeros(len(fills["pnl"]), dtype=TRADE_DTYPE)
+            out["symbol"] = fills.get("cols", 0)
+            times = pd.DatetimeIndex(index).tz_localize(None).values
+            out["entry_time"] = times[fills["entry_rows"]]
+            out["exit_time"] = times[fills["exit_rows"]]
+            out["side"] = np.sign(fills["direction"])
+            for name in ("entry", "exit", "qty", "pnl", "commission"):
+                out[name] = fills[name]
+            return out
+        columns = [index[fills["entry_rows"]], index[fills["exit_rows"]], fills["direction"].tolist(), fills["entry"].tolist(), fills["exit"].tolist(), fills["qty"].tolist(), fills["pnl"].tolist(), fills["commission"].tolist()]
+        trades = [{"entry_time": et, "exit_time": xt, "side": "buy" if d > 0 else "sell", "entry": ep, "exit": xp, "qty": q, "pnl": pnl, "commission": fee} for et, xt, d, ep, xp, q, pnl, fee in zip(*columns)]
+        if symbols is not None:
+            for trade, col in zip(trades, fills["cols"].tolist()):
+                trade["symbol"] = symbols[col]
+        return trades
+
+    async def run_batch(self, strategy: Callable, data: pd.DataFrame, param_grid: Dict[str, List] | List[Dict], initial_capital=10000, commission=True, slippage=True, margin=True, memory_budget_mb=256, **strategy_params) -> pd.DataFrame:
+        # strategy(df, **params) gets each grid parameter as an array over the chunk's parameter sets and
+        # returns a (bars x parameter sets) signal matrix; one metrics row comes back per parameter set
+        data = _frame(data)
+        df = data if data.index.is_monotonic_increasing else data.sort_index()
+        return evaluate_grid(self, strategy, df, param_grid, initial_capital, commission, slippage, margin, memory_budget_mb, strategy_params)
+
+    async def run_ticks(self, strategy: Callable, ticks, chunk_size=1_000_000, initial_capital=10000, commission=True, slippage=True, margin=True, equity_freq="1min", compact=False, **strategy_params) -> BacktestResult | CompactBacktestResult:
+        # ticks: a frame, an iterable of frames or Tick objects, or an async iterable of frames (e.g. a database
+        # cursor); strategy(ticks, **params) sees each chunk plus `lookback` ticks carried over from the previous one
+        start_ms = time.time()
+        lookback = int(strategy_params.get("lookback", getattr(strategy, "lookback", 0)))
+        sim = TickSimulator(self, strategy, float(strategy_params.get("size", 1.0)), initial_capital, commission, slippage, margin, lookback, equity_freq, strategy_params)
+        async for chunk in aiter_chunks(ticks, int(chunk_size)):
+            sim.feed(chunk)
+        curve = sim.equity_curve()
+        return self._build_result(strategy, pd.DataFrame(index=curve.index), curve.to_numpy(), sim.trades, initial_capital, start_ms, {"timeframe": "TICK", **strategy_params}, compact=compact)
+
+    async def run_portfolio(self, strategy: Callable, data: Dict[str, pd.DataFrame], initial_capital=10000, commission=True, slippage=True, margin=True, commission_models: Optional[Dict[str, CommissionModel]] = None, slippage_models: Optional[Dict[str, SlippageModel]] = None, asset_classes: Optional[Dict[str, str]] = None, sizes: Optional[Dict[str, float]] = None, compact=False, keep_curves=True, **strategy_params) -> BacktestResult | CompactBacktestResult:
+        start_ms = time.time()
+        panel = align_panel({s: _frame(d) for s, d in data.items()})
+        symbols = panel.symbols
+        costs = PortfolioCosts(
+            qty=np.array([float((sizes or {}).get(s, strategy_params.get("size", 1.0))) for s in symbols]),
+            commission_models=[(commission_models or {}).get(s, self.commission_model) for s in symbols],
+            slippage_models=[(slippage_models or {}).get(s, self.slippage_model) for s in symbols],
+            asset_classes=[(asset_classes or {}).get(s, "forex") for s in symbols],
+        )
+        equity_curve, fills = simulate_portfolio(self, panel, strategy(panel, **strategy_params), costs, float(initial_capital), commission, slippage, margin)
+        trades = self._trade_log(panel.index, fills, symbols, compact)
+        return self._build_result(strategy, pd.DataFrame(index=panel.index), equity_curve, trades, initial_capital, start_ms, strategy_params, symbols=symbols, compact=compact, keep_curves=keep_curves)
+
+    def _build_result(self, strategy, df, equity_curve, trades, initial_capital, start_ms, strategy_params, symbols=None, compact=False, keep_curves=True) -> BacktestResult | CompactBacktestResult:
+        symbols = symbols or [strategy_params.get("symbol", "SYMBOL")]
+        if compact and isinstance(trades, list):
+            trades = trades_to_array(trades, symbols)
+        pnl = trades["pnl"] if isinstance(trades, np.ndarray) else np.array([t["pnl"] for t in trades], dtype=float)
+        equity = np.asarray(equity_curve, dtype=float)
+        stats = OnlineMetrics(initial_capital)
+        stats.update_array(equity)
+        stats.add_trades(pnl)
+
+        metrics = dict(
             strategy_id=strategy_params.get("strategy_id", "unknown"),
-            strategy_name=strategy_params.get("strategy_name", getattr(strategy, "__name__", "strategy")),
-            symbols=[strategy_params.get("symbol", "SYMBOL")],
+            strategy_name=strategy_params.get("strategy_name", getattr(strategy, "__name__", type(strategy).__name__)),
+            symbols=symbols,
             timeframe=strategy_params.get("timeframe", "M1"),
             start_date=df.index.min().to_pydatetime() if not df.empty else datetime.utcnow(),
             end_date=df.index.max().to_pydatetime() if not df.empty else datetime.utcnow(),
             initial_capital=float(initial_capital),
-            final_capital=float(eq.iloc[-1] if not eq.empty else initial_capital),
-            total_return=float((eq.iloc[-1] / initial_capital - 1) if not eq.empty else 0),
-            annualized_return=float(ann),
-            sharpe_ratio=float(sharpe),
-            sortino_ratio=float(sortino),
-            calmar_ratio=float(calmar),
-            max_drawdown=float(abs(max_dd)),
-            max_drawdown_percent=float(abs(max_dd) * 100),
-            max_drawdown_duration=int((dd_curve < 0).sum()),
-            win_rate=float((len(wins) / len(trades)) if trades else 0),
-            profit_factor=float(profit_factor),
-            expectancy=float(expectancy),
-            total_trades=len(trades),
-            winning_trades=len(wins),
-            losing_trades=len(losses),
-            avg_win=float(np.mean(wins) if wins else 0),
-            avg_loss=float(np.mean(losses) if losses else 0),
-            largest_win=float(max(wins) if wins else 0),
-            largest_loss=float(min(losses) if losses else 0),
+            **stats.summary(),
             parameters=strategy_params,
-            equity_curve=eq,
-            drawdown_curve=dd_curve,
-            monthly_returns=monthly,
-            trades=trades,
-            execution_time_ms=int((time.time() - start_ms) * 1000),
             optimization_iterations=int(strategy_params.get("optimization_iterations", 0)),
         )
+        if compact:
+            # curves stay as bare arrays sharing the source index; trials can drop them entirely
+            curves = {"equity_curve": equity, "drawdown_curve": drawdown_curve(equity), "index": df.index} if keep_curves else {}
+            return CompactBacktestResult(**metrics, trades=trades, execution_time_ms=int((time.time() - start_ms) * 1000), **curves)
+        eq = pd.Series(equity, index=df.index)
+        dd_curve = pd.Series(drawdown_curve(equity), index=df.index)
+        monthly = eq.pct_change().fillna(0).resample("M").apply(lambda x: (1 + x).prod() - 1)
+        return BacktestResult(**metrics, equity_curve=eq, drawdown_curve=dd_curve, monthly_returns=monthly, trades=trades, execution_time_ms=int((time.time() - start_ms) * 1000))
+
+    async def run_walk_forward(self, strategy, data, in_sample_years=3, out_sample_months=6, optimization_iterations=1000, param_space=None, max_workers=None, executor_cls: Type[Executor] = ProcessPoolExecutor, optimizer: str | Callable[..., Optimizer] = "random", prune_drawdown: Optional[float] = None, on_segment: Optional[Callable[[int, int, BacktestResult], None]] = None, anchored: bool = False, purge=0) -> List[BacktestResult]:
+        # optimization_iterations is the per-window budget in full in-sample backtests; prune_drawdown scores
+        # any trial whose equity falls that fraction below its running peak as -inf without finishing it;
+        # on_segment(index, total, result) is called as each out-of-sample segment finishes, in completion order;
+        # anchored grows every in-sample window from the first bar, purge (bars or a time span) trims its tail;
+        # a store slice (anything with .load()) is mapped by each worker itself instead of being pickled to it
+        frame = _frame(data)
+        df = frame if frame.index.is_monotonic_increasing else frame.sort_index()
+        shipped = data if hasattr(data, "load") and df is frame else df
+        plan = WindowPlanner.walk_forward(df.index, pd.DateOffset(years=in_sample_years), pd.DateOffset(months=out_sample_months), anchored=anchored, purge=purge)
+        windows = [(w, make_optimizer(optimizer, param_space, optimization_iterations, seed=np.random.randint(2**32)) if param_space else None) for w in plan]
+        if not windows:
+            return []
 
-    async def run_walk_forward(self, strategy, data, in_sample_years=3, out_sample_months=6, optimization_iterations=1000, param_space=None) -> List[BacktestResult]:
-        df = data.sort_index()
-        results = []
-        start = df.index.min()
-        end = df.index.max()
-        cursor = start
-        while cursor < end:
-            in_end = cursor + pd.DateOffset(years=in_sample_years)
-            out_end = in_end + pd.DateOffset(months=out_sample_months)
-            in_sample = df[(df.index >= cursor) & (df.index < in_end)]
-            out_sample = df[(df.index >= in_end) & (df.index < out_end)]
-            if len(in_sample) < 50 or len(out_sample) < 20:
-                break
+        # the frame reaches each worker once through the pool initializer; tasks only carry bounds and params
+        token = uuid4().hex
+        loop = asyncio.get_running_loop()
+        pool = executor_cls(max_workers=max_workers, initializer=_init_worker, initargs=(token, self, strategy, shipped))
+        workers = max(1, int(max_workers or os.cpu_count() or 1))
+
+        async def segment(i, w, opt):
             best_params = {}
-            best_sharpe = -1e9
-            for _ in range(optimization_iterations if param_space else 1):
-                params = {k: np.random.choice(v) for k, v in (param_space or {}).items()}
-                res = await self.run(strategy, in_sample, **params)
-                if res.sharpe_ratio > best_sharpe:
-                    best_sharpe = res.sharpe_ratio
-                    best_params = params
-            results.append(await self.run(strategy, out_sample, optimization_iterations=optimization_iterations, **best_params))
-            cursor = cursor + pd.DateOffset(months=out_sample_months)
-        return results
-
-    async def monte_carlo(self, trades: List[Dict], iterations=10000, confidence_levels=[0.95, 0.99]) -> Dict:
-        pnl = np.array([t.get("pnl", 0) for t in trades], dtype=float)
-        if len(pnl) == 0:
-            return {"distribution": [], "VaR": {}, "CVaR": {}}
-        dist = []
-        for _ in range(iterations):
-            sample = np.random.choice(pnl, size=len(pnl), replace=True)
-            dist.append(sample.sum())
-        dist = np.array(dist)
+            if opt is not None:
+                while trials := opt.ask(workers):
+                    batch = max(1, -(-len(trials) // (workers * 4)))
+                    batches = [trials[k : k + batch] for k in range(0, len(trials), batch)]
+                    scores = await asyncio.gather(*(loop.run_in_executor(pool, _evaluate_trials, token, w.train_lo, w.train_hi, b, prune_drawdown) for b in batches))
+                    opt.tell(trials, [x for chunk in scores for x in chunk])
+                best_params = opt.best_params
+            result = await loop.run_in_executor(pool, _run_segment, token, w.test_lo, w.test_hi, {"optimization_iterations": optimization_iterations, **best_params})
+            if on_segment is not None:
+                on_segment(i, len(windows), result)
+            return result
+
+        try:
+            return list(await asyncio.gather(*(segment(i, *w) for i, w in enumerate(windows))))
+        except asyncio.CancelledError:
+            # drop queued trials so a cancelled run only waits for the batches already executing
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            # waiting for the workers to exit happens off the event loop, so a cancelled run does not stall other
+            # jobs and requests while its executing batches finish
+            try:
+                await loop.run_in_executor(None, pool.shutdown)
+            finally:
+                _WORKER_STATE.pop(token, None)
+
+    async def monte_carlo(self, trades: List[Dict], iterations=10000, confidence_levels=[0.95, 0.99], block_size=None, initial_capital=10000, ruin_threshold=0.5, memory_budget_mb=256, max_workers=None, seed=None, bins=50) -> Dict:
+        pnl = trades["pnl"].astype(float) if isinstance(trades, np.ndarray) else np.array([t.get("pnl", 0) for t in trades], dtype=float)
+        if len(pnl) == 0 or iterations <= 0:
+            return {"iterations": 0, "mean": 0.0, "std": 0.0, "VaR": {}, "CVaR": {}, "quantiles": {}, "histogram": {"edges": [], "counts": []}, "max_drawdown": {}, "risk_of_ruin": 0.0, "time_to_recovery": {}}
+        paths = await bootstrap(pnl, int(iterations), block_size, -float(initial_capital) * ruin_threshold, memory_budget_mb, max_workers, seed)
+        dist = paths.totals
         var = {str(c): float(np.quantile(dist, 1 - c)) for c in confidence_levels}
-        cvar = {str(c): float(dist[dist <= np.quantile(dist, 1 - c)].mean()) for c in confidence_levels}
-        return {"distribution": dist.tolist(), "mean": float(dist.mean()), "std": float(dist.std()), "VaR": var, "CVaR": cvar}
-
-    async def stress_test(self, strategy, base_data, scenarios: List[Dict]) -> Dict:
-        out = {}
-        for s in scenarios:
-            name = s.get("name", "scenario")
-            shocked = base_data.copy()
-            if s.get("type") == "price_shock":
-                shocked["close"] = shocked["close"] * (1 + float(s.get("shock", -0.1)))
-            elif s.get("type") == "volatility_spike":
-                shocked["volatility"] = shocked.get("volatility", 0.01) * float(s.get("multiplier", 2))
-            res = await self.run(strategy, shocked, strategy_name=f"stress_{name}")
-            out[name] = {"total_return": res.total_return, "max_drawdown": res.max_drawdown, "sharpe": res.sharpe_ratio}
-        return out
+        cvar = {str(c): float(dist[dist <= var[str(c)]].mean()) for c in confidence_levels}
+        return {
+            "iterations": int(iterations),
+            "mean": float(dist.mean()),
+            "std": float(dist.std()),
+            "VaR": var,
+            "CVaR": cvar,
+            "quantiles": quantile_summary(dist),
+            "histogram": histogram_summary(dist, bins),
+            "max_drawdown": {"mean": float(paths.max_drawdown.mean()), "quantiles": quantile_summary(paths.max_drawdown), "histogram": histogram_summary(paths.max_drawdown, bins)},
+            "risk_of_ruin": float(paths.ruined.mean()),
+            "time_to_recovery": {"unit": "trades", "quantiles": quantile_summary(paths.recovery, (0.5, 0.75, 0.9, 0.95, 0.99)), "max": int(paths.recovery.max()), "unrecovered_at_end": float(paths.underwater_at_end.mean())},
+        }
+
+    async def run_scenarios(self, strategy, base_data, scenarios: List[Dict | Scenario], max_workers=None, executor_cls: Type[Executor] = ProcessPoolExecutor, baseline=True, **run_params) -> pd.DataFrame:
+        # One row per scenario (plus an unshocked baseline row) with the headline metrics. The base frame reaches
+        # each worker once; scenarios travel as small specs and are applied there as transforms over it.
+        specs = parse(scenarios)
+        frame = _frame(base_data)
+        df = frame if frame.index.is_monotonic_increasing else frame.sort_index()
+        shipped = base_data if hasattr(base_data, "load") and df is frame else df
+        token = uuid4().hex
+        loop = asyncio.get_running_loop()
+        with executor_cls(max_workers=max_workers, initializer=_init_worker, initargs=(token, self, strategy, shipped)) as pool:
+            try:
+                rows = await asyncio.gather(*(loop.run_in_executor(pool, _run_scenario, token, spec, run_params) for spec in ([None] if baseline else []) + specs))
+            finally:
+                _WORKER_STATE.pop(token, None)
+        return pd.DataFrame(rows, columns=["scenario", "type", *RESULT_COLUMNS])
+
+    async def stress_test(self, strategy, base_data, scenarios: List[Dict], max_workers=None, executor_cls: Type[Executor] = ProcessPoolExecutor) -> Dict:
+        table = await self.run_scenarios(strategy, base_data, scenarios, max_workers=max_workers, executor_cls=executor_cls, baseline=False)
+        return {row.scenario: {"total_return": row.total_return, "max_drawdown": row.max_drawdown, "sharpe": row.sharpe_ratio} for row in table.itertuples()}
+
+
+_WORKER_STATE: Dict[str, tuple] = {}
+
+PRUNE_BLOCK = 4096
+
+
+def _marked_to_market(equity_curve: np.ndarray, close: np.ndarray, fills: Dict, qty: float) -> np.ndarray:
+    # realized equity plus the open position's unrealized P&L on every bar it is held, [entry, exit), including a
+    # position still open after the last bar
+    n = len(close)
+    rows = [np.asarray(fills["entry_rows"], dtype=np.int64)], [np.asarray(fills["exit_rows"], dtype=np.int64)]
+    direction, entry = [np.asarray(fills["direction"], dtype=float)], [np.asarray(fills["entry"], dtype=float)]
+    open_row = int(fills.get("open_entry_row", -1))
+    if open_row >= 0:
+        rows[0].append(np.array([open_row]))
+        rows[1].append(np.array([n]))
+        direction.append(np.array([fills["open_direction"]]))
+        entry.append(np.array([fills["open_entry"]]))
+    entry_rows, exit_rows, direction, entry = (np.concatenate(x) for x in (rows[0], rows[1], direction, entry))
+    held, basis = np.zeros(n + 1), np.zeros(n + 1)
+    np.add.at(held, entry_rows, direction)
+    np.add.at(held, exit_rows, -direction)
+    np.add.at(basis, entry_rows, direction * entry)
+    np.add.at(basis, exit_rows, -direction * entry)
+    return equity_curve + qty * (np.cumsum(held)[:n] * close - np.cumsum(basis)[:n])
+
+
+def _check_drawdown(marked: np.ndarray, stop_drawdown: float, index, block: int = PRUNE_BLOCK) -> None:
+    # scanned block by block with the running peak carried over, so a trial stops at its first breaching block
+    peak = -np.inf
+    for lo in range(0, len(marked), block):
+        part = marked[lo : lo + block]
+        running = np.maximum.accumulate(np.maximum(part, peak))
+        breach = np.flatnonzero(part < running * (1 - stop_drawdown))
+        if len(breach):
+            raise TrialPruned(f"drawdown beyond {stop_drawdown:.2%} at {index[lo + int(breach[0])]}")
+        peak = running[-1]
+
+
+def _frame(data) -> pd.DataFrame:
+    # frames pass through; references such as market_data_service StoreSlice resolve to zero-copy views
+    return data.load() if hasattr(data, "load") else data
+
+
+def _read_only(data: pd.DataFrame) -> pd.DataFrame:
+    # one block per column, each a non-writeable view of the caller's array; extension-typed columns are copied
+    columns = []
+    for _, column in data.items():
+        if isinstance(column.dtype, np.dtype):
+            view = column.to_numpy(copy=False).view()
+            view.flags.writeable = False
+            columns.append(view)
+        else:
+            columns.append(column.array.copy())
+    out = pd.DataFrame(dict(enumerate(columns)), index=data.index, copy=False)
+    out.columns = data.columns
+    return out
+
+
+def _init_worker(token, engine, strategy, data) -> None:
+    _WORKER_STATE[token] = (engine, strategy, _frame(data))
+
+
+def _evaluate_trials(token, lo, hi, trials: List[Trial], stop_drawdown=None) -> List[float]:
+    engine, strategy, data = _WORKER_STATE[token]
+    windows: Dict[int, pd.DataFrame] = {}
+    scores = []
+    for trial in trials:
+        # successive halving scores early rungs on a prefix of the in-sample window
+        end = hi if trial.fraction >= 1.0 else min(hi, lo + max(50, int((hi - lo) * trial.fraction)))
+        if end not in windows:
+            windows[end] = data.iloc[lo:end]
+        window = windows[end]
+        try:
+            sharpe = engine._run(strategy, window, compact=True, keep_curves=False, stop_drawdown=stop_drawdown, **trial.params).sharpe_ratio
+        except TrialPruned:
+            sharpe = -np.inf
+        scores.append(float(sharpe) if np.isfinite(sharpe) else -np.inf)
+    return scores
+
+
+def _run_scenario(token, scenario: Optional[Scenario], run_params: Dict) -> Dict:
+    engine, strategy, data = _WORKER_STATE[token]
+    df, engine = apply(scenario, data, engine) if scenario is not None else (data, engine)
+    name = scenario.name if scenario is not None else "baseline"
+    result = engine._run(strategy, df, compact=True, keep_curves=False, **{"strategy_name": f"stress_{name}", **run_params})
+    return result_row(scenario, result)
+
+
+def _run_segment(token, lo, hi, params) -> BacktestResult:
+    engine, strategy, data = _WORKER_STATE[token]
+    return engine._run(strategy, data.iloc[lo:hi], **params)
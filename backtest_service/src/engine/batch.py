@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from backtest_service.src.engine.vectorized import encode_signals, pair_signals, simulate_signals
+
+# codes + first-signal rows + forward fill + bar pnl + equity + returns + running peak, per (bar, param) cell
+_BYTES_PER_CELL = 1 + 8 + 8 + 8 + 8 + 8 + 8
+
+
+def expand_grid(param_grid: Union[Dict[str, Sequence], List[Dict]]) -> List[Dict]:
+    if isinstance(param_grid, dict):
+        keys = list(param_grid)
+        return [dict(zip(keys, values)) for values in product(*(param_grid[k] for k in keys))]
+    return [dict(p) for p in param_grid]
+
+
+def chunk_columns(n_bars: int, n_params: int, memory_budget_mb: float) -> int:
+    return int(max(1, min(n_params, memory_budget_mb * 1024 * 1024 // (max(n_bars, 1) * _BYTES_PER_CELL))))
+
+
+def simulate_matrix(engine, codes: np.ndarray, close: np.ndarray, volatility: Optional[np.ndarray], qty: np.ndarray, initial_capital: float, commission: bool, slippage: bool, margin: bool) -> tuple:
+    # Each column is an independent account trading the same bars. Fills are priced for every column at
+    # once; columns where margin would reject an entry are re-run through simulate_signals, which repairs
+    # the signal stream exactly as a single run would.
+    n, m = codes.shape
+    cols, entry_rows, exit_rows = pair_signals(codes)
+    closed = exit_rows < n
+    exit_px_rows = np.where(closed, exit_rows, n - 1)
+    direction = codes[entry_rows, cols].astype(float)
+    q = qty[cols]
+    entry_px = close[entry_rows]
+    exit_px = close[exit_px_rows]
+    if slippage:
+        entry_px = entry_px + engine.slippage_model.calculate_array(close[entry_rows], q, None if volatility is None else volatility[entry_rows]) * direction
+        exit_px = exit_px - engine.slippage_model.calculate_array(close[exit_px_rows], q, None if volatility is None else volatility[exit_px_rows]) * direction
+    fees = engine.commission_model.calculate_array(q, exit_px) if commission else np.zeros(len(cols))
+    pnl = np.where(closed, (exit_px - entry_px) * q * direction - fees, 0.0)
+
+    redo = np.zeros(m, dtype=bool)
+    if margin and len(cols):
+        # trades are grouped by column in entry order, so equity before each entry is a per-column running sum
+        running = np.cumsum(pnl)
+        starts = np.searchsorted(cols, cols, side="left")
+        before = np.where(starts > 0, running[starts - 1], 0.0)
+        equity_before = initial_capital + np.concatenate([[0.0], running[:-1]]) - before
+        required = engine.margin_model.calculate_required_array("SYMBOL", q, close[entry_rows])
+        redo[cols[required > equity_before]] = True
+
+    keep = closed & ~redo[cols]
+    bar_pnl = np.zeros(n * m)
+    np.add.at(bar_pnl, exit_rows[keep] * m + cols[keep], pnl[keep])
+    bar_pnl = bar_pnl.reshape(n, m)
+    if n:
+        bar_pnl[0] += initial_capital
+    equity = np.cumsum(bar_pnl, axis=0)
+    trade_cols, trade_pnl = [cols[keep]], [pnl[keep]]
+    for j in np.flatnonzero(redo):
+        equity[:, j], fills = simulate_signals(engine, codes[:, j], close, volatility, float(qty[j]), initial_capital, commission, slippage, margin)
+        trade_cols.append(np.full(len(fills["pnl"]), j))
+        trade_pnl.append(fills["pnl"])
+    return equity, np.concatenate(trade_cols), np.concatenate(trade_pnl)
+
+
+def curve_metrics(equity: np.ndarray, trade_cols: np.ndarray, trade_pnl: np.ndarray, initial_capital: float) -> Dict[str, np.ndarray]:
+    # same definitions as BacktestEngine._build_result, evaluated column-wise
+    n, m = equity.shape
+    ret = np.zeros_like(equity)
+    if n > 1:
+        np.divide(equity[1:], equity[:-1], out=ret[1:])
+        ret[1:] -= 1.0
+    mean = ret.mean(axis=0) if n else np.zeros(m)
+    std = ret.std(axis=0, ddof=1) if n > 1 else np.full(m, np.nan)
+    neg = ret < 0
+    n_neg = neg.sum(axis=0)
+    neg_mean = np.where(neg, ret, 0.0).sum(axis=0) / np.maximum(n_neg, 1)
+    neg_var = np.where(neg, (ret - neg_mean) ** 2, 0.0).sum(axis=0) / np.maximum(n_neg - 1, 1)
+    downside_std = np.where(n_neg > 1, np.sqrt(neg_var), np.nan)
+    peak = np.maximum.accumulate(equity, axis=0)
+    drawdown = equity / peak - 1
+    max_dd = drawdown.min(axis=0) if n else np.zeros(m)
+    ann = (1 + mean) ** 252 - 1
+    wins = np.bincount(trade_cols, weights=np.where(trade_pnl > 0, trade_pnl, 0.0), minlength=m)
+    losses = np.bincount(trade_cols, weights=np.where(trade_pnl <= 0, trade_pnl, 0.0), minlength=m)
+    n_trades = np.bincount(trade_cols, minlength=m)
+    n_wins = np.bincount(trade_cols, weights=trade_pnl > 0, minlength=m).astype(int)
+    n_losses = n_trades - n_wins
+    final = equity[-1] if n else np.full(m, float(initial_capital))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profit_factor = np.where(n_losses > 0, wins / np.abs(losses), np.inf)
+    return {
+        "sharpe_ratio": mean / (std + 1e-9) * np.sqrt(252),
+        "sortino_ratio": mean / (downside_std + 1e-9) * np.sqrt(252),
+        "calmar_ratio": ann / (np.abs(max_dd) + 1e-9),
+        "max_drawdown": np.abs(max_dd),
+        "max_drawdown_duration": (drawdown < 0).sum(axis=0),
+        "total_return": final / initial_capital - 1,
+        "annualized_return": ann,
+        "final_capital": final,
+        "total_trades": n_trades,
+        "win_rate": np.where(n_trades > 0, n_wins / np.maximum(n_trades, 1), 0.0),
+        "profit_factor": profit_factor,
+    }
+
+
+def evaluate_grid(engine, strategy, df: pd.DataFrame, param_grid, initial_capital: float, commission: bool, slippage: bool, margin: bool, memory_budget_mb: float, strategy_params: Dict) -> pd.DataFrame:
+    params = expand_grid(param_grid)
+    n = len(df)
+    close = df["close"].to_numpy(dtype=float)
+    volatility = df["volatility"].to_numpy(dtype=float) if "volatility" in df.columns else None
+    width = chunk_columns(n, len(params), memory_budget_mb)
+    frames = []
+    for start in range(0, len(params), width):
+        chunk = params[start : start + width]
+        keys = list(dict.fromkeys(k for p in chunk for k in p))
+        # the strategy sees one array per parameter (aligned with the matrix columns) so it can broadcast
+        columns = {k: np.array([p.get(k, strategy_params.get(k)) for p in chunk]) for k in keys}
+        raw = np.asarray(strategy(df, **{**strategy_params, **columns}))
+        if raw.ndim == 1:
+            raw = np.repeat(raw[:, None], len(chunk), axis=1)
+        if raw.shape[1] != len(chunk):
+            raise ValueError(f"strategy returned {raw.shape[1]} signal columns for {len(chunk)} parameter sets")
+        codes = encode_signals(raw, n)
+        qty = np.array([float(p.get("size", strategy_params.get("size", 1.0))) for p in chunk])
+        equity, trade_cols, trade_pnl = simulate_matrix(engine, codes, close, volatility, qty, float(initial_capital), commission, slippage, margin)
+        frames.append(pd.DataFrame({**{k: [p.get(k) for p in chunk] for k in keys}, **curve_metrics(equity, trade_cols, trade_pnl, float(initial_capital))}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import sys
+import sysconfig
+import threading
+import types
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def data_digest(data: pd.DataFrame) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps([list(map(str, data.columns)), list(map(str, data.dtypes))]).encode())
+    h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def strategy_identity(strategy) -> Optional[str]:
+    # an explicit version pins the identity; otherwise fall back to the code itself. Closures can capture
+    # arbitrary state the hash cannot see, so they are only cacheable once they declare a version.
+    version = getattr(strategy, "version", None)
+    target = strategy if callable(strategy) and hasattr(strategy, "__code__") else type(strategy)
+    name = f"{getattr(target, '__module__', '')}.{getattr(target, '__qualname__', repr(target))}"
+    if version is not None:
+        return f"{name}@{version}"
+    h = hashlib.sha256()
+    if getattr(strategy, "__code__", None) is not None:
+        if getattr(strategy, "__closure__", None):
+            return None
+        _hash_function(h, strategy, set())
+        return f"{name}#{h.hexdigest()}"
+    # every method and plain attribute defined along the class hierarchy, plus the instance state
+    seen: set = set()
+    for cls in type(strategy).__mro__[:-1]:
+        h.update(cls.__qualname__.encode())
+        for attr, value in sorted(vars(cls).items()):
+            fn = value.__func__ if isinstance(value, (staticmethod, classmethod)) else getattr(value, "fget", value)
+            if isinstance(fn, types.FunctionType):
+                h.update(attr.encode())
+                _hash_function(h, fn, seen)
+            elif isinstance(value, _PLAIN):
+                h.update(f"{attr}={fingerprint(value)}".encode())
+    state = sorted((k, fingerprint(v)) for k, v in vars(strategy).items()) if hasattr(strategy, "__dict__") else []
+    h.update(repr(state).encode())
+    return f"{name}#{h.hexdigest()}"
+
+
+_PLAIN = (bool, int, float, complex, str, bytes, tuple, list, dict, frozenset, set, type(None), np.ndarray, np.generic)
+_LIBRARY_PATHS = tuple({sysconfig.get_path(k) for k in ("stdlib", "platstdlib", "purelib", "platlib") if sysconfig.get_path(k)})
+
+
+def fingerprint(value) -> str:
+    # a stable text form for hashing; arrays and frames are hashed by content, since numpy's repr elides the
+    # middle of anything over 1000 elements
+    if isinstance(value, np.ndarray):
+        return f"ndarray:{value.dtype.str}:{value.shape}:{hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()}"
+    if isinstance(value, pd.DataFrame):
+        return f"frame:{data_digest(value)}"
+    if isinstance(value, pd.Series):
+        return f"series:{data_digest(value.to_frame())}"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{','.join(fingerprint(v) for v in value)}]"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{fingerprint(k)}:{fingerprint(v)}" for k, v in sorted(value.items(), key=lambda kv: repr(kv[0]))) + "}"
+    return repr(value)
+
+
+def engine_version() -> str:
+    # the source of every engine module plus CACHE_VERSION; a change to fills, metrics, margin or any other
+    # engine logic invalidates what the disk tier holds from earlier deploys
+    global _ENGINE_VERSION
+    if _ENGINE_VERSION is None:
+        h = hashlib.sha256(str(CACHE_VERSION).encode())
+        for path in sorted(Path(__file__).parent.glob("*.py")):
+            h.update(path.name.encode())
+            h.update(path.read_bytes())
+        _ENGINE_VERSION = h.hexdigest()
+    return _ENGINE_VERSION
+
+
+CACHE_VERSION = 1
+_ENGINE_VERSION: Optional[str] = None
+
+
+def _user_code(module_name: str) -> bool:
+    # code that can change between runs without a package upgrade: anything not installed in the stdlib or
+    # site-packages, including namespaces that are not importable at all (exec'd or notebook code)
+    if module_name in sys.builtin_module_names:
+        return False
+    module = sys.modules.get(module_name)
+    path = getattr(module, "__file__", None)
+    if path is None:
+        return module is None or module_name == "__main__"
+    return not os.path.abspath(path).startswith(_LIBRARY_PATHS)
+
+
+def _hash_code(h, code: types.CodeType) -> None:
+    # bytecode alone misses edits that only change a referenced name (np.maximum -> np.minimum) or a constant
+    # inside a nested function, so names and nested code objects are folded in too
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(h, const)
+        else:
+            h.update(repr(const).encode())
+
+
+def _hash_function(h, fn: types.FunctionType, seen: set) -> None:
+    # a function's code and defaults, then what it reaches by name: user-code functions (helpers, indicators)
+    # in its own or another module, module-level constants, and attributes of user-code modules it imports
+    if fn in seen:
+        return
+    seen.add(fn)
+    _hash_code(h, fn.__code__)
+    h.update(fingerprint((fn.__defaults__, fn.__kwdefaults__)).encode())
+    names, stack = set(), [fn.__code__]
+    while stack:
+        code = stack.pop()
+        names.update(code.co_names)
+        stack.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+    for ref in sorted(names):
+        if ref not in fn.__globals__:
+            continue
+        _hash_reference(h, ref, fn.__globals__[ref], names, seen)
+
+
+def _hash_reference(h, name: str, value, names: set, seen: set) -> None:
+    if isinstance(value, types.FunctionType):
+        if _user_code(value.__module__):
+            _hash_function(h, value, seen)
+    elif isinstance(value, types.ModuleType):
+        if value not in seen and _user_code(value.__name__):
+            seen.add(value)
+            for attr in sorted(names):
+                if attr in vars(value):
+                    _hash_reference(h, f"{name}.{attr}", vars(value)[attr], names, seen)
+    elif isinstance(value, _PLAIN):
+        h.update(f"{name}={fingerprint(value)}".encode())
+
+
+def _settings(model) -> Any:
+    return asdict(model) if is_dataclass(model) else repr(model)
+
+
+class BacktestCache:
+    # Two tiers: an in-process LRU of live result objects, and an optional directory of pickles bounded by
+    # total size (least recently used files go first). Worker processes get a copy without the memory tier,
+    # so they share results through the disk tier only. Entries are stored and handed out as copies. Keys
+    # include engine_version(), so results pickled by an older engine are never served. Frames handed to a cached engine are treated as
+    # immutable: their digest is remembered for as long as the frame object is alive.
+    def __init__(self, max_entries: int = 256, directory: Optional[str] = None, max_disk_bytes: int = 512 * 1024 * 1024) -> None:
+        self.max_entries = int(max_entries)
+        self.directory = Path(directory) if directory else None
+        self.max_disk_bytes = int(max_disk_bytes)
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._digests: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_memory"] = OrderedDict()
+        state["_digests"] = {}
+        state.pop("_lock")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def key(self, engine, strategy, data: pd.DataFrame, options: Dict, params: Dict) -> Optional[str]:
+        identity = strategy_identity(strategy)
+        if identity is None:
+            return None
+        payload = {
+            "engine": f"{type(engine).__module__}.{type(engine).__qualname__}@{engine_version()}",
+            "data": self._digest(data),
+            "strategy": identity,
+            "options": options,
+            "params": params,
+            "commission_model": _settings(engine.commission_model),
+            "slippage_model": _settings(engine.slippage_model),
+            "margin_model": _settings(engine.margin_model),
+            "fill_model": _settings(getattr(engine, "fill_model", None)),
+        }
+        payload["options"], payload["params"] = fingerprint(options), fingerprint(params)
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=fingerprint).encode()).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                # every hit is its own copy, so a caller mutating trades or curves cannot reach later hits
+                return copy.deepcopy(self._memory[key])
+        path = self._path(key)
+        if path is not None and path.exists():
+            try:
+                with path.open("rb") as fh:
+                    value = pickle.load(fh)
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                self._remember(key, copy.deepcopy(value))
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value) -> None:
+        self._remember(key, copy.deepcopy(value))
+        path = self._path(key)
+        if path is None:
+            return
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._evict_disk()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None:
+            for path in self.directory.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "evictions": self.evictions, "memory_entries": len(self._memory), "hit_rate": (self.hits / lookups) if lookups else 0.0}
+
+    def _digest(self, data: pd.DataFrame) -> str:
+        entry = self._digests.get(id(data))
+        if entry is not None and entry[0]() is data:
+            return entry[1]
+        digest = data_digest(data)
+        self._digests[id(data)] = (weakref.ref(data, lambda _, k=id(data): self._digests.pop(k, None)), digest)
+        return digest
+
+    def _path(self, key: str) -> Optional[Path]:
+        return self.directory / f"{key}.pkl" if self.directory is not None else None
+
+    def _remember(self, key: str, value) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for path in self.directory.glob("*.pkl"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self.evictions += 1
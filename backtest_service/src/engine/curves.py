@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+DISPLAY_POINTS = 2000
+_MAGIC = b"EQC1"
+_HEADER = struct.Struct("<4sQ")
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    # byte-transpose the 8-byte words so the slowly changing high bytes of neighbouring points sit together
+    return np.ascontiguousarray(values.view(np.uint8).reshape(-1, 8).T).tobytes()
+
+
+def _unshuffle(raw: bytes, n: int, dtype) -> np.ndarray:
+    return np.ascontiguousarray(np.frombuffer(raw, dtype=np.uint8).reshape(8, n).T).view(dtype).ravel()
+
+
+def encode_curve(times, values) -> bytes:
+    # Full-resolution curve as a compressed blob: int64 ns timestamps stored as deltas (constant for regular
+    # bars) and float64 values, both byte-shuffled, then deflated. Lossless; decode_curve inverts it.
+    t = np.asarray(pd.DatetimeIndex(times).asi8, dtype=np.int64)
+    v = np.ascontiguousarray(values, dtype="<f8")
+    if len(t) != len(v):
+        raise ValueError(f"curve has {len(t)} timestamps but {len(v)} values")
+    deltas = np.diff(t, prepend=np.int64(0)).astype("<i8")
+    return _HEADER.pack(_MAGIC, len(t)) + zlib.compress(_shuffle(deltas) + _shuffle(v), 6)
+
+
+def decode_curve(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    magic, n = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise ValueError("not an encoded equity curve")
+    raw = zlib.decompress(memoryview(blob)[_HEADER.size :])
+    if len(raw) != 16 * n:
+        raise ValueError(f"equity curve blob holds {len(raw)} bytes, expected {16 * n}")
+    times = np.cumsum(_unshuffle(raw[: 8 * n], n, "<i8")).view("M8[ns]")
+    return times, _unshuffle(raw[8 * n :], n, "<f8").astype(np.float64)
+
+
+def lttb(times, values, threshold: int = DISPLAY_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, per bucket, the point forming the
+    # largest triangle with the previous pick and the next bucket's mean - peaks and drawdowns survive.
+    times, values = np.asarray(times), np.asarray(values, dtype=float)
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return times, values
+    x = times.view(np.int64).astype(float) if times.dtype.kind == "M" else times.astype(float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    picks = np.empty(threshold, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), values[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (values[lo:hi] - values[a]) - (x[a] - x[lo:hi]) * (cy - values[a]))
+        a = lo + int(area.argmax())
+        picks[i + 1] = a
+    return times[picks], values[picks]
+
+
+def minmax(times, values, buckets: int = DISPLAY_POINTS // 2) -> Tuple[np.ndarray, np.ndarray]:
+    # min and max of each of `buckets` equal-count buckets, in time order; one vectorized pass
+    times, values = np.asarray(times), np.asarray(values, dtype=float)
+    n = len(values)
+    if 2 * buckets >= n or buckets < 1:
+        return times, values
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    sizes = np.diff(np.append(starts, n))
+    owner = np.repeat(np.arange(buckets), sizes)
+    order = np.lexsort((values, owner))
+    lo, hi = order[starts], order[starts + sizes - 1]
+    picks = np.unique(np.concatenate([lo, hi]))
+    return times[picks], values[picks]
+
+
+def downsample(times, values, points: int = DISPLAY_POINTS, method: str = "lttb") -> Tuple[np.ndarray, np.ndarray]:
+    if method == "lttb":
+        return lttb(times, values, points)
+    if method == "minmax":
+        return minmax(times, values, points // 2)
+    raise ValueError(f"unknown downsampling method {method!r}; expected 'lttb' or 'minmax'")
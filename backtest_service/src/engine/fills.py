@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest_service.src.engine.vectorized import SIGNAL_BUY, SIGNAL_CLOSE, SIGNAL_NONE, SIGNAL_SELL, encode_signals
+
+ORDER_MARKET = 0
+ORDER_LIMIT = 1
+ORDER_STOP = 2
+ORDER_STOP_LIMIT = 3
+
+_ORDER_NAMES = {"market": ORDER_MARKET, "limit": ORDER_LIMIT, "stop": ORDER_STOP, "stop_limit": ORDER_STOP_LIMIT}
+# any of these on a vectorized strategy's frame switches the run to intrabar fill simulation
+ORDER_COLUMNS = ("order_type", "price", "limit_price", "stop_price", "stop_loss", "take_profit", "expiry")
+INTRABAR_PRIORITIES = ("stop_first", "target_first", "nearest_open")
+
+# bars scanned per step when looking for a trigger; doubles each step so long holds stay O(bars held)
+_SCAN_BLOCK = 256
+
+
+@dataclass(slots=True)
+class FillModel:
+    # which of stop-loss / take-profit fills first when one bar's range crosses both and the open gapped past
+    # neither: stop_first is the pessimistic default, nearest_open takes the level closer to the bar's open
+    intrabar_priority: str = "stop_first"
+    slippage_on_stops: bool = True
+
+    def __post_init__(self) -> None:
+        if self.intrabar_priority not in INTRABAR_PRIORITIES:
+            raise ValueError(f"intrabar_priority must be one of {INTRABAR_PRIORITIES}")
+
+
+@dataclass(slots=True)
+class OrderBook:
+    codes: np.ndarray
+    order_type: np.ndarray
+    stop_price: np.ndarray
+    limit_price: np.ndarray
+    stop_loss: np.ndarray
+    take_profit: np.ndarray
+    expiry: np.ndarray
+
+
+def has_orders(raw) -> bool:
+    return isinstance(raw, pd.DataFrame) and any(c in raw.columns for c in ORDER_COLUMNS)
+
+
+def _column(raw: pd.DataFrame, *names: str) -> np.ndarray:
+    for name in names:
+        if name in raw.columns:
+            return raw[name].to_numpy(dtype=float)
+    return np.full(len(raw), np.nan)
+
+
+def encode_orders(raw: pd.DataFrame, length: int) -> OrderBook:
+    codes = encode_signals(raw, length)
+    kinds = np.zeros(length, dtype=np.int8)
+    if "order_type" in raw.columns:
+        labels = raw["order_type"].astype("string").str.lower().fillna("market").to_numpy(dtype=object)
+        unknown = set(labels) - set(_ORDER_NAMES)
+        if unknown:
+            raise ValueError(f"unknown order types {sorted(unknown)}; expected one of {sorted(_ORDER_NAMES)}")
+        for name, code in _ORDER_NAMES.items():
+            kinds[labels == name] = code
+    price = _column(raw, "price")
+    stop = _column(raw, "stop_price")
+    limit = _column(raw, "limit_price")
+    # a bare "price" is the limit for LIMIT orders and the trigger for STOP orders, as on ExecutionEngine orders
+    stop = np.where(np.isnan(stop) & (kinds == ORDER_STOP), price, stop)
+    limit = np.where(np.isnan(limit) & (kinds == ORDER_LIMIT), price, limit)
+    pending = (kinds != ORDER_MARKET) & ((codes == SIGNAL_BUY) | (codes == SIGNAL_SELL))
+    missing = pending & (((kinds != ORDER_LIMIT) & np.isnan(stop)) | ((kinds != ORDER_STOP) & np.isnan(limit)))
+    if missing.any():
+        raise ValueError(f"pending order at bar {int(np.flatnonzero(missing)[0])} has no trigger/limit price")
+    return OrderBook(codes, kinds, stop, limit, _column(raw, "stop_loss"), _column(raw, "take_profit"), _column(raw, "expiry"))
+
+
+def _first_cross(values: np.ndarray, level: float, above: bool) -> int:
+    # first index whose running extreme reaches `level`: running max/min are monotone, so one searchsorted
+    # on the scan answers it; len(values) when the level is never reached
+    if above:
+        return int(np.searchsorted(np.maximum.accumulate(values), level, side="left"))
+    return int(np.searchsorted(-np.minimum.accumulate(values), -level, side="left"))
+
+
+def _scan(high: np.ndarray, low: np.ndarray, start: int, stop: int, levels) -> Tuple[int, int]:
+    # levels: (price, above) pairs; returns the earliest bar in [start, stop) crossing any of them and a bitmask
+    # of the levels crossed on that bar, or (stop, 0) when nothing is crossed
+    block = _SCAN_BLOCK
+    stop = min(stop, len(high))
+    a = start
+    while a < stop:
+        b = min(stop, a + block)
+        best, which = b - a, -1
+        for k, (level, above) in enumerate(levels):
+            if level != level:
+                continue
+            hit = _first_cross(high[a:b] if above else low[a:b], level, above)
+            if hit < best:
+                best, which = hit, k
+        if which >= 0:
+            # several levels can trigger on the same bar; report all of them through a bitmask
+            bar = a + best
+            mask = 0
+            for k, (level, above) in enumerate(levels):
+                if level == level and ((high[bar] >= level) if above else (low[bar] <= level)):
+                    mask |= 1 << k
+            return bar, mask
+        a = b
+        block *= 2
+    return stop, 0
+
+
+def simulate_orders(engine, book: OrderBook, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, volatility: Optional[np.ndarray], qty: float, initial_capital: float, commission: bool, slippage: bool, margin: bool, symbol: str = "SYMBOL", asset_class: str = "forex") -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    # One position at a time, as in the bar-close engine: entry signals while in a position are ignored and
+    # "close" exits at the bar close. Pending entries rest from the next bar until they fill or the next
+    # non-empty signal (or their expiry in bars) cancels them. Stop-loss / take-profit are checked from the bar
+    # after the fill. The Python loop runs once per trade; bars are only touched by the vectorised scans.
+    fill_model = engine.fill_model
+    n = len(close)
+    codes = book.codes
+    events = np.flatnonzero(codes != SIGNAL_NONE)
+    entries = np.flatnonzero((codes == SIGNAL_BUY) | (codes == SIGNAL_SELL))
+    closes = np.flatnonzero(codes == SIGNAL_CLOSE)
+
+    def slip(row, price, direction, stop_order):
+        # limit fills and take-profits rest on the book and get no slippage; market and stop fills do
+        if not slippage or (stop_order and not fill_model.slippage_on_stops):
+            return 0.0
+        return engine.slippage_model.calculate(price, qty, None if volatility is None else volatility[row]) * direction
+
+    equity = float(initial_capital)
+    out = {k: [] for k in ("entry_rows", "exit_rows", "direction", "entry", "exit", "pnl", "commission")}
+    # a position still open after the last bar: entry row (-1 when flat), direction, entry price
+    still_open = (-1, 0.0, np.nan)
+    cursor = 0
+    while True:
+        k = int(np.searchsorted(entries, cursor))
+        if k >= len(entries):
+            break
+        r = int(entries[k])
+        direction = float(codes[r])
+        kind = int(book.order_type[r])
+        if kind == ORDER_MARKET:
+            fill_row, raw_px, stop_order = r, float(close[r]), False
+        else:
+            nxt = int(np.searchsorted(events, r, side="right"))
+            cancel = int(events[nxt]) if nxt < len(events) else n - 1
+            if book.expiry[r] == book.expiry[r]:
+                cancel = min(cancel, r + int(book.expiry[r]))
+            fill_row, raw_px, stop_order = _pending_fill(book, r, kind, direction, open_, high, low, cancel + 1)
+            if fill_row < 0:
+                cursor = max(cancel, r + 1)
+                continue
+        if margin and engine.margin_model.calculate_required(symbol, qty, raw_px, asset_class) > equity:
+            # a rejected pending fill drops the order; a signal on its fill bar still acts at that bar's close
+            cursor = fill_row if kind != ORDER_MARKET else r + 1
+            continue
+        entry_px = raw_px + slip(fill_row, raw_px, direction, stop_order)
+
+        c = int(np.searchsorted(closes, fill_row if kind != ORDER_MARKET else fill_row + 1))
+        signal_exit = int(closes[c]) if c < len(closes) else n
+        sl, tp = float(book.stop_loss[r]), float(book.take_profit[r])
+        long = direction > 0
+        # long: stop below (low crosses down), target above (high crosses up); mirrored for shorts
+        levels = ((sl, not long), (tp, long))
+        hit_row, mask = _scan(high, low, fill_row + 1, min(signal_exit + 1, n), levels)
+        if mask:
+            level_px, is_stop = _resolve(mask, sl, tp, long, float(open_[hit_row]), fill_model.intrabar_priority)
+            exit_row = hit_row
+            exit_px = level_px - slip(exit_row, level_px, direction, True) if is_stop else level_px
+        elif signal_exit < n:
+            exit_row = signal_exit
+            exit_px = float(close[exit_row]) - slip(exit_row, float(close[exit_row]), direction, False)
+        else:
+            still_open = (fill_row, direction, entry_px)
+            break
+        fee = engine.commission_model.calculate(qty, exit_px) if commission else 0.0
+        pnl = (exit_px - entry_px) * qty * direction - fee
+        equity += pnl
+        for name, value in zip(out, (fill_row, exit_row, direction, entry_px, exit_px, pnl, fee)):
+            out[name].append(value)
+        # a signal on the exit bar acts at its close, after an intrabar exit; a "close" exit consumes its bar
+        cursor = exit_row if mask else exit_row + 1
+
+    fills = {name: np.asarray(values, dtype=np.int64 if name.endswith("rows") else float) for name, values in out.items()}
+    fills["open_entry_row"], fills["open_direction"], fills["open_entry"] = still_open
+    bar_pnl = np.zeros(n)
+    if n:
+        bar_pnl[0] = float(initial_capital)
+    np.add.at(bar_pnl, fills["exit_rows"], fills["pnl"])
+    return np.cumsum(bar_pnl), fills
+
+
+def _pending_fill(book: OrderBook, r: int, kind: int, direction: float, open_, high, low, stop: int) -> Tuple[int, float, bool]:
+    buy = direction > 0
+    if kind == ORDER_LIMIT:
+        limit = float(book.limit_price[r])
+        row, mask = _scan(high, low, r + 1, stop, ((limit, not buy),))
+        if not mask:
+            return -1, np.nan, False
+        return row, (min(float(open_[row]), limit) if buy else max(float(open_[row]), limit)), False
+    trigger = float(book.stop_price[r])
+    row, mask = _scan(high, low, r + 1, stop, ((trigger, buy),))
+    if not mask:
+        return -1, np.nan, True
+    stop_px = max(float(open_[row]), trigger) if buy else min(float(open_[row]), trigger)
+    if kind == ORDER_STOP:
+        return row, stop_px, True
+    # stop-limit: once triggered it rests as a limit order; on the trigger bar it fills only if the limit is
+    # marketable from the trigger price
+    limit = float(book.limit_price[r])
+    if (stop_px <= limit) if buy else (stop_px >= limit):
+        return row, stop_px, False
+    row2, mask2 = _scan(high, low, row + 1, stop, ((limit, not buy),))
+    if not mask2:
+        return -1, np.nan, False
+    return row2, (min(float(open_[row2]), limit) if buy else max(float(open_[row2]), limit)), False
+
+
+def _resolve(mask: int, sl: float, tp: float, long: bool, bar_open: float, priority: str) -> Tuple[float, bool]:
+    stop_hit, target_hit = bool(mask & 1), bool(mask & 2)
+    # gaps: an open already through a level fills there at the open, whichever priority is configured
+    stop_gapped = stop_hit and ((bar_open <= sl) if long else (bar_open >= sl))
+    target_gapped = target_hit and ((bar_open >= tp) if long else (bar_open <= tp))
+    if stop_gapped or target_gapped:
+        return bar_open, stop_gapped
+    if stop_hit and target_hit:
+        if priority == "target_first":
+            stop_hit = False
+        elif priority == "nearest_open":
+            stop_hit = abs(bar_open - sl) <= abs(tp - bar_open)
+    return (sl, True) if stop_hit else (tp, False)
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Batch functions take whole arrays and return arrays of the same length with NaN during warm-up; the
+# streaming classes produce the same numbers one value at a time in O(1). Smoothing conventions:
+# EMA uses alpha = 2 / (window + 1) seeded with the first value, ATR and RSI use Wilder's alpha = 1 / window.
+# `inputs` names the bar fields a streaming class's update() takes, in order (StrategyState.indicator feeds them).
+
+
+def sma(values, window: int) -> np.ndarray:
+    return pd.Series(np.asarray(values, dtype=float)).rolling(window, min_periods=window).mean().to_numpy()
+
+
+def ema(values, window: int) -> np.ndarray:
+    return pd.Series(np.asarray(values, dtype=float)).ewm(span=window, adjust=False).mean().to_numpy()
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    tr = high - low
+    if len(tr) > 1:
+        prev = close[:-1]
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - prev), np.abs(low[1:] - prev)))
+    return tr
+
+
+def atr(high, low, close, window: int) -> np.ndarray:
+    out = pd.Series(true_range(high, low, close)).ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    out[: window - 1] = np.nan
+    return out
+
+
+def rsi(values, window: int) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) <= window:
+        return out
+    delta = np.diff(values)
+    avg_gain = pd.Series(np.maximum(delta, 0.0)).ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    avg_loss = pd.Series(np.maximum(-delta, 0.0)).ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = np.where(avg_loss > 0, 100 - 100 / (1 + avg_gain / avg_loss), 100.0)
+    out[:window] = np.nan
+    return out
+
+
+def volatility(values, window: int) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) > 1:
+        out[1:] = pd.Series(np.diff(np.log(values))).rolling(window, min_periods=window).std().to_numpy()
+    return out
+
+
+class SMA:
+    inputs = ("close",)
+
+    def __init__(self, window: int) -> None:
+        self.window = int(window)
+        self._buf = np.zeros(self.window)
+        self._count = 0
+        self._sum = 0.0
+        self.value = np.nan
+
+    def update(self, x: float) -> float:
+        i = self._count % self.window
+        self._sum += x - self._buf[i]
+        self._buf[i] = x
+        self._count += 1
+        if self._count >= self.window:
+            if i == self.window - 1:
+                # re-anchor the running sum once per lap so rounding error cannot accumulate
+                self._sum = float(self._buf.sum())
+            self.value = self._sum / self.window
+        return self.value
+
+
+class EMA:
+    inputs = ("close",)
+
+    def __init__(self, window: int) -> None:
+        self.alpha = 2.0 / (int(window) + 1)
+        self.value = np.nan
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value != self.value else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class ATR:
+    inputs = ("high", "low", "close")
+
+    def __init__(self, window: int) -> None:
+        self.window = int(window)
+        self._avg = np.nan
+        self._prev_close = np.nan
+        self._count = 0
+        self.value = np.nan
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if self._count:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+            self._avg += (tr - self._avg) / self.window
+        else:
+            self._avg = tr
+        self._prev_close = close
+        self._count += 1
+        if self._count >= self.window:
+            self.value = self._avg
+        return self.value
+
+
+class RSI:
+    inputs = ("close",)
+
+    def __init__(self, window: int) -> None:
+        self.window = int(window)
+        self._gain = np.nan
+        self._loss = np.nan
+        self._prev = np.nan
+        self._count = 0
+        self.value = np.nan
+
+    def update(self, x: float) -> float:
+        if self._count:
+            delta = x - self._prev
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if self._count == 1:
+                self._gain, self._loss = gain, loss
+            else:
+                self._gain += (gain - self._gain) / self.window
+                self._loss += (loss - self._loss) / self.window
+            if self._count >= self.window:
+                self.value = 100 - 100 / (1 + self._gain / self._loss) if self._loss > 0 else 100.0
+        self._prev = x
+        self._count += 1
+        return self.value
+
+
+class Volatility:
+    # sliding-window Welford update of the sample std of log returns
+    inputs = ("close",)
+
+    def __init__(self, window: int) -> None:
+        self.window = int(window)
+        self._buf = np.zeros(self.window)
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._prev = np.nan
+        self.value = np.nan
+
+    def update(self, x: float) -> float:
+        if self._prev == self._prev:
+            r = math.log(x / self._prev)
+            i = self._count % self.window
+            if self._count < self.window:
+                delta = r - self._mean
+                self._mean += delta / (self._count + 1)
+                self._m2 += delta * (r - self._mean)
+            else:
+                old = self._buf[i]
+                mean = self._mean + (r - old) / self.window
+                self._m2 += (r - old) * (r - mean + old - self._mean)
+                self._mean = mean
+            self._buf[i] = r
+            self._count += 1
+            if self._count >= self.window and self.window > 1:
+                self.value = math.sqrt(max(self._m2, 0.0) / (self.window - 1))
+        self._prev = x
+        return self.value
+
+
+class IndicatorCache:
+    # Memoises batch indicator arrays per dataset: the key is a digest of the input columns plus the indicator
+    # name and parameters, so parameter trials on the same data share one computation. Column digests are
+    # remembered per frame object for as long as it is alive, so frames are treated as immutable.
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = int(max_entries)
+        self._values: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._digests: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def column_digest(self, df: pd.DataFrame, column: str) -> str:
+        entry = self._digests.get(id(df))
+        if entry is None or entry[0]() is not df:
+            entry = (weakref.ref(df, lambda _, k=id(df): self._digests.pop(k, None)), {})
+            self._digests[id(df)] = entry
+        digests = entry[1]
+        if column not in digests:
+            digests[column] = hashlib.sha1(np.ascontiguousarray(df[column].to_numpy(dtype=float)).tobytes()).hexdigest()
+        return digests[column]
+
+    def get(self, df: pd.DataFrame, name: str, columns: Tuple[str, ...], window: int) -> np.ndarray:
+        key = (tuple(self.column_digest(df, c) for c in columns), name, int(window))
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+        value = _BATCH[name](*(df[c].to_numpy(dtype=float) for c in columns), int(window))
+        value.flags.writeable = False
+        with self._lock:
+            self._values[key] = value
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._values)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._digests.clear()
+
+
+_BATCH = {"sma": sma, "ema": ema, "atr": atr, "rsi": rsi, "volatility": volatility}
+default_cache = IndicatorCache()
+
+
+class Indicators:
+    def __init__(self, df: pd.DataFrame, cache: Optional[IndicatorCache] = None) -> None:
+        self.df = df
+        self.cache = cache or default_cache
+
+    def sma(self, window: int, column: str = "close") -> np.ndarray:
+        return self.cache.get(self.df, "sma", (column,), window)
+
+    def ema(self, window: int, column: str = "close") -> np.ndarray:
+        return self.cache.get(self.df, "ema", (column,), window)
+
+    def atr(self, window: int = 14) -> np.ndarray:
+        columns = tuple(c if c in self.df.columns else "close" for c in ("high", "low")) + ("close",)
+        return self.cache.get(self.df, "atr", columns, window)
+
+    def rsi(self, window: int = 14, column: str = "close") -> np.ndarray:
+        return self.cache.get(self.df, "rsi", (column,), window)
+
+    def volatility(self, window: int = 20, column: str = "close") -> np.ndarray:
+        return self.cache.get(self.df, "volatility", (column,), window)
+
+
+def indicators(df: pd.DataFrame, cache: Optional[IndicatorCache] = None) -> Indicators:
+    return Indicators(df, cache)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class _Moments:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def add_array(self, values: np.ndarray) -> None:
+        # Chan et al. pairwise merge of the chunk's moments into the running ones
+        n = len(values)
+        if not n:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        # sample standard deviation, NaN below two observations like pandas
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1)) if self.count > 1 else np.nan
+
+
+class OnlineMetrics:
+    # Streaming form of the metrics BacktestEngine._build_result reports: bar returns (the first bar counts as a
+    # zero return, as pct_change().fillna(0) does), their Welford mean / sample std, the same for negative
+    # returns, a running peak with drawdown depth and underwater-bar counts, and win/loss aggregates over trade
+    # pnl. Feed equity per bar with update() or in chunks with update_array(), trades with add_trade(s), and
+    # read summary() at any point in O(1) - no curve or trade list is kept.
+    def __init__(self, initial_capital: float, periods_per_year: int = 252) -> None:
+        self.initial_capital = float(initial_capital)
+        self.periods_per_year = int(periods_per_year)
+        self.bars = 0
+        self.last = np.nan
+        self.peak = -np.inf
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.underwater_bars = 0
+        self.drawdown_bars = 0
+        self.longest_drawdown_bars = 0
+        self.returns = _Moments()
+        self.downside = _Moments()
+        self.trades = 0
+        self.wins = 0
+        self.pnl_sum = 0.0
+        self.win_sum = 0.0
+        self.loss_sum = 0.0
+        self.largest_win = -np.inf
+        self.largest_loss = np.inf
+
+    def update(self, equity: float) -> None:
+        equity = float(equity)
+        if self.bars:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = float(np.float64(equity) / self.last - 1)
+            r = 0.0 if r != r else r
+        else:
+            r = 0.0
+        self.returns.add(r)
+        if r < 0:
+            self.downside.add(r)
+        self.bars += 1
+        self.last = equity
+        self.peak = max(self.peak, equity)
+        self.drawdown = equity / self.peak - 1
+        self.max_drawdown = min(self.max_drawdown, self.drawdown)
+        if self.drawdown < 0:
+            self.underwater_bars += 1
+            self.drawdown_bars += 1
+            self.longest_drawdown_bars = max(self.longest_drawdown_bars, self.drawdown_bars)
+        else:
+            self.drawdown_bars = 0
+
+    def update_array(self, equity) -> None:
+        equity = np.asarray(equity, dtype=float)
+        n = len(equity)
+        if not n:
+            return
+        prev = np.empty(n)
+        prev[0] = self.last if self.bars else equity[0]
+        prev[1:] = equity[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret = equity / prev - 1
+        ret[np.isnan(ret)] = 0.0
+        self.returns.add_array(ret)
+        self.downside.add_array(ret[ret < 0])
+        self.bars += n
+        self.last = float(equity[-1])
+        peak = np.maximum(np.maximum.accumulate(equity), self.peak)
+        drawdown = equity / peak - 1
+        self.peak = float(peak[-1])
+        self.drawdown = float(drawdown[-1])
+        self.max_drawdown = min(self.max_drawdown, float(drawdown.min()))
+        under = drawdown < 0
+        self.underwater_bars += int(under.sum())
+        # longest run of underwater bars, continuing the streak carried in from the previous chunk
+        above = np.flatnonzero(~under)
+        if not len(above):
+            self.drawdown_bars += n
+            self.longest_drawdown_bars = max(self.longest_drawdown_bars, self.drawdown_bars)
+            return
+        runs = [self.drawdown_bars + int(above[0]), n - 1 - int(above[-1])]
+        if len(above) > 1:
+            runs.append(int((np.diff(above) - 1).max()))
+        self.longest_drawdown_bars = max(self.longest_drawdown_bars, *runs)
+        self.drawdown_bars = runs[1]
+
+    def add_trade(self, pnl: float) -> None:
+        self.add_trades(np.array([pnl], dtype=float))
+
+    def add_trades(self, pnl) -> None:
+        pnl = np.asarray(pnl, dtype=float)
+        if not len(pnl):
+            return
+        won = pnl > 0
+        wins, losses = pnl[won], pnl[~won]
+        self.trades += len(pnl)
+        self.wins += len(wins)
+        self.pnl_sum += float(pnl.sum())
+        self.win_sum += float(wins.sum())
+        self.loss_sum += float(losses.sum())
+        if len(wins):
+            self.largest_win = max(self.largest_win, float(wins.max()))
+        if len(losses):
+            self.largest_loss = min(self.largest_loss, float(losses.min()))
+
+    def summary(self) -> Dict:
+        # keys and definitions match BacktestResult's metric fields
+        mean = self.returns.mean if self.bars else np.nan
+        scale = math.sqrt(self.periods_per_year)
+        ann = (1 + mean) ** self.periods_per_year - 1 if self.bars else 0.0
+        max_dd = abs(self.max_drawdown)
+        losses = self.trades - self.wins
+        with np.errstate(divide="ignore", invalid="ignore"):
+            profit_factor = float(np.float64(self.win_sum) / abs(self.loss_sum)) if losses else float("inf")
+        return {
+            "final_capital": float(self.last if self.bars else self.initial_capital),
+            "total_return": float(self.last / self.initial_capital - 1 if self.bars else 0.0),
+            "annualized_return": float(ann),
+            "sharpe_ratio": float(mean / (self.returns.std + 1e-9) * scale),
+            "sortino_ratio": float(mean / (self.downside.std + 1e-9) * scale),
+            "calmar_ratio": float(ann / (max_dd + 1e-9)),
+            "max_drawdown": float(max_dd),
+            "max_drawdown_percent": float(max_dd * 100),
+            "max_drawdown_duration": int(self.underwater_bars),
+            "win_rate": float(self.wins / self.trades if self.trades else 0.0),
+            "profit_factor": profit_factor,
+            "expectancy": float(self.pnl_sum / self.trades if self.trades else 0.0),
+            "total_trades": int(self.trades),
+            "winning_trades": int(self.wins),
+            "losing_trades": int(losses),
+            "avg_win": float(self.win_sum / self.wins if self.wins else 0.0),
+            "avg_loss": float(self.loss_sum / losses if losses else 0.0),
+            "largest_win": float(self.largest_win if self.wins else 0.0),
+            "largest_loss": float(self.largest_loss if losses else 0.0),
+        }
+
+
+def drawdown_curve(equity) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    return equity / np.maximum.accumulate(equity) - 1 if len(equity) else equity
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# idx + cumulative pnl + running peak + at-peak mask + last-peak index, per resampled element
+_BYTES_PER_ELEMENT = 8 + 8 + 8 + 1 + 8
+# narrow chunks keep each scan step inside cache; the memory budget then bounds how many run at once
+_MAX_CHUNK_PATHS = 256
+
+
+@dataclass(slots=True)
+class BootstrapPaths:
+    totals: np.ndarray
+    max_drawdown: np.ndarray
+    recovery: np.ndarray
+    ruined: np.ndarray
+    underwater_at_end: np.ndarray
+
+
+def _sample_indices(rng: np.random.Generator, rows: int, n: int, block_size: Optional[int]) -> np.ndarray:
+    # paths run down axis 0 so the cumulative scans below vectorise across paths
+    if not block_size or block_size <= 1:
+        return rng.integers(0, n, size=(n, rows))
+    # circular block bootstrap: keeps serial dependence inside each block of consecutive trades
+    blocks = -(-n // block_size)
+    starts = rng.integers(0, n, size=(blocks, 1, rows))
+    idx = starts + np.arange(block_size)[:, None]
+    np.remainder(idx, n, out=idx)
+    return idx.reshape(blocks * block_size, rows)[:n]
+
+
+def _bootstrap_chunk(pnl: np.ndarray, rows: int, seed: np.random.SeedSequence, block_size: Optional[int], ruin_level: float) -> BootstrapPaths:
+    rng = np.random.default_rng(seed)
+    n = len(pnl)
+    cum = pnl[_sample_indices(rng, rows, n, block_size)]
+    np.cumsum(cum, axis=0, out=cum)
+    peak = np.maximum.accumulate(cum, axis=0)
+    np.maximum(peak, 0.0, out=peak)
+    ruined = cum.min(axis=0) <= ruin_level
+    at_peak = cum >= peak
+    steps = np.arange(1, n + 1)[:, None]
+    last_peak = np.where(at_peak, steps, 0)
+    np.maximum.accumulate(last_peak, axis=0, out=last_peak)
+    np.subtract(steps, last_peak, out=last_peak)
+    recovery = last_peak.max(axis=0)
+    underwater_at_end = ~at_peak[-1]
+    np.subtract(peak, cum, out=peak)
+    return BootstrapPaths(cum[-1].copy(), peak.max(axis=0), recovery, ruined, underwater_at_end)
+
+
+async def bootstrap(pnl: np.ndarray, iterations: int, block_size: Optional[int] = None, ruin_level: float = -np.inf, memory_budget_mb: float = 256, max_workers: Optional[int] = None, seed=None) -> BootstrapPaths:
+    workers = max_workers or os.cpu_count() or 1
+    budget = memory_budget_mb * 1024 * 1024 / workers
+    rows = int(max(1, min(iterations, _MAX_CHUNK_PATHS, budget // (len(pnl) * _BYTES_PER_ELEMENT))))
+    sizes = [min(rows, iterations - k) for k in range(0, iterations, rows)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunks: List[BootstrapPaths] = await asyncio.gather(*(loop.run_in_executor(pool, _bootstrap_chunk, pnl, size, s, block_size, ruin_level) for size, s in zip(sizes, seeds)))
+    return BootstrapPaths(*(np.concatenate([getattr(c, f) for c in chunks]) for f in BootstrapPaths.__slots__))
+
+
+def quantile_summary(values: np.ndarray, levels=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)) -> Dict[str, float]:
+    return {str(q): float(v) for q, v in zip(levels, np.quantile(values, levels))}
+
+
+def histogram_summary(values: np.ndarray, bins: int = 50) -> Dict[str, List[float]]:
+    counts, edges = np.histogram(values, bins=bins)
+    return {"edges": edges.tolist(), "counts": counts.tolist()}
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from itertools import product
+from numbers import Real
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from scipy.stats import norm
+
+
+class TrialPruned(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class Trial:
+    params: Dict
+    # share of the in-sample window the trial is scored on; successive halving grows it per rung
+    fraction: float = 1.0
+
+
+@dataclass(slots=True)
+class _Space:
+    keys: List[str]
+    values: List[list]
+    numeric: List[bool]
+    dims: tuple = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.dims = tuple(len(v) for v in self.values)
+
+    @classmethod
+    def build(cls, param_space: Dict[str, Sequence]) -> "_Space":
+        keys = list(param_space)
+        values, numeric = [], []
+        for k in keys:
+            vals = list(dict.fromkeys(param_space[k]))
+            is_num = all(isinstance(v, Real) and not isinstance(v, bool) for v in vals)
+            values.append(sorted(vals) if is_num else vals)
+            numeric.append(is_num)
+        return cls(keys, values, numeric)
+
+    @property
+    def size(self) -> int:
+        return math.prod(self.dims)
+
+    def params(self, point: Sequence[int]) -> Dict:
+        return {k: v[i] for k, v, i in zip(self.keys, self.values, point)}
+
+    def sample_distinct(self, rng: np.random.Generator, n: int, exclude=()) -> List[tuple]:
+        free = self.size - len(exclude)
+        n = min(n, free)
+        if n <= 0:
+            return []
+        if self.size <= 1_000_000:
+            flat = np.setdiff1d(np.arange(self.size), np.array([np.ravel_multi_index(p, self.dims) for p in exclude], dtype=np.int64)) if exclude else np.arange(self.size)
+            picks = rng.choice(flat, size=n, replace=False)
+            return [tuple(int(x) for x in p) for p in zip(*np.unravel_index(picks, self.dims))]
+        out, seen = [], set(exclude)
+        while len(out) < n:
+            point = tuple(int(rng.integers(0, d)) for d in self.dims)
+            if point not in seen:
+                seen.add(point)
+                out.append(point)
+        return out
+
+
+class Optimizer(ABC):
+    # ask/tell loop: the walk-forward driver evaluates whatever ask() hands out (in parallel) and reports
+    # Sharpe ratios back through tell() until ask() returns nothing. Pruned trials score -inf.
+    def __init__(self, param_space: Dict[str, Sequence], budget: int, seed=None) -> None:
+        self.space = _Space.build(param_space)
+        self.budget = int(budget)
+        self.rng = np.random.default_rng(seed)
+        self.best_params: Dict = {}
+        self.best_score = -np.inf
+        self.evaluations = 0
+        self.full_evaluations = 0
+
+    @abstractmethod
+    def ask(self, parallelism: int = 1) -> List[Trial]:
+        raise NotImplementedError
+
+    def tell(self, trials: List[Trial], scores: Sequence[float]) -> None:
+        for trial, score in zip(trials, scores):
+            self.evaluations += 1
+            if trial.fraction < 1.0:
+                continue
+            self.full_evaluations += 1
+            if score > self.best_score:
+                self.best_score = score
+                self.best_params = trial.params
+
+
+class RandomSearch(Optimizer):
+    # independent draws per key from the global numpy RNG, as walk-forward always did: duplicates included
+    def __init__(self, param_space, budget, seed=None) -> None:
+        super().__init__(param_space, budget, seed)
+        self._pending = [Trial({k: np.random.choice(v) for k, v in param_space.items()}) for _ in range(self.budget)]
+
+    def ask(self, parallelism: int = 1) -> List[Trial]:
+        pending, self._pending = self._pending, []
+        return pending
+
+
+class GridSearch(Optimizer):
+    def __init__(self, param_space, budget, seed=None) -> None:
+        super().__init__(param_space, budget, seed)
+        points = list(product(*(range(d) for d in self.space.dims)))
+        if len(points) > self.budget:
+            keep = np.sort(self.rng.choice(len(points), size=self.budget, replace=False))
+            points = [points[i] for i in keep]
+        self._pending = [Trial(self.space.params(p)) for p in points]
+
+    def ask(self, parallelism: int = 1) -> List[Trial]:
+        pending, self._pending = self._pending, []
+        return pending
+
+
+class SuccessiveHalving(Optimizer):
+    # Rung k scores n / eta**k configurations on the first eta**(k - K) of the in-sample window and keeps the
+    # best 1/eta. Every rung costs the same in full-backtest equivalents, so the budget buys
+    # budget * eta**K / (K + 1) starting configurations and only about budget / (K + 1) full runs.
+    def __init__(self, param_space, budget, seed=None, eta: int = 3, min_fraction: float = 1 / 9) -> None:
+        super().__init__(param_space, budget, seed)
+        self.eta = int(eta)
+        self.rungs = max(0, int(math.floor(math.log(1 / min_fraction, self.eta) + 1e-9)))
+        n = max(1, int(self.budget * self.eta**self.rungs / (self.rungs + 1)))
+        self._points = self.space.sample_distinct(self.rng, n)
+        while self.rungs and len(self._points) < self.eta**self.rungs:
+            self.rungs -= 1
+        self._rung = 0
+        self._asked = False
+
+    def ask(self, parallelism: int = 1) -> List[Trial]:
+        if self._asked or not self._points:
+            return []
+        self._asked = True
+        fraction = float(self.eta ** (self._rung - self.rungs))
+        return [Trial(self.space.params(p), fraction) for p in self._points]
+
+    def tell(self, trials, scores) -> None:
+        super().tell(trials, scores)
+        if self._rung >= self.rungs:
+            self._points = []
+            return
+        keep = max(1, len(self._points) // self.eta)
+        order = np.argsort(-np.nan_to_num(np.asarray(scores, dtype=float), nan=-np.inf), kind="stable")[:keep]
+        self._points = [self._points[i] for i in order]
+        self._rung += 1
+        self._asked = False
+
+
+class TPESearch(Optimizer):
+    # Tree-structured Parzen estimator over the discrete grid: after a random start-up phase, observations are
+    # split at the gamma quantile of Sharpe into good/bad sets, each key gets a Parzen density per set
+    # (Gaussian kernels over the sorted positions of numeric values, smoothed counts for categoricals), and the
+    # unseen candidates drawn from the good density with the highest l(x) / g(x) are evaluated next.
+    def __init__(self, param_space, budget, seed=None, n_startup: Optional[int] = None, gamma: float = 0.25, n_candidates: int = 64) -> None:
+        super().__init__(param_space, budget, seed)
+        self.n_startup = int(n_startup) if n_startup is not None else max(5, min(10, self.budget // 5))
+        self.gamma = float(gamma)
+        self.n_candidates = int(n_candidates)
+        self._points: List[tuple] = []
+        self._scores: List[float] = []
+        self._seen: set = set()
+
+    def ask(self, parallelism: int = 1) -> List[Trial]:
+        remaining = min(self.budget - len(self._seen), self.space.size - len(self._seen))
+        if remaining <= 0:
+            return []
+        if len(self._points) < self.n_startup:
+            points = self.space.sample_distinct(self.rng, min(remaining, self.n_startup - len(self._points)), self._seen)
+        else:
+            points = self._suggest(min(remaining, max(1, parallelism)))
+        self._seen.update(points)
+        return [Trial(self.space.params(p)) for p in points]
+
+    def tell(self, trials, scores) -> None:
+        super().tell(trials, scores)
+        lookup = {tuple(self.space.values[j].index(t.params[k]) for j, k in enumerate(self.space.keys)): s for t, s in zip(trials, scores)}
+        for point, score in lookup.items():
+            self._points.append(point)
+            self._scores.append(float(score) if np.isfinite(score) else -np.inf)
+
+    def _density(self, j: int, obs: np.ndarray) -> np.ndarray:
+        k = self.space.dims[j]
+        positions = np.arange(k)
+        if self.space.numeric[j] and k > 1:
+            bandwidth = max(0.5, k / (1.0 + len(obs)) ** 0.8)
+            weights = norm.pdf(positions[:, None], loc=obs[None, :], scale=bandwidth).sum(axis=1) if len(obs) else np.zeros(k)
+        else:
+            weights = np.bincount(obs, minlength=k).astype(float)
+        weights += 1.0 / k
+        return weights / weights.sum()
+
+    def _suggest(self, n: int) -> List[tuple]:
+        points = np.array(self._points, dtype=np.int64).reshape(len(self._points), len(self.space.dims))
+        order = np.argsort(-np.asarray(self._scores), kind="stable")
+        n_good = max(1, int(math.ceil(self.gamma * len(order))))
+        good, bad = points[order[:n_good]], points[order[n_good:]]
+        candidates = np.empty((self.n_candidates, len(self.space.dims)), dtype=np.int64)
+        score = np.zeros(self.n_candidates)
+        for j, k in enumerate(self.space.dims):
+            l, g = self._density(j, good[:, j]), self._density(j, bad[:, j])
+            candidates[:, j] = self.rng.choice(k, size=self.n_candidates, p=l)
+            score += np.log(l[candidates[:, j]]) - np.log(g[candidates[:, j]])
+        out = []
+        for i in np.argsort(-score, kind="stable"):
+            point = tuple(int(x) for x in candidates[i])
+            if point not in self._seen and point not in out:
+                out.append(point)
+                if len(out) == n:
+                    return out
+        return out + self.space.sample_distinct(self.rng, n - len(out), self._seen | set(out))
+
+
+OPTIMIZERS: Dict[str, type] = {"random": RandomSearch, "grid": GridSearch, "halving": SuccessiveHalving, "tpe": TPESearch}
+
+
+def make_optimizer(optimizer: Union[str, Callable[..., Optimizer]], param_space: Dict[str, Sequence], budget: int, seed=None) -> Optimizer:
+    if isinstance(optimizer, str):
+        if optimizer not in OPTIMIZERS:
+            raise ValueError(f"unknown optimizer {optimizer!r}; expected one of {sorted(OPTIMIZERS)}")
+        optimizer = OPTIMIZERS[optimizer]
+    return optimizer(param_space, budget, seed=seed)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from backtest_service.src.engine.vectorized import SIGNAL_CLOSE, SIGNAL_NONE, encode_signals, pair_signals
+
+PANEL_FIELDS = ("open", "high", "low", "close", "volume", "volatility")
+
+
+@dataclass(slots=True)
+class Panel:
+    index: pd.DatetimeIndex
+    symbols: List[str]
+    fields: Dict[str, np.ndarray]
+    valid: np.ndarray
+
+    def __getattr__(self, name):
+        try:
+            return object.__getattribute__(self, "fields")[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def frame(self, name: str) -> pd.DataFrame:
+        return pd.DataFrame(self.fields[name], index=self.index, columns=self.symbols, copy=False)
+
+
+def align_panel(data: Dict[str, pd.DataFrame]) -> Panel:
+    # as-of join onto the union of timestamps: each symbol carries its last bar forward, and rows
+    # before a symbol's first bar are marked invalid so no signal can trade them
+    symbols = list(data)
+    frames = {s: (df if df.index.is_monotonic_increasing else df.sort_index()) for s, df in data.items()}
+    frames = {s: df[~df.index.duplicated(keep="last")] for s, df in frames.items()}
+    index = frames[symbols[0]].index
+    for s in symbols[1:]:
+        index = index.union(frames[s].index)
+    rows = np.column_stack([frames[s].index.searchsorted(index, side="right") - 1 for s in symbols]) if symbols else np.empty((0, 0), dtype=np.int64)
+    valid = rows >= 0
+    safe = np.maximum(rows, 0)
+    fields = {}
+    for name in PANEL_FIELDS:
+        if not any(name in frames[s].columns for s in symbols):
+            continue
+        cols = []
+        for j, s in enumerate(symbols):
+            df = frames[s]
+            source = df[name].to_numpy(dtype=float) if name in df.columns else (df["close"].to_numpy(dtype=float) if name in ("open", "high", "low") else np.full(len(df), np.nan))
+            cols.append(source[safe[:, j]] if len(source) else np.full(len(index), np.nan))
+        matrix = np.column_stack(cols)
+        matrix[~valid] = np.nan
+        fields[name] = matrix
+    return Panel(index=index, symbols=symbols, fields=fields, valid=valid)
+
+
+@dataclass(slots=True)
+class PortfolioCosts:
+    qty: np.ndarray
+    commission_models: List
+    slippage_models: List
+    asset_classes: List[str]
+
+
+def _price_trades(engine, panel: Panel, codes: np.ndarray, costs: PortfolioCosts, commission: bool, slippage: bool) -> Dict[str, np.ndarray]:
+    n = len(panel)
+    close = panel.close
+    volatility = panel.fields.get("volatility")
+    cols, entry_rows, exit_rows = pair_signals(codes)
+    closed = exit_rows < n
+    exit_px_rows = np.where(closed, exit_rows, n - 1)
+    direction = codes[entry_rows, cols].astype(float)
+    qty = costs.qty[cols]
+    entry_px = close[entry_rows, cols]
+    exit_px = close[exit_px_rows, cols]
+    fees = np.zeros(len(cols))
+    required = np.zeros(len(cols))
+    # cost models are per symbol, so evaluate them column by column on that symbol's trades
+    for j in np.unique(cols):
+        sel = cols == j
+        if slippage:
+            vol_in = None if volatility is None else volatility[entry_rows[sel], j]
+            vol_out = None if volatility is None else volatility[exit_px_rows[sel], j]
+            entry_px[sel] = entry_px[sel] + costs.slippage_models[j].calculate_array(close[entry_rows[sel], j], qty[sel], vol_in) * direction[sel]
+            exit_px[sel] = exit_px[sel] - costs.slippage_models[j].calculate_array(close[exit_px_rows[sel], j], qty[sel], vol_out) * direction[sel]
+        if commission:
+            fees[sel] = costs.commission_models[j].calculate_array(qty[sel], exit_px[sel])
+        required[sel] = engine.margin_model.calculate_required_array(panel.symbols[j], qty[sel], close[entry_rows[sel], j], costs.asset_classes[j])
+    pnl = np.where(closed, (exit_px - entry_px) * qty * direction - fees, 0.0)
+    return {"cols": cols, "entry_rows": entry_rows, "exit_rows": exit_rows, "closed": closed, "direction": direction, "qty": qty, "entry": entry_px, "exit": exit_px, "commission": fees, "pnl": pnl, "required": required}
+
+
+def _first_margin_violation(legs: Dict[str, np.ndarray], n: int, m: int, initial_capital: float) -> int:
+    # within a bar, symbols are processed in column order: an exit at (t, j) settles before an entry at (t, k > j)
+    entry_keys = legs["entry_rows"] * m + legs["cols"]
+    exit_keys = np.where(legs["closed"], legs["exit_rows"] * m + legs["cols"], n * m + legs["cols"])
+    x_order = np.argsort(exit_keys, kind="stable")
+    e_order = np.argsort(entry_keys, kind="stable")
+    realized = np.concatenate([[0.0], np.cumsum(legs["pnl"][x_order])])
+    released = np.concatenate([[0.0], np.cumsum(legs["required"][x_order])])
+    committed = np.concatenate([[0.0], np.cumsum(legs["required"][e_order])])
+    settled = np.searchsorted(exit_keys[x_order], entry_keys, side="left")
+    opened = np.searchsorted(entry_keys[e_order], entry_keys, side="left")
+    free = initial_capital + realized[settled] - (committed[opened] - released[settled])
+    rejected = np.flatnonzero(legs["required"] > free)
+    return int(entry_keys[rejected].min()) if len(rejected) else -1
+
+
+def _replay_from(engine, panel: Panel, codes: np.ndarray, legs: Dict[str, np.ndarray], costs: PortfolioCosts, start_key: int, initial_capital: float, commission: bool, slippage: bool) -> Dict[str, np.ndarray]:
+    # Once shared margin rejects an entry, later fills depend on the order of every symbol's events,
+    # so replay the remaining non-empty signals sequentially. Costs are still priced per event in bulk.
+    n, m = codes.shape
+    close = panel.close
+    volatility = panel.fields.get("volatility")
+    entry_keys = legs["entry_rows"] * m + legs["cols"]
+    exit_keys = np.where(legs["closed"], legs["exit_rows"] * m + legs["cols"], n * m + legs["cols"])
+    done = exit_keys < start_key
+    carried = (entry_keys < start_key) & ~done
+    equity = initial_capital + float(legs["pnl"][done].sum())
+    used = float(legs["required"][carried].sum())
+    positions: Dict[int, tuple] = {int(legs["cols"][k]): (int(legs["entry_rows"][k]), float(legs["direction"][k]), float(legs["entry"][k]), float(legs["required"][k])) for k in np.flatnonzero(carried)}
+
+    flat = codes.reshape(-1)
+    keys = np.flatnonzero(flat[start_key:]) + start_key
+    rows, cols = np.divmod(keys, m)
+    values = flat[keys]
+    prices = close[rows, cols]
+    slip = np.zeros(len(keys))
+    required = np.zeros(len(keys))
+    for j in np.unique(cols):
+        sel = cols == j
+        if slippage:
+            slip[sel] = costs.slippage_models[j].calculate_array(prices[sel], costs.qty[j], None if volatility is None else volatility[rows[sel], j])
+        required[sel] = engine.margin_model.calculate_required_array(panel.symbols[j], costs.qty[j], prices[sel], costs.asset_classes[j])
+
+    out = {k: [] for k in ("cols", "entry_rows", "exit_rows", "direction", "qty", "entry", "exit", "pnl", "commission")}
+    for row, col, code, price, s, req in zip(rows.tolist(), cols.tolist(), values.tolist(), prices.tolist(), slip.tolist(), required.tolist()):
+        position = positions.get(col)
+        if position is None:
+            if code == SIGNAL_CLOSE or req > equity - used:
+                continue
+            positions[col] = (row, float(code), price + s * code, req)
+            used += req
+        elif code == SIGNAL_CLOSE:
+            entry_row, direction, entry_px, entry_req = positions.pop(col)
+            qty = float(costs.qty[col])
+            exit_px = price - s * direction
+            fee = costs.commission_models[col].calculate(qty, exit_px) if commission else 0.0
+            pnl = (exit_px - entry_px) * qty * direction - fee
+            equity += pnl
+            used -= entry_req
+            for name, value in zip(out, (col, entry_row, row, direction, qty, entry_px, exit_px, pnl, fee)):
+                out[name].append(value)
+
+    replayed = {name: np.asarray(values_) for name, values_ in out.items()}
+    prefix = {name: legs[name][done] for name in out}
+    return {name: np.concatenate([prefix[name], replayed[name].astype(prefix[name].dtype, copy=False)]) for name in out}
+
+
+def simulate_portfolio(engine, panel: Panel, raw_signals, costs: PortfolioCosts, initial_capital: float, commission: bool, slippage: bool, margin: bool):
+    n, m = len(panel), len(panel.symbols)
+    codes = encode_signals(raw_signals[panel.symbols].to_numpy() if isinstance(raw_signals, pd.DataFrame) else raw_signals, n).reshape(n, m).copy()
+    codes[~panel.valid] = SIGNAL_NONE
+    legs = _price_trades(engine, panel, codes, costs, commission, slippage)
+    violation = _first_margin_violation(legs, n, m, initial_capital) if margin and len(legs["cols"]) else -1
+    if violation >= 0:
+        trades = _replay_from(engine, panel, codes, legs, costs, violation, initial_capital, commission, slippage)
+    else:
+        trades = {name: legs[name][legs["closed"]] for name in ("cols", "entry_rows", "exit_rows", "direction", "qty", "entry", "exit", "pnl", "commission")}
+
+    bar_pnl = np.bincount(trades["exit_rows"], weights=trades["pnl"], minlength=n) if n else np.zeros(0)
+    equity_curve = initial_capital + np.cumsum(bar_pnl)
+    order = np.lexsort((trades["cols"], trades["exit_rows"]))
+    return equity_curve, {name: values[order] for name, values in trades.items()}
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "bid", "ask")
+
+
+@dataclass(slots=True)
+class Transform:
+    type: str
+    params: Dict = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class Scenario:
+    name: str
+    transforms: List[Transform]
+
+    @property
+    def type(self) -> str:
+        return "+".join(t.type for t in self.transforms)
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> "Scenario":
+        # {"name", "type", **params} as stress_test always took, or {"name", "transforms": [{"type", **params}, ...]}
+        steps = spec.get("transforms") or [spec]
+        transforms = []
+        for step in steps:
+            kind = step.get("type")
+            if kind not in TRANSFORMS:
+                raise ValueError(f"unknown scenario type {kind!r}; expected one of {sorted(TRANSFORMS)}")
+            transforms.append(Transform(kind, {k: v for k, v in step.items() if k not in ("name", "type", "transforms")}))
+        return cls(str(spec.get("name", "scenario")), transforms)
+
+
+class ScenarioFrame:
+    # Columns start as read-only views of the shared base frame; a transform replaces only the columns it
+    # changes, so a scenario costs one new array per touched column and nothing is built until it runs.
+    def __init__(self, base: pd.DataFrame, engine) -> None:
+        self.index = base.index
+        self.columns: Dict[str, np.ndarray] = {c: base[c].to_numpy() for c in base.columns}
+        self.engine = engine
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def window(self, start=None, end=None) -> Tuple[int, int]:
+        lo = 0 if start is None else int(self.index.searchsorted(pd.Timestamp(start), side="left"))
+        hi = len(self) if end is None else int(self.index.searchsorted(pd.Timestamp(end), side="right"))
+        return lo, max(lo, hi)
+
+    def scale(self, names, factor: float, lo: int, hi: int) -> None:
+        for name in names:
+            if name in self.columns:
+                values = self.columns[name].astype(float, copy=True)
+                values[lo:hi] *= factor
+                self.columns[name] = values
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns, index=self.index, copy=False)
+
+
+def _price_shock(f: ScenarioFrame, shock: float = -0.1, start=None, end=None) -> None:
+    f.scale(PRICE_COLUMNS, 1 + float(shock), *f.window(start, end))
+
+
+def _volatility_spike(f: ScenarioFrame, multiplier: float = 2, start=None, end=None) -> None:
+    if "volatility" not in f.columns:
+        f.columns["volatility"] = np.full(len(f), 0.01)
+    f.scale(("volatility",), float(multiplier), *f.window(start, end))
+
+
+def _gap(f: ScenarioFrame, size: float = -0.05, at=None) -> None:
+    # prices jump by `size` at bar `at` (the middle bar by default) and carry on from the new level
+    lo = len(f) // 2 if at is None else f.window(at)[0]
+    f.scale(PRICE_COLUMNS, 1 + float(size), lo, len(f))
+
+
+def _spread_widening(f: ScenarioFrame, multiplier: float = 3) -> None:
+    m = float(multiplier)
+    # bar fills pay the spread through the slippage model; quote columns widen around their mid
+    f.engine = copy.copy(f.engine)
+    f.engine.slippage_model = replace(f.engine.slippage_model, base_slippage=f.engine.slippage_model.base_slippage * m)
+    if "spread" in f.columns:
+        f.scale(("spread",), m, 0, len(f))
+    if "bid" in f.columns and "ask" in f.columns:
+        bid, ask = f.columns["bid"].astype(float), f.columns["ask"].astype(float)
+        mid, half = (bid + ask) / 2, (ask - bid) / 2 * m
+        f.columns["bid"], f.columns["ask"] = mid - half, mid + half
+
+
+TRANSFORMS: Dict[str, Callable] = {"price_shock": _price_shock, "volatility_spike": _volatility_spike, "gap": _gap, "spread_widening": _spread_widening}
+
+
+def apply(scenario: Scenario, base: pd.DataFrame, engine) -> Tuple[pd.DataFrame, object]:
+    f = ScenarioFrame(base, engine)
+    for t in scenario.transforms:
+        TRANSFORMS[t.type](f, **t.params)
+    return f.frame(), f.engine
+
+
+def parse(scenarios: List[Dict | Scenario]) -> List[Scenario]:
+    return [s if isinstance(s, Scenario) else Scenario.from_dict(s) for s in scenarios]
+
+
+RESULT_COLUMNS = ("total_return", "annualized_return", "max_drawdown", "max_drawdown_duration", "sharpe_ratio", "sortino_ratio", "calmar_ratio", "final_capital", "total_trades", "win_rate", "profit_factor")
+
+
+def result_row(scenario: Optional[Scenario], result) -> Dict:
+    head = {"scenario": scenario.name, "type": scenario.type} if scenario is not None else {"scenario": "baseline", "type": "baseline"}
+    return {**head, **{c: getattr(result, c) for c in RESULT_COLUMNS}}
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+@dataclass(slots=True)
+class Bar:
+    time: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 1.0
+    volatility: Optional[float] = None
+
+
+class RollingWindow:
+    # Each value is written twice into a buffer of 2 * size, so the latest `size` values are always
+    # one contiguous slice: reads are zero-copy views and pushes are O(1) regardless of history length.
+    def __init__(self, size: int, fields: Iterable[str] = BAR_FIELDS) -> None:
+        if size <= 0:
+            raise ValueError("window size must be positive")
+        self.size = int(size)
+        self._buffers: Dict[str, np.ndarray] = {f: np.full(2 * self.size, np.nan) for f in fields}
+        self._pos = 0
+        self._count = 0
+
+    def push(self, bar: Bar) -> None:
+        i, j = self._pos, self._pos + self.size
+        for name, buf in self._buffers.items():
+            value = getattr(bar, name)
+            buf[i] = value
+            buf[j] = value
+        self._pos = (i + 1) % self.size
+        self._count += 1
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        end = self._pos + self.size
+        view = self._buffers[name][end - len(self) : end]
+        view.flags.writeable = False
+        return view
+
+    def last(self, name: str, back: int = 0) -> float:
+        if back >= len(self):
+            raise IndexError("not enough bars in window")
+        return float(self._buffers[name][self._pos + self.size - 1 - back])
+
+    def __len__(self) -> int:
+        return min(self._count, self.size)
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.size
+
+    @property
+    def bars_seen(self) -> int:
+        return self._count
+
+    def reset(self) -> None:
+        for buf in self._buffers.values():
+            buf.fill(np.nan)
+        self._pos = 0
+        self._count = 0
+
+
+@dataclass(slots=True)
+class StrategyState:
+    window: RollingWindow
+    params: Dict = field(default_factory=dict)
+    position: Optional[Dict] = None
+    equity: float = 0.0
+    bar_index: int = -1
+    memory: Dict = field(default_factory=dict)
+    # streaming indicators (indicators.SMA, EMA, ATR, RSI, Volatility) by name; the runner updates every one
+    # with each bar before on_bar, so strategies read `.value` in O(1) instead of recomputing over the window
+    indicators: Dict = field(default_factory=dict)
+    _feeds: List[Tuple] = field(default_factory=list, repr=False)
+
+    def indicator(self, name: str, indicator=None, *fields: str):
+        # Registers `indicator` under `name` (fed `fields`, default its `inputs`) and returns it; an existing
+        # name returns the registered one. Registered after bars have arrived (e.g. on the first on_bar), it is
+        # first caught up on the bars still in the window, the current one included.
+        if name in self.indicators or indicator is None:
+            return self.indicators[name]
+        fields = fields or indicator.inputs
+        for row in zip(*(self.window[f] for f in fields)):
+            indicator.update(*map(float, row))
+        self.indicators[name] = indicator
+        self._feeds.append((indicator, fields))
+        return indicator
+
+    def update_indicators(self, bar: Bar) -> None:
+        for indicator, fields in self._feeds:
+            indicator.update(*(getattr(bar, f) for f in fields))
+
+
+class Strategy(ABC):
+    window_size: int = 100
+
+    def on_start(self, state: StrategyState) -> None:
+        pass
+
+    @abstractmethod
+    def on_bar(self, bar: Bar, state: StrategyState) -> Optional[str]:
+        raise NotImplementedError
+
+
+class StrategyRunner:
+    # Drives a Strategy one bar at a time; the backtest loop and live feeds both go through here.
+    def __init__(self, strategy, params: Optional[Dict] = None, window_size: Optional[int] = None) -> None:
+        self.strategy = strategy
+        size = window_size or int(getattr(strategy, "window_size", Strategy.window_size))
+        self.state = StrategyState(window=RollingWindow(size), params=dict(params or {}))
+
+    def start(self, equity: float = 0.0) -> StrategyState:
+        self.state.window.reset()
+        self.state.position = None
+        self.state.equity = float(equity)
+        self.state.bar_index = -1
+        self.state.memory.clear()
+        self.state.indicators.clear()
+        self.state._feeds.clear()
+        self.strategy.on_start(self.state)
+        return self.state
+
+    def on_bar(self, bar: Bar) -> Optional[str]:
+        self.state.window.push(bar)
+        self.state.update_indicators(bar)
+        self.state.bar_index += 1
+        return self.strategy.on_bar(bar, self.state)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields, is_dataclass
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest_service.src.engine.vectorized import encode_signals, simulate_signals
+
+TICK_COLUMNS = ("bid", "ask")
+
+
+@dataclass(slots=True)
+class OpenPosition:
+    # a position still open at the end of a chunk; replayed as a synthetic first tick of the next chunk
+    direction: int
+    time: pd.Timestamp
+    bid: float
+    ask: float
+    volatility: float
+
+
+def _frame(chunk) -> pd.DataFrame:
+    # accepts frames shaped like the ticks hypertable (time column or DatetimeIndex) or sequences of Tick objects
+    if not isinstance(chunk, pd.DataFrame):
+        rows = list(chunk)
+        if rows and is_dataclass(rows[0]):
+            names = [f.name for f in fields(rows[0])]
+            chunk = pd.DataFrame([[getattr(r, n) for n in names] for r in rows], columns=names)
+        else:
+            chunk = pd.DataFrame(rows)
+    if "time" in chunk.columns:
+        chunk = chunk.set_index("time")
+    if not isinstance(chunk.index, pd.DatetimeIndex):
+        chunk.index = pd.DatetimeIndex(chunk.index)
+    missing = [c for c in TICK_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"tick chunks need {TICK_COLUMNS} columns; missing {missing}")
+    return chunk
+
+
+def _split(frame: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # row slices, normalized one at a time, so a large frame is never copied whole
+    for start in range(0, len(frame), chunk_size):
+        yield _frame(frame.iloc[start : start + chunk_size])
+
+
+def iter_chunks(source, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # no chunk is longer than chunk_size, whatever the source hands over
+    if isinstance(source, pd.DataFrame):
+        yield from _split(source, chunk_size)
+        return
+    batch: List = []
+    for item in source:
+        if isinstance(item, pd.DataFrame):
+            if batch:
+                yield _frame(batch)
+                batch = []
+            yield from _split(item, chunk_size)
+        else:
+            batch.append(item)
+            if len(batch) >= chunk_size:
+                yield _frame(batch)
+                batch = []
+    if batch:
+        yield _frame(batch)
+
+
+async def aiter_chunks(source, chunk_size: int) -> AsyncIterator[pd.DataFrame]:
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            for chunk in _split(item if isinstance(item, pd.DataFrame) else _frame(item), chunk_size):
+                yield chunk
+        return
+    for chunk in iter_chunks(source, chunk_size):
+        yield chunk
+
+
+class TickSimulator:
+    # Streams tick chunks through the vectorized fill engine, carrying equity, the open position and the
+    # strategy's lookback ticks across chunk boundaries. Only closed trades and a resampled equity curve are
+    # kept, so memory is bounded by the chunk size rather than the length of the tick history.
+    def __init__(self, engine, strategy, qty: float, initial_capital: float, commission: bool, slippage: bool, margin: bool, lookback: int, equity_freq: str, strategy_params: Dict) -> None:
+        self.engine = engine
+        self.strategy = strategy
+        self.qty = qty
+        self.equity = float(initial_capital)
+        self.commission, self.slippage, self.margin = commission, slippage, margin
+        self.lookback = int(lookback)
+        self.equity_freq = equity_freq
+        self.strategy_params = strategy_params
+        self.position: Optional[OpenPosition] = None
+        self.history: Optional[pd.DataFrame] = None
+        self.last_time: Optional[pd.Timestamp] = None
+        self.curves: List[pd.Series] = []
+        self.trades: List[Dict] = []
+        self.ticks = 0
+
+    def feed(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+        if not chunk.index.is_monotonic_increasing or (self.last_time is not None and chunk.index[0] < self.last_time):
+            raise ValueError("tick chunks must arrive in time order")
+        self.last_time = chunk.index[-1]
+        self.ticks += len(chunk)
+        context = chunk if self.history is None or not self.lookback else pd.concat([self.history, chunk])
+        raw = self.strategy(context, **self.strategy_params)
+        codes = encode_signals(raw, len(context))[len(context) - len(chunk) :]
+        if self.lookback:
+            self.history = context.iloc[-self.lookback :]
+
+        bid = chunk["bid"].to_numpy(dtype=float)
+        ask = chunk["ask"].to_numpy(dtype=float)
+        volatility = chunk["volatility"].to_numpy(dtype=float) if "volatility" in chunk.columns else None
+        times = chunk.index
+        carry = self.position
+        if carry is not None:
+            # the open position re-enters on a synthetic tick priced at its original quotes, which reproduces its
+            # entry fill exactly (equity has not moved since, so the margin check passes again)
+            codes = np.concatenate([[carry.direction], codes]).astype(np.int8)
+            bid = np.concatenate([[carry.bid], bid])
+            ask = np.concatenate([[carry.ask], ask])
+            volatility = None if volatility is None else np.concatenate([[carry.volatility], volatility])
+            times = pd.DatetimeIndex([carry.time]).append(times)
+        curve, fills = simulate_signals(self.engine, codes, bid, volatility, self.qty, self.equity, self.commission, self.slippage, self.margin, quotes=(bid, ask))
+        real = slice(1, None) if carry is not None else slice(None)
+        self.curves.append(pd.Series(curve[real], index=times[real]).resample(self.equity_freq).last())
+        fills["qty"] = np.full(len(fills["pnl"]), self.qty)
+        self.trades.extend(self.engine._trade_log(times, fills, None, False))
+        self.equity = float(curve[-1]) if len(curve) else self.equity
+        row = fills["open_entry_row"]
+        self.position = None if row < 0 else OpenPosition(int(codes[row]), times[row], float(bid[row]), float(ask[row]), np.nan if volatility is None else float(volatility[row]))
+
+    def equity_curve(self) -> pd.Series:
+        if not self.curves:
+            return pd.Series(dtype=float)
+        curve = pd.concat(self.curves)
+        return curve.groupby(level=0).last().ffill()
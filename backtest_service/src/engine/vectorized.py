@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_NONE = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_CLOSE = 2
+
+_SIGNAL_NAMES = {"buy": SIGNAL_BUY, "sell": SIGNAL_SELL, "close": SIGNAL_CLOSE}
+_VALID_CODES = np.array([SIGNAL_NONE, SIGNAL_BUY, SIGNAL_SELL, SIGNAL_CLOSE])
+
+
+def encode_signals(raw, length: int) -> np.ndarray:
+    if isinstance(raw, pd.DataFrame):
+        raw = raw["signal"]
+    arr = np.asarray(raw)
+    if arr.shape[0] != length:
+        raise ValueError(f"strategy returned {arr.shape[0]} signals for {length} bars")
+    if arr.dtype.kind in "biuf":
+        codes = np.nan_to_num(arr.astype(float, copy=False), nan=SIGNAL_NONE).astype(np.int8)
+        if not np.isin(codes, _VALID_CODES).all():
+            raise ValueError("numeric signals must be one of 0 (none), 1 (buy), -1 (sell), 2 (close)")
+        return codes
+    codes = np.zeros(arr.shape, dtype=np.int8)
+    for name, code in _SIGNAL_NAMES.items():
+        codes[arr == name] = code
+    return codes
+
+
+def pair_signals(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # A position is open after bar i iff the latest non-empty signal at or before i is buy/sell, so the
+    # entry/exit state machine reduces to a forward fill along the bar axis.
+    codes2d = codes.reshape(codes.shape[0], -1)
+    n, m = codes2d.shape
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    rows = np.where(codes2d != SIGNAL_NONE, np.arange(n, dtype=np.int64)[:, None], -1)
+    last = np.maximum.accumulate(rows, axis=0)
+    filled = np.take_along_axis(codes2d, np.maximum(last, 0), axis=0)
+    is_open = (last >= 0) & ((filled == SIGNAL_BUY) | (filled == SIGNAL_SELL))
+    was_open = np.empty_like(is_open)
+    was_open[0] = False
+    was_open[1:] = is_open[:-1]
+    entry_cols, entry_rows = np.nonzero((is_open & ~was_open).T)
+    exit_cols, exit_rows = np.nonzero((was_open & ~is_open).T)
+    open_cols = np.flatnonzero(is_open[-1])
+    exit_cols = np.concatenate([exit_cols, open_cols])
+    exit_rows = np.concatenate([exit_rows, np.full(len(open_cols), n, dtype=np.int64)])
+    e_order = np.lexsort((entry_rows, entry_cols))
+    x_order = np.lexsort((exit_rows, exit_cols))
+    return entry_cols[e_order], entry_rows[e_order], exit_rows[x_order]
+
+
+def simulate_signals(engine, codes: np.ndarray, close: np.ndarray, volatility: Optional[np.ndarray], qty: float, initial_capital: float, commission: bool, slippage: bool, margin: bool, symbol: str = "SYMBOL", asset_class: str = "forex", quotes: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, dict]:
+    # quotes=(bid, ask) fills buys at the ask and sells at the bid instead of both at close
+    codes = codes.copy()
+    n = len(codes)
+    if quotes is None:
+        entry_ref = exit_long = exit_short = close
+    else:
+        bid, ask = quotes
+        entry_ref, exit_long, exit_short = np.where(codes == SIGNAL_SELL, bid, ask), bid, ask
+    while True:
+        _, entry_rows, exit_rows = pair_signals(codes)
+        closed = exit_rows < n
+        exit_rows = np.where(closed, exit_rows, n - 1)
+        direction = codes[entry_rows].astype(float)
+        entry_base = entry_ref[entry_rows]
+        exit_base = np.where(direction > 0, exit_long[exit_rows], exit_short[exit_rows])
+        entry_px = entry_base
+        exit_px = exit_base
+        if slippage:
+            entry_px = entry_px + engine.slippage_model.calculate_array(entry_base, qty, None if volatility is None else volatility[entry_rows]) * direction
+            exit_px = exit_px - engine.slippage_model.calculate_array(exit_base, qty, None if volatility is None else volatility[exit_rows]) * direction
+        fees = engine.commission_model.calculate_array(np.full(len(exit_px), qty), exit_px) if commission else np.zeros(len(exit_px))
+        pnl = (exit_px - entry_px) * qty * direction - fees
+        pnl = np.where(closed, pnl, 0.0)
+        if not margin or not len(entry_rows):
+            break
+        equity_before = np.cumsum(np.concatenate([[float(initial_capital)], pnl]))[: len(entry_rows)]
+        required = engine.margin_model.calculate_required_array(symbol, qty, entry_base, asset_class)
+        rejected = np.flatnonzero(required > equity_before)
+        if not len(rejected):
+            break
+        # equity is frozen while flat, so every candidate up to the first affordable one is rejected too
+        first = rejected[0]
+        row, equity = entry_rows[first], equity_before[first]
+        candidates = np.flatnonzero((codes == SIGNAL_BUY) | (codes == SIGNAL_SELL))
+        candidates = candidates[candidates >= row]
+        affordable = engine.margin_model.calculate_required_array(symbol, qty, entry_ref[candidates], asset_class) <= equity
+        stop = int(np.argmax(affordable)) if affordable.any() else len(candidates)
+        codes[candidates[:stop]] = SIGNAL_NONE
+
+    bar_pnl = np.zeros(n)
+    if n:
+        bar_pnl[0] = float(initial_capital)
+    bar_pnl[exit_rows[closed]] = pnl[closed]
+    equity_curve = np.cumsum(bar_pnl)
+    trades = {
+        "entry_rows": entry_rows[closed],
+        "exit_rows": exit_rows[closed],
+        "direction": direction[closed],
+        "entry": entry_px[closed],
+        "exit": exit_px[closed],
+        "pnl": pnl[closed],
+        "commission": fees[closed],
+        # entry row of a position still open after the last bar, -1 when flat
+        "open_entry_row": int(entry_rows[~closed][0]) if (~closed).any() else -1,
+        "open_direction": float(direction[~closed][0]) if (~closed).any() else 0.0,
+        "open_entry": float(entry_px[~closed][0]) if (~closed).any() else np.nan,
+    }
+    return equity_curve, trades
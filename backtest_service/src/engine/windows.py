@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(slots=True, frozen=True)
+class Window:
+    # positional bounds: train rows [train_lo, train_hi) plus [after_lo, after_hi) for folds with training
+    # data on both sides of the test block, test rows [test_lo, test_hi)
+    train_lo: int
+    train_hi: int
+    test_lo: int
+    test_hi: int
+    after_lo: int = 0
+    after_hi: int = 0
+
+    @property
+    def train(self) -> Tuple[slice, ...]:
+        return tuple(s for s in (slice(self.train_lo, self.train_hi), slice(self.after_lo, self.after_hi)) if s.stop > s.start)
+
+    @property
+    def test(self) -> slice:
+        return slice(self.test_lo, self.test_hi)
+
+    def train_positions(self) -> np.ndarray:
+        return np.concatenate([np.arange(s.start, s.stop) for s in self.train] or [np.empty(0, dtype=np.int64)])
+
+    def test_positions(self) -> np.ndarray:
+        return np.arange(self.test_lo, self.test_hi)
+
+    def take(self, frame) -> Tuple[List, object]:
+        # iloc views of the train block(s) and the test block; nothing is copied for a contiguous frame
+        return [frame.iloc[s] for s in self.train], frame.iloc[self.test]
+
+
+class WindowPlanner:
+    # Every (train, test) boundary of a split scheme, computed up front against a sorted DatetimeIndex with one
+    # searchsorted call and held as an int64 (k, 6) array; windows are handed out as positional slices, so no
+    # per-window boolean mask over the index is ever built. Purge and embargo take a bar count (int) or a
+    # time span (Timedelta / DateOffset / string).
+    COLUMNS = ("train_lo", "train_hi", "test_lo", "test_hi", "after_lo", "after_hi")
+
+    def __init__(self, index: pd.DatetimeIndex, bounds: np.ndarray) -> None:
+        self.index = index
+        self.bounds = np.asarray(bounds, dtype=np.int64).reshape(-1, 6)
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    def __iter__(self) -> Iterator[Window]:
+        return (Window(*map(int, row)) for row in self.bounds)
+
+    def __getitem__(self, i: int) -> Window:
+        return Window(*map(int, self.bounds[i]))
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.bounds, columns=list(self.COLUMNS))
+
+    @classmethod
+    def walk_forward(cls, index, in_sample, out_sample, step=None, anchored: bool = False, purge=0, min_train: int = 50, min_test: int = 20) -> "WindowPlanner":
+        # Rolling (or anchored at the first bar) in-sample windows of length in_sample, each followed by an
+        # out-of-sample block of out_sample, advancing by step (default out_sample). Planning stops at the
+        # first window with fewer than min_train in-sample or min_test out-of-sample bars, as the walk-forward
+        # loop always did. purge drops that much of the in-sample tail next to the test block.
+        index = _sorted(index)
+        step = out_sample if step is None else step
+        in_sample, out_sample, step = _offset(in_sample), _offset(out_sample), _offset(step)
+        if len(index) == 0:
+            return cls(index, np.empty((0, 6)))
+        start, end = index[0], index[-1]
+        cursors = []
+        cursor = start
+        while cursor < end:
+            cursors.append(cursor)
+            cursor = cursor + step
+        k = len(cursors)
+        cursor_t = pd.DatetimeIndex(cursors)
+        in_end = pd.DatetimeIndex([c + in_sample for c in cursors])
+        out_end = pd.DatetimeIndex([c + out_sample for c in in_end])
+        lo, mid, hi = np.split(index.searchsorted(cursor_t.append(in_end).append(out_end)), 3)
+        if isinstance(purge, (int, np.integer)):
+            train_hi = mid - int(purge)
+        else:
+            train_hi = np.minimum(index.searchsorted(pd.DatetimeIndex([e - _offset(purge) for e in in_end])), mid)
+        if anchored:
+            lo = np.zeros(k, dtype=np.int64)
+        train_hi = np.maximum(train_hi, lo)
+        bad = np.flatnonzero((train_hi - lo < min_train) | (hi - mid < min_test))
+        k = int(bad[0]) if len(bad) else k
+        zeros = np.zeros(k, dtype=np.int64)
+        return cls(index, np.column_stack([lo[:k], train_hi[:k], mid[:k], hi[:k], zeros, zeros]))
+
+    @classmethod
+    def kfold(cls, index, n_splits: int = 5, purge=0, embargo=0) -> "WindowPlanner":
+        # Contiguous test folds in time order, training on everything else. purge removes training rows just
+        # before each test fold (labels that overlap it), embargo removes rows just after it (serial leakage).
+        index = _sorted(index)
+        n = len(index)
+        if n_splits < 2 or n_splits > n:
+            raise ValueError(f"n_splits must be between 2 and the number of rows ({n}), got {n_splits}")
+        edges = np.linspace(0, n, n_splits + 1).astype(np.int64)
+        test_lo, test_hi = edges[:-1], edges[1:]
+        if isinstance(purge, (int, np.integer)):
+            train_hi = np.maximum(test_lo - int(purge), 0)
+        else:
+            train_hi = index.searchsorted(index[test_lo] - _offset(purge), side="left")
+        if isinstance(embargo, (int, np.integer)):
+            after_lo = np.minimum(test_hi + int(embargo), n)
+        else:
+            after_lo = np.maximum(index.searchsorted(index[test_hi - 1] + _offset(embargo), side="right"), test_hi)
+        return cls(index, np.column_stack([np.zeros(n_splits, dtype=np.int64), train_hi, test_lo, test_hi, after_lo, np.full(n_splits, n)]))
+
+
+def _sorted(index) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(index)
+    if not index.is_monotonic_increasing:
+        raise ValueError("window planning needs an index sorted in time order")
+    return index
+
+
+def _offset(value):
+    return pd.tseries.frequencies.to_offset(value) if isinstance(value, str) else value
+
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+_FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class Job:
+    id: str
+    user: str
+    kind: str
+    params: Dict
+    status: JobStatus = JobStatus.QUEUED
+    total: Optional[int] = None
+    completed: int = 0
+    results: List[Any] = field(default_factory=list)
+    summary: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    task: Optional[asyncio.Task] = None
+    # replaced on every update; waiters hold the previous one, which is set
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def done(self) -> bool:
+        return self.status in _FINISHED
+
+    @property
+    def progress(self) -> float:
+        if self.status == JobStatus.SUCCEEDED:
+            return 1.0
+        return self.completed / self.total if self.total else 0.0
+
+    def publish(self, result: Any = None, total: Optional[int] = None) -> None:
+        # called by the job body for each partial result (e.g. a finished walk-forward segment)
+        if total is not None:
+            self.total = total
+        if result is not None:
+            self.results.append(result)
+            self.completed += 1
+        self._notify()
+
+    def _notify(self) -> None:
+        event, self.changed = self.changed, asyncio.Event()
+        event.set()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "user": self.user,
+            "type": self.kind,
+            "status": self.status.value,
+            "progress": self.progress,
+            "completed": self.completed,
+            "total": self.total,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+JobBody = Callable[[Job], Awaitable[Any]]
+
+
+class JobManager:
+    # Jobs run as asyncio tasks; at most max_running execute at once and the rest wait their turn in submission
+    # order. Each user may hold max_per_user queued or running jobs. Finished jobs are kept for polling and
+    # result streaming until max_finished newer ones have finished. workers_per_job is the process budget a job
+    # body should give its executor (default: the CPUs split across the running slots), so concurrent jobs do not
+    # each fork a pool sized to the whole machine.
+    def __init__(self, max_running: int = 2, max_per_user: int = 2, max_finished: int = 1000, gauge=None, workers_per_job: Optional[int] = None) -> None:
+        self.max_running = int(max_running)
+        self.workers_per_job = int(workers_per_job) if workers_per_job else max(1, (os.cpu_count() or 1) // self.max_running)
+        self.max_per_user = int(max_per_user)
+        self.max_finished = int(max_finished)
+        self.gauge = gauge
+        self._slots = asyncio.Semaphore(self.max_running)
+        self._jobs: Dict[str, Job] = {}
+        self._finished: OrderedDict[str, None] = OrderedDict()
+        self.running = 0
+
+    def submit(self, user: str, kind: str, body: JobBody, params: Optional[Dict] = None) -> Job:
+        active = sum(1 for j in self._jobs.values() if j.user == user and not j.done)
+        if active >= self.max_per_user:
+            raise JobLimitExceeded(f"user {user} already has {active} active backtest jobs (limit {self.max_per_user})")
+        job = Job(uuid4().hex, user, kind, dict(params or {}))
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._execute(job, body), name=f"backtest-job-{job.id}")
+        # a task cancelled before its first step never enters _execute
+        job.task.add_done_callback(lambda task: self._finish(job, JobStatus.CANCELLED) if task.cancelled() else None)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self, user: Optional[str] = None) -> List[Job]:
+        return [j for j in self._jobs.values() if user is None or j.user == user]
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job.task.cancel()
+        return True
+
+    async def stream(self, job_id: str) -> AsyncIterator[Any]:
+        # partial results in publish order, then ends once the job has finished
+        job = self._jobs[job_id]
+        sent = 0
+        while True:
+            changed = job.changed
+            while sent < len(job.results):
+                yield job.results[sent]
+                sent += 1
+            if job.done:
+                return
+            await changed.wait()
+
+    async def wait(self, job_id: str) -> Job:
+        job = self._jobs[job_id]
+        await asyncio.wait({job.task})
+        return job
+
+    async def _execute(self, job: Job, body: JobBody) -> None:
+        try:
+            async with self._slots:
+                job.status = JobStatus.RUNNING
+                job.started_at = datetime.utcnow()
+                self._set_running(+1)
+                job._notify()
+                try:
+                    job.summary = await body(job)
+                    job.status = JobStatus.SUCCEEDED
+                finally:
+                    self._set_running(-1)
+        except asyncio.CancelledError:
+            job.status = JobStatus.CANCELLED
+        except Exception as exc:
+            job.status = JobStatus.FAILED
+            job.error = f"{type(exc).__name__}: {exc}"
+        self._finish(job, job.status)
+
+    def _set_running(self, delta: int) -> None:
+        self.running += delta
+        if self.gauge is not None:
+            self.gauge.set(self.running)
+
+    def _finish(self, job: Job, status: JobStatus) -> None:
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        job._notify()
+        self._finished[job.id] = None
+        while len(self._finished) > self.max_finished:
+            old, _ = self._finished.popitem(last=False)
+            self._jobs.pop(old, None)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest_service.src.engine.curves import DISPLAY_POINTS, decode_curve, downsample, encode_curve
+
+try:
+    import asyncpg
+except Exception:  # pragma: no cover
+    asyncpg = None
+
+_METRICS = ("final_capital", "total_return", "annualized_return", "sharpe_ratio", "sortino_ratio", "calmar_ratio", "max_drawdown", "max_drawdown_duration", "win_rate", "profit_factor", "total_trades")
+
+
+def _curve(result):
+    # BacktestResult carries a Series, CompactBacktestResult an array plus its index
+    eq = result.equity_curve
+    if isinstance(eq, pd.Series):
+        return eq.index, eq.to_numpy(dtype=float)
+    return result.index, np.asarray(eq, dtype=float)
+
+
+def _ns(value) -> np.datetime64:
+    ts = pd.Timestamp(value)
+    return np.datetime64(ts.tz_convert("UTC").tz_localize(None) if ts.tzinfo else ts, "ns")
+
+
+def curve_points(times, values) -> List[Dict]:
+    return [{"time": t, "value": float(v)} for t, v in zip(pd.DatetimeIndex(times).strftime("%Y-%m-%dT%H:%M:%S"), values)]
+
+
+class ResultRepository:
+    # backtest_results rows: metrics as JSONB, the full equity curve as an encode_curve blob and a
+    # DISPLAY_POINTS-point LTTB copy as JSONB that the dashboard reads without touching the blob; reads are scoped to
+    # the owner, so another user's result id looks the same as an unknown one
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 5, display_points: int = DISPLAY_POINTS):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.display_points = display_points
+        self.pool = None
+
+    async def connect(self) -> None:
+        self.pool = await asyncpg.create_pool(dsn=self.dsn, min_size=self.min_size, max_size=self.max_size, command_timeout=30)
+
+    async def close(self) -> None:
+        if self.pool:
+            await self.pool.close()
+
+    async def save(self, result, owner: str, strategy_id: Optional[str] = None) -> str:
+        assert self.pool
+        times, values = _curve(result)
+        # JSONB has no Infinity / NaN (profit_factor without losses)
+        metrics = {k: (v if np.isfinite(v) else None) for k in _METRICS for v in [getattr(result, k)]}
+        display = curve_points(*downsample(np.asarray(times), values, self.display_points))
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "INSERT INTO backtest_results (created_at, owner, strategy_id, metrics, equity_blob, equity_points, equity_display) VALUES (NOW(), $1, $2::uuid, $3::jsonb, $4, $5, $6::jsonb) RETURNING id",
+                owner, strategy_id, json.dumps(metrics, default=float), encode_curve(times, values), len(values), json.dumps(display),
+            )
+        return str(row["id"])
+
+    async def display(self, result_id: str, owner: str) -> Optional[Dict]:
+        assert self.pool
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow("SELECT metrics, equity_display, equity_points FROM backtest_results WHERE id=$1::uuid AND owner=$2", result_id, owner)
+        if row is None:
+            return None
+        return {"id": result_id, "metrics": json.loads(row["metrics"]), "equity": json.loads(row["equity_display"] or "[]"), "total_points": row["equity_points"]}
+
+    async def equity(self, result_id: str, owner: str, start: Optional[datetime] = None, end: Optional[datetime] = None, points: int = DISPLAY_POINTS) -> Optional[Dict]:
+        # the full curve restricted to [start, end]; served as-is once the window holds no more than `points`
+        # points, so zooming in ends at full resolution
+        assert self.pool
+        async with self.pool.acquire() as conn:
+            blob = await conn.fetchval("SELECT equity_blob FROM backtest_results WHERE id=$1::uuid AND owner=$2", result_id, owner)
+        if blob is None:
+            return None
+        times, values = decode_curve(blob)
+        lo = 0 if start is None else int(np.searchsorted(times, _ns(start), side="left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, _ns(end), side="right"))
+        window = hi - lo
+        times, values = downsample(times[lo:hi], values[lo:hi], points)
+        return {"id": result_id, "equity": curve_points(times, values), "total_points": window, "full_resolution": len(values) == window}
@@ -1,4 +1,4 @@
-import { Navigate, Route, Routes } from 'react-router-dom';
+import { Navigate, Route, Routes, useSearchParams } from 'react-router-dom';
 import MT5ConnectionManager from './components/MT5ConnectionManager';
 import EconomicCalendar from './components/EconomicCalendar';
 import ActivePositionsTable from './components/ActivePositionsTable';
@@ -18,7 +18,9 @@ function AuthScreen() {
 
 function Dashboard() {
   const { logout } = useAuth();
-  return <div className='min-h-screen bg-slate-950 text-slate-100 p-4 space-y-4'><div className='flex justify-between items-center'><h1 className='text-2xl font-bold'>MTrader</h1><button onClick={logout} className='px-3 py-2 rounded bg-rose-700'>Logout</button></div><MT5ConnectionManager/><EconomicCalendar/><ActivePositionsTable/><StrategyPerformanceDashboard/><ModelRegistryUI/><BacktestRunner/></div>;
+  // /?result=<id> opens a stored backtest result in the performance dashboard
+  const [params] = useSearchParams();
+  return <div className='min-h-screen bg-slate-950 text-slate-100 p-4 space-y-4'><div className='flex justify-between items-center'><h1 className='text-2xl font-bold'>MTrader</h1><button onClick={logout} className='px-3 py-2 rounded bg-rose-700'>Logout</button></div><MT5ConnectionManager/><EconomicCalendar/><ActivePositionsTable/><StrategyPerformanceDashboard resultId={params.get('result')}/><ModelRegistryUI/><BacktestRunner/></div>;
 }
 
 export default function App() {
@@ -1,21 +1,46 @@
-import { useEffect, useState } from 'react';
-import { Area, AreaChart, CartesianGrid, Line, LineChart, Tooltip, XAxis, YAxis } from 'recharts';
+import { useEffect, useRef, useState } from 'react';
+import { Area, AreaChart, Brush, CartesianGrid, Line, LineChart, Tooltip, XAxis, YAxis } from 'recharts';
 import { TradingAPI } from '../services/api';
 
-export default function StrategyPerformanceDashboard() {
-  const [data, setData] = useState<any>({ metrics: {}, equity: [], drawdown: [], monthly: [] });
-  useEffect(()=>{ TradingAPI.getStrategyPerformance().then((r)=>setData(r.data || {metrics:{}, equity:[], drawdown:[], monthly:[]})); },[]);
+const EMPTY = { metrics: {}, equity: [], drawdown: [], monthly: [] };
+
+// resultId: a stored backtest result, shown at display resolution with full-resolution zoom; without one the
+// live strategy performance summary is shown
+export default function StrategyPerformanceDashboard({ resultId }: { resultId?: string | null }) {
+  const [data, setData] = useState<any>(EMPTY);
+  // full-resolution slice of the stored curve for the zoomed window; null shows the display-resolution curve
+  const [zoomed, setZoomed] = useState<any[] | null>(null);
+  const timer = useRef<ReturnType<typeof setTimeout>>();
+  useEffect(()=>{
+    setZoomed(null);
+    if (resultId) TradingAPI.getBacktestResult(resultId).then((r)=>setData({ ...EMPTY, ...r.data, result_id: r.data?.id })).catch(()=>setData(EMPTY));
+    else TradingAPI.getStrategyPerformance().then((r)=>setData(r.data || EMPTY));
+  },[resultId]);
+  useEffect(()=>()=>clearTimeout(timer.current),[]);
+
+  const onZoom = ({ startIndex, endIndex }: { startIndex?: number; endIndex?: number }) => {
+    const equity = data.equity || [];
+    clearTimeout(timer.current);
+    if (!data.result_id || startIndex === undefined || endIndex === undefined || (startIndex === 0 && endIndex === equity.length - 1)) { setZoomed(null); return; }
+    // wait for the brush to settle before fetching the window
+    timer.current = setTimeout(()=>{
+      TradingAPI.getEquityCurve(data.result_id, { start: equity[startIndex].time, end: equity[endIndex].time, points: 2000 }).then((r)=>setZoomed(r.data?.equity || null)).catch(()=>setZoomed(null));
+    }, 250);
+  };
 
   return (
     <div className='rounded-xl p-4 bg-slate-900 text-slate-100'>
       <h2 className='text-lg font-semibold'>Strategy Performance</h2>
       <div className='grid grid-cols-3 gap-3 text-sm my-2'>
         <div>Win Rate: {Math.round((data.metrics.win_rate||0)*100)}%</div>
-        <div>Sharpe: {data.metrics.sharpe?.toFixed?.(2) ?? data.metrics.sharpe}</div>
+        <div>Sharpe: {(data.metrics.sharpe ?? data.metrics.sharpe_ratio)?.toFixed?.(2)}</div>
         <div>Max DD: {Math.round((data.metrics.max_drawdown||0)*100)}%</div>
       </div>
       <div className='grid grid-cols-2 gap-4'>
-        <LineChart width={420} height={200} data={data.equity}><CartesianGrid strokeDasharray='3 3'/><XAxis dataKey='time'/><YAxis/><Tooltip/><Line dataKey='value' stroke='#22c55e'/></LineChart>
+        <div>
+          <LineChart width={420} height={200} data={zoomed || data.equity}><CartesianGrid strokeDasharray='3 3'/><XAxis dataKey='time'/><YAxis domain={['auto','auto']}/><Tooltip/><Line dataKey='value' stroke='#22c55e' dot={false} isAnimationActive={false}/></LineChart>
+          <LineChart width={420} height={50} data={data.equity}><Line dataKey='value' stroke='#22c55e' dot={false} isAnimationActive={false}/><Brush dataKey='time' height={30} stroke='#64748b' onChange={onZoom}/></LineChart>
+        </div>
         <AreaChart width={420} height={200} data={data.drawdown}><CartesianGrid strokeDasharray='3 3'/><XAxis dataKey='time'/><YAxis/><Tooltip/><Area dataKey='value' stroke='#ef4444' fill='#ef4444'/></AreaChart>
       </div>
       <div className='mt-3 grid grid-cols-6 gap-1'>{(data.monthly||[]).map((m:any)=><div key={m.month} className='rounded p-2 text-xs' style={{background: m.value>=0?'#14532d':'#7f1d1d'}}>{m.month}<br/>{(m.value*100).toFixed(1)}%</div>)}</div>
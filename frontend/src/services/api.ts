@@ -44,6 +44,8 @@ export const TradingAPI = {
   promoteModel: (id: string, stage: 'staging' | 'production') => api.post(`/api/v1/models/${id}/promote`, { stage }),
   rollbackModel: (name: string) => api.post(`/api/v1/models/${name}/rollback`),
   runBacktest: (payload: any) => api.post('/api/v1/backtests/run', payload),
+  getBacktestResult: (id: string) => api.get(`/api/v1/backtests/results/${id}`),
+  getEquityCurve: (id: string, params: { start?: string; end?: string; points?: number }) => api.get(`/api/v1/backtests/results/${id}/equity`, { params }),
   getCalendar: (params: any) => api.get('/api/v1/calendar/events', { params }),
 };
 
@@ -1,15 +1,38 @@
 from __future__ import annotations
 
+import asyncio
+import os
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
-from market_data_service.src.providers.base import MT5Provider, Timeframe
+from market_data_service.src import encoding
+from market_data_service.src.hub import TickHub
+from market_data_service.src.providers.base import MT5Provider, OHLCVBatch, TickBatch, Timeframe, _EMPTY_RATES, _EMPTY_TICKS
+from market_data_service.src.storage import MarketDataStore
+from market_data_service.src.storage.ingest import TickIngestor
+
+try:
+    import asyncpg
+except Exception:  # pragma: no cover
+    asyncpg = None
+
+try:
+    from app.core.telemetry import tick_ingest_flush_seconds, tick_ingest_queue_depth, tick_ingest_rows_total
+except Exception:  # pragma: no cover
+    tick_ingest_flush_seconds = tick_ingest_queue_depth = tick_ingest_rows_total = None
 
 app = FastAPI(title="market_data_service")
 provider = None
+hub = None
+ingestor = None
+# bar files the backtest service memory-maps; both services point MARKET_DATA_DIR at the same volume
+store = MarketDataStore(os.environ["MARKET_DATA_DIR"]) if os.getenv("MARKET_DATA_DIR") else None
 
 
 class SubscriptionIn(BaseModel):
@@ -18,57 +41,143 @@ class SubscriptionIn(BaseModel):
 
 @app.on_event("startup")
 async def startup():
-    global provider
+    global provider, hub, ingestor
     provider = MT5Provider(account=0, password="", server="")
+    # every websocket client and POST /subscriptions share one upstream stream per symbol through the hub
+    hub = TickHub(provider, queue_size=int(os.getenv("TICK_CLIENT_QUEUE_SIZE", "256")))
+    dsn = os.getenv("MARKET_DATA_DATABASE_URL")
+    symbols = [s for s in os.getenv("TICK_INGEST_SYMBOLS", "").split(",") if s.strip()]
+    if dsn and symbols and asyncpg is not None:
+        pool = await asyncpg.create_pool(dsn=dsn, min_size=1, max_size=int(os.getenv("TICK_INGEST_CONNECTIONS", "4")))
+        ingestor = TickIngestor(
+            pool,
+            max_rows=int(os.getenv("TICK_INGEST_MAX_ROWS", "50000")),
+            max_delay=float(os.getenv("TICK_INGEST_MAX_DELAY", "0.5")),
+            max_pending=int(os.getenv("TICK_INGEST_MAX_PENDING", "1000000")),
+            flush_seconds=tick_ingest_flush_seconds,
+            queue_depth=tick_ingest_queue_depth,
+            rows_total=tick_ingest_rows_total,
+        )
+        await ingestor.start()
+        await hub.attach([s.strip() for s in symbols], ingestor.submit)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if ingestor is not None:
+        await provider.unsubscribe_ticks(hub.stats()["symbols"])
+        await ingestor.stop()
+        await ingestor.pool.close()
+
+
+def _media(accept: Optional[str], fmt: Optional[str]) -> str:
+    try:
+        return encoding.negotiate(accept, fmt)
+    except encoding.UnsupportedFormat as exc:
+        raise HTTPException(406, str(exc))
+
+
+async def _respond(media: str, meta: Dict, batches, empty) -> Response:
+    # columnar JSON is one object and is built whole; every other format is encoded batch by batch as the
+    # provider produces them. `empty` is a zero-row batch of the same kind, which types an empty response
+    async def chunks():
+        async for batch in batches:
+            yield batch.columns()
+
+    if media == encoding.COLUMNAR:
+        parts = [c async for c in chunks()] or [empty.columns()]
+        columns = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        return Response(encoding.encode_columnar(meta, columns), media_type=media)
+    return StreamingResponse(encoding.stream(media, meta, chunks(), empty.columns()), media_type=media)
+
+
+async def _single(batch):
+    yield batch
 
 
 @app.get("/ticks/{symbol}")
-async def ticks(symbol: str, start: str, end: str | None = None, limit: int = 10000):
+async def ticks(symbol: str, start: str, end: str | None = None, limit: int = 10000, format: Optional[str] = None, accept: Optional[str] = Header(None)):
+    # ?format=json|columnar|ndjson|msgpack|arrow or the Accept header; a bounded [start, end] pull streams in
+    # hour windows, so multi-million-tick requests hold one window in memory at a time
     if not provider:
         raise HTTPException(503, "provider unavailable")
+    media = _media(accept, format)
     st = datetime.fromisoformat(start)
     ed = datetime.fromisoformat(end) if end else None
-    data = await provider.get_ticks(symbol, st, ed, limit)
-    return [d.__dict__ for d in data]
+    batches = provider.iter_ticks_array(symbol, st, ed) if ed else _single(await provider.get_ticks_array(symbol, st, None, limit))
+    return await _respond(media, {"symbol": symbol, "provider": provider.name}, batches, TickBatch(symbol, provider.name, _EMPTY_TICKS))
 
 
 @app.get("/ohlcv/{symbol}/{timeframe}")
-async def ohlcv(symbol: str, timeframe: str, start: str, end: str | None = None, limit: int = 1000):
+async def ohlcv(symbol: str, timeframe: str, start: str, end: str | None = None, limit: int = 1000, format: Optional[str] = None, accept: Optional[str] = Header(None)):
+    if not provider:
+        raise HTTPException(503, "provider unavailable")
+    media = _media(accept, format)
     st = datetime.fromisoformat(start)
     ed = datetime.fromisoformat(end) if end else None
     tf = Timeframe(timeframe)
-    data = await provider.get_ohlcv(symbol, tf, st, ed, limit)
-    return [d.__dict__ | {"timeframe": d.timeframe.value} for d in data]
+    batches = provider.iter_ohlcv_array(symbol, tf, st, ed) if ed else _single(await provider.get_ohlcv_array(symbol, tf, st, None, limit))
+    return await _respond(media, {"symbol": symbol, "timeframe": tf.value, "provider": provider.name}, batches, OHLCVBatch(symbol, tf, provider.name, _EMPTY_RATES))
+
+
+@app.post("/store/{symbol}/{timeframe}")
+async def store_bars(symbol: str, timeframe: str, start: str, end: str):
+    # pulls [start, end) from the provider and merges it into the stored bars; a re-export of a range replaces it
+    if not provider:
+        raise HTTPException(503, "provider unavailable")
+    if store is None:
+        raise HTTPException(503, "MARKET_DATA_DIR is not configured")
+    tf = Timeframe(timeframe)
+    frames = [batch.to_frame() async for batch in provider.iter_ohlcv_array(symbol, tf, datetime.fromisoformat(start), datetime.fromisoformat(end))]
+    if not frames:
+        return {"symbol": symbol, "timeframe": tf.value, "written": 0, "bars": 0}
+    frame = pd.concat(frames)
+    bars = await asyncio.to_thread(store.append, symbol, tf.value, frame)
+    return {"symbol": symbol, "timeframe": tf.value, "written": len(frame), "bars": bars}
 
 
 @app.post("/subscriptions")
 async def subscribe(payload: SubscriptionIn):
-    out = await provider.subscribe_ticks(payload.symbols, lambda _: None)
-    return out
+    return await hub.pin(payload.symbols)
+
+
+@app.get("/subscriptions")
+async def subscriptions():
+    return hub.stats()
+
+
+@app.get("/ingest")
+async def ingest():
+    if ingestor is None:
+        raise HTTPException(404, "tick ingestion is not configured")
+    return ingestor.stats()
 
 
 @app.websocket("/ws/ticks")
 async def ws_ticks(websocket: WebSocket):
     await websocket.accept()
-    active: List[str] = []
+    sub = hub.connect()
 
-    async def callback(tick):
-        await websocket.send_json(tick.__dict__)
+    async def pump():
+        while True:
+            await websocket.send_text(await sub.queue.get())
 
+    sender = asyncio.create_task(pump())
     try:
         while True:
             msg = await websocket.receive_json()
             action = msg.get("action")
             symbols = msg.get("symbols", [])
             if action == "subscribe":
-                await provider.subscribe_ticks(symbols, callback)
-                active.extend(symbols)
+                await hub.subscribe(sub, symbols)
             elif action == "unsubscribe":
-                await provider.unsubscribe_ticks(symbols)
-                active = [s for s in active if s not in symbols]
+                await hub.unsubscribe(sub, symbols)
     except WebSocketDisconnect:
-        if active:
-            await provider.unsubscribe_ticks(active)
+        pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        await hub.disconnect(sub)
 
 
 @app.get("/health")
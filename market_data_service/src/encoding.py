@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import io
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import msgpack
+except Exception:  # pragma: no cover
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except Exception:  # pragma: no cover
+    pa = None
+
+JSON = "application/json"
+COLUMNAR = "application/vnd.mtrader.columnar+json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/x-msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# ?format= shorthands and Accept aliases
+FORMATS = {"json": JSON, "columnar": COLUMNAR, "ndjson": NDJSON, "msgpack": MSGPACK, "arrow": ARROW}
+_ALIASES = {"application/msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK, "application/x-ndjson": NDJSON, "application/jsonl": NDJSON, "application/vnd.apache.arrow.file": ARROW}
+STREAMING = (JSON, NDJSON, MSGPACK, ARROW)
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def available() -> Dict[str, bool]:
+    return {JSON: True, COLUMNAR: True, NDJSON: True, MSGPACK: msgpack is not None, ARROW: pa is not None}
+
+
+def negotiate(accept: Optional[str], fmt: Optional[str] = None) -> str:
+    # an explicit ?format= wins; otherwise the first Accept entry (by q) this service can produce; JSON rows
+    # for */* or no header
+    if fmt:
+        media = FORMATS.get(fmt.lower())
+        if media is None:
+            raise UnsupportedFormat(f"unknown format {fmt!r}; expected one of {sorted(FORMATS)}")
+        if not available()[media]:
+            raise UnsupportedFormat(f"{fmt} responses need the optional {'msgpack' if media == MSGPACK else 'pyarrow'} package")
+        return media
+    if not accept:
+        return JSON
+    entries = []
+    for i, part in enumerate(accept.split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = next((float(p[2:]) for p in params if p.startswith("q=")), 1.0)
+        entries.append((-q, i, _ALIASES.get(media.lower(), media.lower())))
+    for _, _, media in sorted(entries):
+        if media in ("*/*", "application/*"):
+            return JSON
+        if available().get(media):
+            return media
+    raise UnsupportedFormat(f"none of {accept!r} can be produced; available: {sorted(m for m, ok in available().items() if ok)}")
+
+
+def _iso(times: np.ndarray) -> list:
+    return np.datetime_as_string(times, unit="ms").tolist()
+
+
+def json_lines(meta: Dict, columns: Dict[str, np.ndarray]) -> List[str]:
+    # One JSON object per row. Rows come from a format template filled column-wise - float repr is valid JSON
+    # for finite values - which is several times faster than json.dumps per row dict; non-finite floats and
+    # other column types take the json.dumps path.
+    names = list(columns)
+    values = [_iso(v) if v.dtype.kind == "M" else v.tolist() for v in columns.values()]
+    if any(v.dtype.kind not in "fiuM" or (v.dtype.kind == "f" and not np.isfinite(v).all()) for v in columns.values()):
+        return [json.dumps({**meta, **dict(zip(names, row))}, separators=(",", ":")) for row in zip(*values)]
+    head = json.dumps(meta, separators=(",", ":"))[:-1].replace("{", "{{").replace("}", "}}")
+    fields = ",".join(f'"{k}":' + ('"{}"' if v.dtype.kind == "M" else "{!r}") for k, v in columns.items())
+    template = head + ("," if meta else "") + fields + "}}"
+    return [template.format(*row) for row in zip(*values)]
+
+
+def encode_columnar(meta: Dict, columns: Dict[str, np.ndarray]) -> bytes:
+    # one array per field, ISO-8601 times; the body is a single object, so it is built in one piece
+    body = {**meta, "count": len(next(iter(columns.values()), [])), "columns": {k: _iso(v) if v.dtype.kind == "M" else v.tolist() for k, v in columns.items()}}
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+async def stream(media: str, meta: Dict, chunks: AsyncIterator[Dict[str, np.ndarray]], empty: Optional[Dict[str, np.ndarray]] = None) -> AsyncIterator[bytes]:
+    # Encodes each chunk of columns as it arrives, so server memory is bounded by the chunk size:
+    #   JSON     one array of row objects, written incrementally
+    #   NDJSON   one row object per line
+    #   msgpack  a sequence of {**meta, "columns": {...}} maps, times as int64 epoch nanoseconds
+    #   Arrow    an IPC stream, one record batch per chunk, times as timestamp[ns]
+    # `empty` holds zero-length columns of the response's dtypes; with no chunks, msgpack and Arrow still send
+    # one frame / the schema from it, so clients always learn the columns
+    if media == ARROW:
+        sink, writer = io.BytesIO(), None
+        async for cols in chunks:
+            batch = _record_batch(cols)
+            if writer is None:
+                writer = pa.ipc.new_stream(sink, batch.schema.with_metadata({k: str(v) for k, v in meta.items()}))
+            writer.write_batch(batch)
+            yield _drain(sink)
+        if writer is None and empty is not None:
+            writer = pa.ipc.new_stream(sink, _record_batch(empty).schema.with_metadata({k: str(v) for k, v in meta.items()}))
+        if writer is not None:
+            writer.close()
+            yield _drain(sink)
+        return
+    first, sent = True, False
+    if media == JSON:
+        yield b"["
+    async for cols in chunks:
+        if media == MSGPACK:
+            yield _msgpack_frame(meta, cols)
+            sent = True
+            continue
+        rows = json_lines(meta, cols)
+        if not rows:
+            continue
+        if media == NDJSON:
+            yield ("\n".join(rows) + "\n").encode()
+        else:
+            yield (("" if first else ",") + ",".join(rows)).encode()
+            first = False
+    if media == MSGPACK and not sent and empty is not None:
+        yield _msgpack_frame(meta, empty)
+    if media == JSON:
+        yield b"]"
+
+
+def _record_batch(cols: Dict[str, np.ndarray]):
+    return pa.RecordBatch.from_pydict({k: pa.array(v) for k, v in cols.items()})
+
+
+def _msgpack_frame(meta: Dict, cols: Dict[str, np.ndarray]) -> bytes:
+    return msgpack.packb({**meta, "columns": {k: (v.view(np.int64) if v.dtype.kind == "M" else v).tolist() for k, v in cols.items()}})
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    # hand out what the writer produced since the last call and reuse the buffer
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
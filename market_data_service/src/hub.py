@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Set
+
+from market_data_service.src.encoding import json_lines
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Subscriber:
+    # one websocket client: the payloads waiting to be sent and the symbols it follows
+    queue: asyncio.Queue
+    symbols: Set[str] = field(default_factory=set)
+    dropped: int = 0
+
+    def offer(self, payload: str) -> None:
+        # a client that cannot keep up loses its oldest ticks, never stalls the poller or other clients
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(payload)
+
+
+class TickHub:
+    # Fans one upstream tick stream per symbol out to any number of clients. The provider is subscribed when
+    # a symbol gets its first subscriber (or is pinned) and unsubscribed when the last one leaves. Ticks
+    # arrive as one TickBatch per poll; each tick is serialized once and the same string is queued for every
+    # subscriber of its symbol. Sinks (the tick ingestor) get every batch of their symbols and are awaited,
+    # so a slow sink holds back the poller rather than losing ticks.
+    def __init__(self, provider, queue_size: int = 256) -> None:
+        self.provider = provider
+        self.queue_size = int(queue_size)
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._pinned: Set[str] = set()
+        self._sinks: Dict[str, List[Callable[..., Awaitable[None]]]] = {}
+        self._lock = asyncio.Lock()
+        self.published = 0
+
+    def connect(self) -> Subscriber:
+        return Subscriber(asyncio.Queue(maxsize=self.queue_size))
+
+    async def subscribe(self, sub: Subscriber, symbols: Iterable[str]) -> Dict[str, bool]:
+        result = {}
+        async with self._lock:
+            for s in symbols:
+                subs = self._subscribers.setdefault(s, set())
+                if not subs and s not in self._pinned:
+                    ok = (await self.provider.subscribe_ticks([s], self.publish, batch=True)).get(s, False)
+                    if not ok:
+                        del self._subscribers[s]
+                        result[s] = False
+                        continue
+                subs.add(sub)
+                sub.symbols.add(s)
+                result[s] = True
+        return result
+
+    async def unsubscribe(self, sub: Subscriber, symbols: Iterable[str]) -> None:
+        async with self._lock:
+            for s in list(symbols):
+                subs = self._subscribers.get(s)
+                sub.symbols.discard(s)
+                if subs is None or sub not in subs:
+                    continue
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[s]
+                    if s not in self._pinned:
+                        await self.provider.unsubscribe_ticks([s])
+
+    async def disconnect(self, sub: Subscriber) -> None:
+        await self.unsubscribe(sub, sub.symbols)
+
+    async def pin(self, symbols: Iterable[str]) -> Dict[str, bool]:
+        # keep a symbol streaming with no clients attached (POST /subscriptions)
+        result = {}
+        async with self._lock:
+            for s in symbols:
+                if s not in self._pinned and not self._subscribers.get(s):
+                    result[s] = (await self.provider.subscribe_ticks([s], self.publish, batch=True)).get(s, False)
+                else:
+                    result[s] = True
+                if result[s]:
+                    self._pinned.add(s)
+        return result
+
+    async def attach(self, symbols: Iterable[str], sink: Callable[..., Awaitable[None]]) -> Dict[str, bool]:
+        # sink(TickBatch) for every poll of these symbols, with or without clients
+        symbols = list(symbols)
+        result = await self.pin(symbols)
+        for s in symbols:
+            if result[s]:
+                self._sinks.setdefault(s, []).append(sink)
+        return result
+
+    async def publish(self, batch) -> None:
+        subs = self._subscribers.get(batch.symbol)
+        if subs:
+            payloads = json_lines({"symbol": batch.symbol, "provider": batch.provider}, batch.columns())
+            for sub in subs:
+                for payload in payloads:
+                    sub.offer(payload)
+            self.published += len(payloads)
+        for sink in self._sinks.get(batch.symbol, ()):
+            # a failing sink is its own problem; it must not reach the provider's poller or the other sinks
+            try:
+                await sink(batch)
+            except Exception:
+                logger.exception("tick sink for %s failed", batch.symbol)
+
+    def stats(self) -> Dict:
+        subscribers = {s for subs in self._subscribers.values() for s in subs}
+        return {
+            "symbols": sorted(set(self._subscribers) | self._pinned),
+            "subscribers": len(subscribers),
+            "subscriptions": {s: len(subs) for s, subs in self._subscribers.items()},
+            "published": self.published,
+            "dropped": sum(s.dropped for s in subscribers),
+            "sinks": {s: len(sinks) for s, sinks in self._sinks.items()},
+        }
@@ -1,17 +1,24 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Callable, Dict, List, Optional
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
 
 try:
     import MetaTrader5 as mt5
 except Exception:  # pragma: no cover
     mt5 = None
 
+logger = logging.getLogger(__name__)
 
 class Timeframe(str, Enum):
     M1 = "M1"
@@ -50,6 +57,83 @@ class OHLCV:
     provider: str
 
 
+TIMEFRAME_SECONDS = {"M1": 60, "M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400, "D1": 86400, "W1": 604800, "MN1": 2678400}
+
+
+def _times(data: np.ndarray) -> np.ndarray:
+    # MT5 stamps rows with epoch seconds (`time`) and, for ticks, epoch milliseconds (`time_msc`)
+    if data.dtype.names and "time_msc" in data.dtype.names:
+        return data["time_msc"].astype("M8[ms]").astype("M8[ns]")
+    return data["time"].astype("M8[s]").astype("M8[ns]")
+
+
+@dataclass(slots=True)
+class TickBatch:
+    # The structured array copy_ticks_* returned, kept as is: columns are views into it, times are converted
+    # in one vectorized pass, and Tick objects exist only when rows() is iterated.
+    symbol: str
+    provider: str
+    data: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def times(self) -> np.ndarray:
+        return _times(self.data)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {"time": self.times, "bid": self.data["bid"], "ask": self.data["ask"], "volume": self.data["volume"]}
+
+    def to_frame(self) -> pd.DataFrame:
+        cols = self.columns()
+        return pd.DataFrame(cols, index=pd.DatetimeIndex(cols.pop("time"), name="time"), copy=False)
+
+    def records(self) -> List[Dict]:
+        cols = self.columns()
+        keys = ("bid", "ask", "time", "volume")
+        return [{"symbol": self.symbol, **dict(zip(keys, row)), "provider": self.provider} for row in zip(cols["bid"].tolist(), cols["ask"].tolist(), cols["time"].astype("M8[us]").tolist(), cols["volume"].tolist())]
+
+    def rows(self) -> Iterator[Tick]:
+        for r in self.records():
+            yield Tick(**r)
+
+
+@dataclass(slots=True)
+class OHLCVBatch:
+    # copy_rates_* output; same contract as TickBatch
+    symbol: str
+    timeframe: Timeframe
+    provider: str
+    data: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def times(self) -> np.ndarray:
+        return _times(self.data)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        d = self.data
+        return {"time": self.times, "open": d["open"], "high": d["high"], "low": d["low"], "close": d["close"], "volume": d["real_volume"], "tick_volume": d["tick_volume"], "spread": d["spread"]}
+
+    def to_frame(self) -> pd.DataFrame:
+        # the shape MarketDataStore.write and the backtest engine take
+        cols = self.columns()
+        return pd.DataFrame(cols, index=pd.DatetimeIndex(cols.pop("time"), name="time"), copy=False)
+
+    def records(self) -> List[Dict]:
+        cols = self.columns()
+        keys = ("time", "open", "high", "low", "close", "volume", "tick_volume", "spread")
+        values = [cols["time"].astype("M8[us]").tolist()] + [cols[k].astype(float if k in ("open", "high", "low", "close", "volume") else np.int64).tolist() for k in keys[1:]]
+        return [{"symbol": self.symbol, "timeframe": self.timeframe, **dict(zip(keys, row)), "provider": self.provider} for row in zip(*values)]
+
+    def rows(self) -> Iterator[OHLCV]:
+        for r in self.records():
+            yield OHLCV(**r)
+
+
 class MarketDataProvider(ABC):
     @abstractmethod
     async def connect(self) -> bool:
@@ -90,40 +174,73 @@ class MarketDataProvider(ABC):
         raise NotImplementedError
 
 
+@dataclass(slots=True)
+class _Stream:
+    callback: Callable
+    batch: bool
+    # time_msc of the last delivered tick and how many ticks stamped with that millisecond were delivered
+    last_msc: int
+    seen: int = 0
+    # ticks in the second of last_msc that were delivered; the next read starts at that second
+    in_second: int = 0
+    more: bool = False
+
+
+# layouts of the arrays copy_ticks_* / copy_rates_* return, used when there is no data
+_EMPTY_TICKS = np.empty(0, dtype=[("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"), ("volume", "<u8"), ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8")])
+_EMPTY_RATES = np.empty(0, dtype=[("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8")])
+
+
 class MT5Provider(MarketDataProvider):
-    def __init__(self, account: int, password: str, server: str, path: Optional[str] = None) -> None:
+    def __init__(self, account: int, password: str, server: str, path: Optional[str] = None, min_poll_interval: float = 0.025, max_poll_interval: float = 1.0, poll_batch: int = 10_000) -> None:
         self.account = account
         self.password = password
         self.server = server
         self.path = path
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.poll_batch = poll_batch
         self._connected = False
-        self._tasks: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Stream] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self.poll_interval = max_poll_interval
+        # the MetaTrader5 package is one IPC session with the terminal and is not thread-safe: every call,
+        # from requests and from the poller alike, goes through this one thread, one at a time
+        self._terminal = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mt5")
+
+    async def _call(self, fn: Callable, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._terminal, partial(fn, *args, **kwargs))
 
     async def connect(self) -> bool:
         if mt5 is None:
             return False
-        ok = mt5.initialize(path=self.path) if self.path else mt5.initialize()
+        ok = await (self._call(mt5.initialize, path=self.path) if self.path else self._call(mt5.initialize))
         if not ok:
             return False
-        self._connected = mt5.login(self.account, password=self.password, server=self.server)
+        self._connected = await self._call(mt5.login, self.account, password=self.password, server=self.server)
         return self._connected
 
     async def disconnect(self) -> None:
-        for task in self._tasks.values():
-            task.cancel()
-            await asyncio.gather(task, return_exceptions=True)
-        self._tasks.clear()
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        self._streams.clear()
         if mt5:
-            mt5.shutdown()
+            await self._call(mt5.shutdown)
         self._connected = False
 
     async def get_ticks(self, symbol, start, end=None, limit=10000) -> List[Tick]:
-        data = mt5.copy_ticks_range(symbol, start, end, mt5.COPY_TICKS_ALL) if end else mt5.copy_ticks_from(symbol, start, limit, mt5.COPY_TICKS_ALL)
-        if data is None:
-            return []
-        return [Tick(symbol=symbol, bid=float(r["bid"]), ask=float(r["ask"]), time=datetime.utcfromtimestamp(int(r["time"])), volume=int(r["volume"]), provider=self.name) for r in data]
+        return list((await self.get_ticks_array(symbol, start, end, limit)).rows())
+
+    async def get_ticks_array(self, symbol, start, end=None, limit=10000) -> TickBatch:
+        data = await (self._call(mt5.copy_ticks_range, symbol, start, end, mt5.COPY_TICKS_ALL) if end else self._call(mt5.copy_ticks_from, symbol, start, limit, mt5.COPY_TICKS_ALL))
+        return TickBatch(symbol, self.name, _EMPTY_TICKS if data is None or not len(data) else data)
 
     async def get_ohlcv(self, symbol, timeframe, start, end=None, limit=1000) -> List[OHLCV]:
+        return list((await self.get_ohlcv_array(symbol, timeframe, start, end, limit)).rows())
+
+    async def get_ohlcv_array(self, symbol, timeframe, start, end=None, limit=1000) -> OHLCVBatch:
         tf_map = {
             Timeframe.M1: mt5.TIMEFRAME_M1,
             Timeframe.M5: mt5.TIMEFRAME_M5,
@@ -135,43 +252,128 @@ class MT5Provider(MarketDataProvider):
             Timeframe.W1: mt5.TIMEFRAME_W1,
             Timeframe.MN1: mt5.TIMEFRAME_MN1,
         }
-        tfi = tf_map[Timeframe(timeframe)] if not isinstance(timeframe, Timeframe) else tf_map[timeframe]
-        data = mt5.copy_rates_range(symbol, tfi, start, end) if end else mt5.copy_rates_from(symbol, tfi, start, limit)
-        if data is None:
-            return []
         tf = Timeframe(timeframe) if not isinstance(timeframe, Timeframe) else timeframe
-        return [OHLCV(symbol=symbol, timeframe=tf, time=datetime.utcfromtimestamp(int(r["time"])), open=float(r["open"]), high=float(r["high"]), low=float(r["low"]), close=float(r["close"]), volume=float(r["real_volume"]), tick_volume=int(r["tick_volume"]), spread=int(r["spread"]), provider=self.name) for r in data]
+        data = await (self._call(mt5.copy_rates_range, symbol, tf_map[tf], start, end) if end else self._call(mt5.copy_rates_from, symbol, tf_map[tf], start, limit))
+        return OHLCVBatch(symbol, tf, self.name, _EMPTY_RATES if data is None or not len(data) else data)
 
-    async def subscribe_ticks(self, symbols: List[str], callback: Callable) -> Dict[str, bool]:
+    async def iter_ticks_array(self, symbol, start, end, span: timedelta = timedelta(hours=1)) -> AsyncIterator[TickBatch]:
+        # [start, end] read one `span` window at a time so a long pull never holds more than a window of ticks;
+        # copy_ticks_range includes both ends, so every window but the last drops ticks stamped at its end
+        lo = start
+        while lo < end:
+            hi = min(lo + span, end)
+            batch = await self.get_ticks_array(symbol, lo, hi)
+            if hi < end:
+                batch.data = batch.data[: int(np.searchsorted(batch.times, np.datetime64(hi, "ns"), side="left"))]
+            if len(batch):
+                yield batch
+            lo = hi
+
+    async def iter_ohlcv_array(self, symbol, timeframe, start, end, bars: int = 100_000) -> AsyncIterator[OHLCVBatch]:
+        tf = Timeframe(timeframe) if not isinstance(timeframe, Timeframe) else timeframe
+        span = timedelta(seconds=TIMEFRAME_SECONDS[tf.value] * bars)
+        lo = start
+        while lo < end:
+            hi = min(lo + span, end)
+            batch = await self.get_ohlcv_array(symbol, tf, lo, hi)
+            if hi < end:
+                batch.data = batch.data[: int(np.searchsorted(batch.times, np.datetime64(hi, "ns"), side="left"))]
+            if len(batch):
+                yield batch
+            lo = hi
+
+    async def subscribe_ticks(self, symbols: List[str], callback: Callable, batch: bool = False) -> Dict[str, bool]:
+        # callback(tick) per tick, or callback(TickBatch) per poll with batch=True; every tick after the
+        # subscription is delivered once, in order
         result = {}
         for s in symbols:
-            ok = mt5.symbol_select(s, True)
+            ok = await self._call(mt5.symbol_select, s, True)
             result[s] = bool(ok)
-            if ok and s not in self._tasks:
-                self._tasks[s] = asyncio.create_task(self._stream(s, callback))
+            if ok and s not in self._streams:
+                # the current tick predates the subscription, so it counts as already delivered
+                last = await self._call(mt5.symbol_info_tick, s)
+                self._streams[s] = _Stream(callback, batch, int(last.time_msc), seen=1) if last is not None else _Stream(callback, batch, int(datetime.utcnow().timestamp() * 1000))
+        if self._streams and (self._poller is None or self._poller.done()):
+            self._poller = asyncio.create_task(self._poll_loop())
         return result
 
-    async def _stream(self, symbol: str, callback: Callable) -> None:
-        while self._connected:
-            ticks = mt5.copy_ticks_from(symbol, datetime.utcnow(), 1, mt5.COPY_TICKS_ALL)
-            if ticks is not None and len(ticks):
-                row = ticks[-1]
-                tick = Tick(symbol=symbol, bid=float(row["bid"]), ask=float(row["ask"]), time=datetime.utcfromtimestamp(int(row["time"])), volume=int(row["volume"]), provider=self.name)
-                out = callback(tick)
-                if asyncio.iscoroutine(out):
-                    await out
-            await asyncio.sleep(1)
+    @staticmethod
+    def _read(reads: List[tuple]) -> Dict[str, Optional[np.ndarray]]:
+        # runs on the terminal thread; only reads, stream state is left to the loop
+        return {s: mt5.copy_ticks_from(s, since, count, mt5.COPY_TICKS_ALL) for s, _, since, count in reads}
+
+    async def _poll(self) -> Dict[str, np.ndarray]:
+        # One pass over every subscribed symbol in a single terminal-thread hop. copy_ticks_from resolves to
+        # whole seconds, so each symbol is re-read from the second of its last delivered tick - asking for the
+        # ticks of that second it already has plus poll_batch more - and the ticks already delivered at that
+        # millisecond are skipped. Cursors only move here, on the loop.
+        reads = [(s, st, datetime.utcfromtimestamp(st.last_msc // 1000), st.in_second + self.poll_batch) for s, st in self._streams.items()]
+        raw = await self._call(self._read, reads)
+        out = {}
+        for s, st, _, count in reads:
+            if self._streams.get(s) is not st:
+                # unsubscribed (or re-subscribed) while the read was in flight
+                continue
+            data = raw[s]
+            if data is None or not len(data):
+                st.more = False
+                continue
+            t = data["time_msc"]
+            lo = int(np.searchsorted(t, st.last_msc, side="left"))
+            eq = int(np.searchsorted(t, st.last_msc, side="right")) - lo
+            fresh = data[lo + min(st.seen, eq) :]
+            st.more = len(data) >= count
+            if len(fresh):
+                st.last_msc = int(t[-1])
+                st.seen = len(data) - int(np.searchsorted(t, t[-1], side="left"))
+                st.in_second = len(data) - int(np.searchsorted(t, st.last_msc // 1000 * 1000, side="left"))
+                out[s] = fresh
+            elif st.more:
+                # the read ended before the last delivered tick: widen it until it gets past
+                st.in_second += self.poll_batch
+        return out
+
+    async def _poll_loop(self) -> None:
+        # Polls all symbols in one thread hop per cycle. The interval halves towards min_poll_interval while
+        # ticks keep arriving and stretches back towards max_poll_interval when a cycle comes back empty; a
+        # symbol whose read hit poll_batch is read again straight away. A failing read or callback is logged
+        # and skipped; the loop is shared by every symbol, so it never ends on one.
+        while self._streams:
+            try:
+                fresh = await self._poll()
+            except Exception:
+                logger.exception("tick poll failed")
+                fresh = {}
+            for s, data in fresh.items():
+                st = self._streams.get(s)
+                if st is None:
+                    continue
+                batch = TickBatch(s, self.name, data)
+                for item in [batch] if st.batch else batch.rows():
+                    try:
+                        out = st.callback(item)
+                        if asyncio.iscoroutine(out):
+                            await out
+                    except Exception:
+                        logger.exception("tick callback for %s failed", s)
+            if fresh:
+                self.poll_interval = max(self.min_poll_interval, self.poll_interval / 2)
+            else:
+                self.poll_interval = min(self.max_poll_interval, self.poll_interval * 1.5)
+            if not any(st.more for st in self._streams.values()):
+                await asyncio.sleep(self.poll_interval)
 
     async def unsubscribe_ticks(self, symbols: List[str]) -> None:
         for s in symbols:
-            task = self._tasks.pop(s, None)
-            if task:
-                task.cancel()
-                await asyncio.gather(task, return_exceptions=True)
-            mt5.symbol_select(s, False)
+            self._streams.pop(s, None)
+            await self._call(mt5.symbol_select, s, False)
+        if not self._streams and self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
 
     async def get_instrument_info(self, symbol: str) -> Dict:
-        info = mt5.symbol_info(symbol)
+        info = await self._call(mt5.symbol_info, symbol)
         return info._asdict() if info else {}
 
     @property
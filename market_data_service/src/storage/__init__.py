@@ -0,0 +1,5 @@
+from market_data_service.src.storage.columnar import COLUMNS, MarketDataStore, StoreSlice
+from market_data_service.src.storage.timescale import OHLCV_COLUMNS, TICK_COLUMNS, TICK_TABLE_COLUMNS, TimescaleLoader, decode_copy, encode_copy
+from market_data_service.src.storage.ingest import TickIngestor
+
+__all__ = ["COLUMNS", "MarketDataStore", "StoreSlice", "OHLCV_COLUMNS", "TICK_COLUMNS", "TICK_TABLE_COLUMNS", "TimescaleLoader", "TickIngestor", "decode_copy", "encode_copy"]
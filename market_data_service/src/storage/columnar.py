@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class MarketDataStore:
+    # One .npy file per symbol and timeframe holding a (6, n) float64 matrix: row 0 is the bar time as int64
+    # nanoseconds (stored bit-for-bit), rows 1-5 are open/high/low/close/volume. Rows are contiguous, so every
+    # column is a contiguous array inside one memory map. Files are replaced atomically and opened read-only with
+    # mmap_mode="r": readers slice them through searchsorted on the time row without copying or re-sorting, and
+    # any number of worker processes share the same pages through the OS page cache.
+    def __init__(self, root: str | os.PathLike) -> None:
+        self.root = Path(root)
+        self._maps: Dict[Path, Tuple[Tuple[int, int], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, symbol: str, timeframe: str) -> Path:
+        return self.root / str(symbol) / f"{getattr(timeframe, 'value', timeframe)}.npy"
+
+    def write(self, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        frame = df.set_index("time") if "time" in df.columns else df
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        order = np.argsort(index.asi8, kind="stable")
+        times = index.asi8[order]
+        # last write wins for duplicated bar times
+        keep = np.append(times[1:] != times[:-1], True) if len(times) else np.zeros(0, dtype=bool)
+        matrix = np.empty((len(COLUMNS) + 1, int(keep.sum())), dtype=np.float64)
+        matrix[0] = times[keep].view(np.float64)
+        for row, name in enumerate(COLUMNS, start=1):
+            if name in frame.columns:
+                values = frame[name].to_numpy(dtype=float)
+            else:
+                # close-only frames store close as open/high/low and zero volume, as the engines assume
+                values = np.zeros(len(frame)) if name == "volume" else frame["close"].to_numpy(dtype=float)
+            matrix[row] = values[order][keep]
+        target = self.path(symbol, timeframe)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.save(fh, matrix)
+        # open maps keep the old inode alive, so readers mid-slice never see a half-written file
+        os.replace(tmp, target)
+        return matrix.shape[1]
+
+    def append(self, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        if not self.exists(symbol, timeframe):
+            return self.write(symbol, timeframe, df)
+        return self.write(symbol, timeframe, pd.concat([self.load(symbol, timeframe), df.set_index("time") if "time" in df.columns else df]))
+
+    def exists(self, symbol: str, timeframe: str) -> bool:
+        return self.path(symbol, timeframe).exists()
+
+    def symbols(self) -> List[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.exists() else []
+
+    def _matrix(self, symbol: str, timeframe: str) -> np.ndarray:
+        path = self.path(symbol, timeframe)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise KeyError(f"no stored data for {symbol} {getattr(timeframe, 'value', timeframe)}") from None
+        version = (st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            entry = self._maps.get(path)
+            if entry is None or entry[0] != version:
+                entry = (version, np.load(path, mmap_mode="r"))
+                self._maps[path] = entry
+        return entry[1]
+
+    def times(self, symbol: str, timeframe: str) -> np.ndarray:
+        return self._matrix(symbol, timeframe)[0].view(np.int64).view("M8[ns]")
+
+    def bounds(self, symbol: str, timeframe: str, start=None, end=None) -> Tuple[int, int]:
+        times = self.times(symbol, timeframe)
+        lo = 0 if start is None else int(np.searchsorted(times, _ns(start), side="left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, _ns(end), side="right"))
+        return lo, max(lo, hi)
+
+    def slice(self, symbol: str, timeframe: str, start=None, end=None) -> "StoreSlice":
+        return StoreSlice(self, str(symbol), getattr(timeframe, "value", timeframe), start, end)
+
+    def load(self, symbol: str, timeframe: str, start=None, end=None, columns=COLUMNS) -> pd.DataFrame:
+        # [start, end] inclusive; the frame's columns and index are read-only views into the memory map
+        matrix = self._matrix(symbol, timeframe)
+        lo, hi = self.bounds(symbol, timeframe, start, end)
+        index = pd.DatetimeIndex(matrix[0, lo:hi].view(np.int64).view("M8[ns]"), copy=False, name="time")
+        return pd.DataFrame({name: matrix[COLUMNS.index(name) + 1, lo:hi] for name in columns}, index=index, copy=False)
+
+    def __getstate__(self):
+        # workers re-open the maps themselves; only the location travels
+        return {"root": self.root}
+
+    def __setstate__(self, state) -> None:
+        self.__init__(state["root"])
+
+    def close(self) -> None:
+        with self._lock:
+            self._maps.clear()
+
+
+@dataclass(frozen=True, slots=True)
+class StoreSlice:
+    # a picklable reference to stored bars: process pools ship this instead of the frame and each worker maps
+    # the file itself; consumers call load() for the zero-copy frame
+    store: MarketDataStore
+    symbol: str
+    timeframe: str
+    start: object = None
+    end: object = None
+
+    def load(self) -> pd.DataFrame:
+        return self.store.load(self.symbol, self.timeframe, self.start, self.end)
+
+
+def _ns(value) -> np.datetime64:
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.to_datetime64().astype("M8[ns]")
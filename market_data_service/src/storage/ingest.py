@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from market_data_service.src.storage.timescale import TICK_TABLE_COLUMNS, encode_copy
+
+logger = logging.getLogger(__name__)
+
+_KEY = np.dtype([("time", "<i8"), ("bid", "<f8"), ("ask", "<f8")])
+
+
+@dataclass(slots=True)
+class _Buffer:
+    parts: List[Dict[str, np.ndarray]] = field(default_factory=list)
+    rows: int = 0
+    since: float = 0.0
+    # newest time written for this series and the (bid, ask) pairs written at that instant
+    last_time: Optional[np.datetime64] = None
+    last_quotes: set = field(default_factory=set)
+    flushing: bool = False
+
+
+class TickIngestor:
+    # Writes provider tick batches into the ticks hypertable. Batches are buffered per (symbol, provider)
+    # and a buffer is flushed with one binary COPY once it holds max_rows ticks or its oldest tick has waited
+    # max_delay seconds. Rows count against max_pending until their COPY commits, so when the database falls
+    # behind submit() blocks - and with it the provider's poller, which resumes from its last tick without
+    # losing any. Duplicates by (symbol, time, bid, ask) are dropped within a flush and against the newest
+    # instant already written.
+    def __init__(self, pool, max_rows: int = 50_000, max_delay: float = 0.5, max_pending: int = 1_000_000, flush_seconds=None, queue_depth=None, rows_total=None) -> None:
+        self.pool = pool
+        self.max_rows = int(max_rows)
+        self.max_delay = float(max_delay)
+        self.max_pending = int(max_pending)
+        self.flush_seconds = flush_seconds
+        self.queue_depth = queue_depth
+        self.rows_total = rows_total
+        self.pending = 0
+        self.written = 0
+        self.duplicates = 0
+        self._buffers: Dict[Tuple[str, str], _Buffer] = {}
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="tick-ingestor")
+
+    async def stop(self) -> None:
+        # let the flusher finish the COPY it is in (cancelling could drop a wake-up and leave it running)
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        try:
+            await self.flush(force=True)
+        except Exception:
+            # shutdown goes on without the database; say what was lost
+            logger.exception("tick ingestion stopped with %d buffered ticks unwritten", self.pending)
+
+    async def submit(self, batch) -> None:
+        # a TickBatch; pass as the provider (or hub) batch callback
+        if not len(batch):
+            return
+        while self.pending >= self.max_pending:
+            self._space.clear()
+            self._wake.set()
+            await self._space.wait()
+        buf = self._buffers.setdefault((batch.symbol, batch.provider), _Buffer())
+        if not buf.rows:
+            buf.since = time.monotonic()
+        buf.parts.append(batch.columns())
+        buf.rows += len(batch)
+        self._set_pending(len(batch))
+        if buf.rows >= self.max_rows:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.max_delay / 2)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # the rows stay buffered and pending, so producers slow down until the database is back
+                logger.exception("tick ingestion flush failed; retrying")
+                if not self._closing:
+                    await asyncio.sleep(min(5.0, self.max_delay * 4))
+
+    async def flush(self, force: bool = False) -> None:
+        now = time.monotonic()
+        due = [k for k, b in self._buffers.items() if b.rows and not b.flushing and (force or b.rows >= self.max_rows or now - b.since >= self.max_delay or self.pending >= self.max_pending)]
+        results = await asyncio.gather(*(self._flush(k) for k in due), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            raise errors[0]
+
+    async def _flush(self, key: Tuple[str, str]) -> None:
+        buf = self._buffers[key]
+        parts, rows = buf.parts, buf.rows
+        buf.parts, buf.rows, buf.flushing = [], 0, True
+        started = time.perf_counter()
+        try:
+            cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+            keep = self._dedupe(buf, cols)
+            cols = {k: v[keep] for k, v in cols.items()}
+            if len(keep):
+                data = encode_copy(TICK_TABLE_COLUMNS, cols, {"symbol": key[0], "provider": key[1]})
+                async with self.pool.acquire() as conn:
+                    # a memoryview goes out as one buffer (bytes would be taken for a file path)
+                    await conn.copy_to_table("ticks", source=memoryview(data), columns=[name for name, _ in TICK_TABLE_COLUMNS], format="binary")
+                # remember the newest instant only once it is in the table
+                last = cols["time"].max()
+                at_last = cols["time"] == last
+                quotes = set(zip(cols["bid"][at_last].tolist(), cols["ask"][at_last].tolist()))
+                buf.last_quotes = quotes | buf.last_quotes if buf.last_time == last else quotes
+                buf.last_time = last
+        except BaseException:
+            # put the rows back in front of anything that arrived meanwhile
+            buf.parts, buf.rows = parts + buf.parts, rows + buf.rows
+            raise
+        finally:
+            buf.flushing = False
+        self.written += len(keep)
+        self.duplicates += rows - len(keep)
+        self._set_pending(-rows)
+        if self.flush_seconds is not None:
+            self.flush_seconds.observe(time.perf_counter() - started)
+        if self.rows_total is not None:
+            self.rows_total.labels("written").inc(len(keep))
+            self.rows_total.labels("duplicate").inc(rows - len(keep))
+
+    @staticmethod
+    def _dedupe(buf: _Buffer, cols: Dict[str, np.ndarray]) -> np.ndarray:
+        # positions to write, in arrival order: first of each (time, bid, ask), nothing older than what the
+        # table already holds for this series, and nothing already written at that newest instant
+        keys = np.empty(len(cols["time"]), dtype=_KEY)
+        keys["time"], keys["bid"], keys["ask"] = cols["time"].view(np.int64), cols["bid"], cols["ask"]
+        _, first = np.unique(keys, return_index=True)
+        keep = np.sort(first)
+        if buf.last_time is not None:
+            t = cols["time"][keep]
+            keep = keep[t >= buf.last_time]
+            at_last = np.flatnonzero(cols["time"][keep] == buf.last_time)
+            if len(at_last) and buf.last_quotes:
+                seen = np.array([(cols["bid"][keep[i]], cols["ask"][keep[i]]) in buf.last_quotes for i in at_last], dtype=bool)
+                keep = np.delete(keep, at_last[seen])
+        return keep
+
+    def _set_pending(self, delta: int) -> None:
+        self.pending += delta
+        if self.queue_depth is not None:
+            self.queue_depth.set(self.pending)
+        if self.pending < self.max_pending:
+            self._space.set()
+
+    def stats(self) -> Dict:
+        return {"pending": self.pending, "written": self.written, "duplicates": self.duplicates, "buffers": {f"{s}:{p}": b.rows for (s, p), b in self._buffers.items()}}
+
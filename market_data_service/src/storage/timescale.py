@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+PGCOPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+# TIMESTAMPTZ travels as int64 microseconds since 2000-01-01 UTC
+_PG_EPOCH_US = 946_684_800_000_000
+_WIRE = {"timestamptz": ">i8", "float8": ">f8", "int8": ">i8"}
+
+OHLCV_COLUMNS = (("time", "timestamptz"), ("open", "float8"), ("high", "float8"), ("low", "float8"), ("close", "float8"), ("volume", "int8"))
+TICK_COLUMNS = (("time", "timestamptz"), ("bid", "float8"), ("ask", "float8"), ("volume", "int8"))
+# every column of the ticks hypertable, in table order, for COPY ... FROM
+TICK_TABLE_COLUMNS = (("time", "timestamptz"), ("symbol", "text"), ("bid", "float8"), ("ask", "float8"), ("volume", "int8"), ("provider", "text"))
+
+
+def decode_copy(buffer, columns: Sequence[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+    # Decodes a binary COPY stream of fixed-width NOT NULL columns in one pass: every tuple has the same layout
+    # (int16 field count, then an int32 length and the big-endian value per field), so the body is viewed as a
+    # structured array and each column converted to a native array - no Python object per row.
+    view = memoryview(buffer)
+    if bytes(view[:11]) != PGCOPY_SIGNATURE:
+        raise ValueError("not a PostgreSQL binary COPY stream")
+    ext = int.from_bytes(view[15:19], "big")
+    body = view[19 + ext :]
+    if len(body) < 2 or bytes(body[-2:]) != b"\xff\xff":
+        raise ValueError("binary COPY stream is truncated")
+    fields = [("count", ">i2")]
+    for name, kind in columns:
+        fields += [(f"{name}_len", ">i4"), (name, _WIRE[kind])]
+    row = np.dtype(fields)
+    size = len(body) - 2
+    if size % row.itemsize:
+        raise ValueError(f"binary COPY body of {size} bytes is not a whole number of {row.itemsize}-byte rows")
+    rows = np.frombuffer(body[:size], dtype=row)
+    if len(rows) and ((rows["count"] != len(columns)).any() or any((rows[f"{name}_len"] != np.dtype(_WIRE[kind]).itemsize).any() for name, kind in columns)):
+        raise ValueError("binary COPY row with NULLs or unexpected column widths")
+    out = {}
+    for name, kind in columns:
+        values = rows[name]
+        if kind == "timestamptz":
+            out[name] = ((values.astype(np.int64) + _PG_EPOCH_US) * 1000).view("M8[ns]")
+        else:
+            out[name] = values.astype(np.float64 if kind == "float8" else np.int64)
+    return out
+
+
+def encode_copy(columns: Sequence[Tuple[str, str]], values: Dict[str, np.ndarray], constants: Optional[Dict[str, str]] = None) -> bytes:
+    # Inverse of decode_copy for writing: builds the binary COPY stream for rows of fixed-width NOT NULL
+    # columns in one structured-array pass. `constants` fills text columns that hold the same value on every
+    # row (a batch's symbol and provider), which keeps each row fixed-width.
+    constants = {k: v.encode() for k, v in (constants or {}).items()}
+    n = len(next(iter(values.values())))
+    fields = [("count", ">i2")]
+    for name, kind in columns:
+        fields += [(f"{name}_len", ">i4"), (name, f"S{len(constants[name])}" if kind == "text" else _WIRE[kind])]
+    rows = np.empty(n, dtype=np.dtype(fields))
+    rows["count"] = len(columns)
+    for name, kind in columns:
+        if kind == "text":
+            rows[f"{name}_len"] = len(constants[name])
+            rows[name] = constants[name]
+            continue
+        rows[f"{name}_len"] = np.dtype(_WIRE[kind]).itemsize
+        v = values[name]
+        rows[name] = v.astype("M8[us]").view(np.int64) - _PG_EPOCH_US if kind == "timestamptz" else v
+    return PGCOPY_SIGNATURE + b"\x00" * 8 + rows.tobytes() + b"\xff\xff"
+
+
+def _utc(value) -> datetime:
+    ts = pd.Timestamp(value)
+    return (ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")).to_pydatetime()
+
+
+class TimescaleLoader:
+    # Bulk reads of the ohlcv / ticks hypertables into frames indexed by naive-UTC time. Each hypertable chunk
+    # overlapping the range is fetched with its own binary COPY (the planner touches one chunk per query) on up
+    # to `concurrency` pooled connections, and decoded with decode_copy as it arrives. Tick chunks are further
+    # cut into `tick_span` windows, so at most `concurrency` windows of ticks are held at once rather than
+    # whole (7-day) chunks.
+    def __init__(self, pool, concurrency: int = 4, tick_span: timedelta = timedelta(hours=1)) -> None:
+        self.pool = pool
+        self.concurrency = max(1, int(concurrency))
+        self.tick_span = tick_span
+
+    async def chunk_ranges(self, table: str, start, end) -> List[Tuple[datetime, datetime]]:
+        start, end = _utc(start), _utc(end)
+        async with self.pool.acquire() as conn:
+            try:
+                rows = await conn.fetch(
+                    "SELECT range_start, range_end FROM timescaledb_information.chunks WHERE hypertable_name=$1 AND range_end > $2 AND range_start < $3 ORDER BY range_start",
+                    table, start, end,
+                )
+            except Exception:
+                # plain PostgreSQL (or no access to the catalog): one range
+                return [(start, end)]
+        return [(max(start, r["range_start"]), min(end, r["range_end"])) for r in rows]
+
+    async def _copy(self, sql: str, args: Sequence, columns) -> Dict[str, np.ndarray]:
+        buf = bytearray()
+
+        async def sink(data) -> None:
+            buf.extend(data)
+
+        async with self.pool.acquire() as conn:
+            await conn.copy_from_query(sql, *args, output=sink, format="binary")
+        return decode_copy(buf, columns)
+
+    async def _iter(self, table: str, columns, where: str, args: Sequence, start, end, span: Optional[timedelta] = None) -> AsyncIterator[pd.DataFrame]:
+        select = ", ".join(name for name, _ in columns)
+        n = len(args)
+        sql = f"SELECT {select} FROM {table} WHERE {where} AND time >= ${n + 1} AND time < ${n + 2} ORDER BY time"
+        pending: deque = deque()
+        try:
+            # keep at most `concurrency` chunk reads in flight and yield them in time order
+            for lo, hi in _windows(await self.chunk_ranges(table, start, end), span):
+                pending.append(asyncio.create_task(self._copy(sql, [*args, lo, hi], columns)))
+                if len(pending) >= self.concurrency:
+                    yield _to_frame(await pending.popleft())
+            while pending:
+                yield _to_frame(await pending.popleft())
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def iter_ohlcv(self, symbol: str, timeframe: str, start, end, provider: Optional[str] = None) -> AsyncIterator[pd.DataFrame]:
+        where, args = "symbol=$1 AND timeframe=$2", [symbol, getattr(timeframe, "value", timeframe)]
+        if provider:
+            where, args = where + " AND provider=$3", args + [provider]
+        return self._iter("ohlcv", OHLCV_COLUMNS, where, args, start, end)
+
+    def iter_ticks(self, symbol: str, start, end, provider: Optional[str] = None) -> AsyncIterator[pd.DataFrame]:
+        # frames in the shape BacktestEngine.run_ticks consumes; pass the iterator straight in as `ticks`
+        where, args = "symbol=$1", [symbol]
+        if provider:
+            where, args = where + " AND provider=$2", args + [provider]
+        return self._iter("ticks", TICK_COLUMNS, where, args, start, end, self.tick_span)
+
+    async def ohlcv(self, symbol: str, timeframe: str, start, end, provider: Optional[str] = None) -> pd.DataFrame:
+        return _concat([f async for f in self.iter_ohlcv(symbol, timeframe, start, end, provider)], OHLCV_COLUMNS)
+
+    async def ticks(self, symbol: str, start, end, provider: Optional[str] = None) -> pd.DataFrame:
+        return _concat([f async for f in self.iter_ticks(symbol, start, end, provider)], TICK_COLUMNS)
+
+
+def _windows(ranges: List[Tuple[datetime, datetime]], span: Optional[timedelta]) -> Iterator[Tuple[datetime, datetime]]:
+    for lo, hi in ranges:
+        while span and lo + span < hi:
+            yield lo, lo + span
+            lo += span
+        yield lo, hi
+
+
+def _to_frame(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    index = pd.DatetimeIndex(arrays.pop("time"), name="time")
+    return pd.DataFrame(arrays, index=index, copy=False)
+
+
+def _concat(frames: List[pd.DataFrame], columns) -> pd.DataFrame:
+    if not frames:
+        return _to_frame({name: np.empty(0, dtype="M8[ns]" if kind == "timestamptz" else np.float64 if kind == "float8" else np.int64) for name, kind in columns})
+    return frames[0] if len(frames) == 1 else pd.concat(frames)
@@ -0,0 +1,45 @@
+"""backtest equity curves as compressed blobs
+
+Revision ID: 005_backtest_equity_blobs
+Revises: 004_trading_service_persistence_tables
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "005_backtest_equity_blobs"
+down_revision = "004_trading_service_persistence_tables"
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table: str, column: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return column in {col["name"] for col in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    # full curve as a compressed binary blob, plus a downsampled copy the dashboard loads by default;
+    # the JSONB equity_curve column stays for rows written before this revision
+    if not _column_exists("backtest_results", "equity_blob"):
+        op.add_column("backtest_results", sa.Column("equity_blob", postgresql.BYTEA(), nullable=True))
+    if not _column_exists("backtest_results", "equity_points"):
+        op.add_column("backtest_results", sa.Column("equity_points", sa.Integer(), nullable=True))
+    if not _column_exists("backtest_results", "equity_display"):
+        op.add_column("backtest_results", sa.Column("equity_display", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    # results are only served back to the user who ran them; rows written before this revision have no owner
+    if not _column_exists("backtest_results", "owner"):
+        op.add_column("backtest_results", sa.Column("owner", sa.String(length=64), nullable=True))
+    op.alter_column("backtest_results", "equity_curve", existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    # already deflated: skip TOAST compression, keep out-of-line storage
+    op.execute("ALTER TABLE backtest_results ALTER COLUMN equity_blob SET STORAGE EXTERNAL;")
+
+
+def downgrade() -> None:
+    op.execute("UPDATE backtest_results SET equity_curve = COALESCE(equity_display, '[]'::jsonb) WHERE equity_curve IS NULL;")
+    op.alter_column("backtest_results", "equity_curve", existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=False)
+    for column in ("owner", "equity_display", "equity_points", "equity_blob"):
+        if _column_exists("backtest_results", column):
+            op.drop_column("backtest_results", column)
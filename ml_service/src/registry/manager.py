@@ -135,6 +135,9 @@ class ModelRegistry:
         model = self._models.get(model_id)
         if not model:
             raise ValueError("model not found")
+        if hasattr(recent_data, "load"):
+            # a market data StoreSlice: read the window straight from the memory-mapped store
+            recent_data = recent_data.load()
         report = {"psi": {}, "feature_drift": {}, "concept_drift": False}
         baseline = model.metrics.get("feature_baseline", {})
         for f in model.features:
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest_service.src.engine.windows import WindowPlanner
+
+
+def purged_kfold(index, n_splits: int = 5, purge=0, embargo=0) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    # (train_positions, test_positions) pairs in the shape sklearn's `cv=` and keras index-based fits take;
+    # purge / embargo are the label horizon and serial-correlation gap, in bars or as a time span
+    for w in WindowPlanner.kfold(index, n_splits, purge=purge, embargo=embargo):
+        yield w.train_positions(), w.test_positions()
+
+
+def walk_forward_splits(index, train, test, step=None, anchored: bool = False, purge=0, min_train: int = 1, min_test: int = 1) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    for w in WindowPlanner.walk_forward(index, train, test, step=step, anchored=anchored, purge=purge, min_train=min_train, min_test=min_test):
+        yield w.train_positions(), w.test_positions()
+
+
+def cross_validate(fit_score: Callable[[pd.DataFrame, pd.DataFrame], float], data: pd.DataFrame, n_splits: int = 5, purge=0, embargo=0) -> Dict:
+    # fit_score(train, test) -> score per fold; a fold training on both sides of its test block gets the two
+    # blocks concatenated, a one-sided fold gets a zero-copy view
+    scores: List[float] = []
+    for w in WindowPlanner.kfold(data.index, n_splits, purge=purge, embargo=embargo):
+        parts, test = w.take(data)
+        train = parts[0] if len(parts) == 1 else pd.concat(parts)
+        scores.append(float(fit_score(train, test)))
+    return {"scores": scores, "mean": float(np.mean(scores)), "std": float(np.std(scores))}
@@ -2,7 +2,16 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from backtest_service.src.engine.backtester import BacktestEngine
+from backtest_service.src.engine.backtester import BacktestEngine, CompactBacktestResult, SlippageModel
+from backtest_service.src.engine.cache import BacktestCache, strategy_identity
+from backtest_service.src.engine.curves import decode_curve, encode_curve, lttb, minmax
+from backtest_service.src.engine import indicators as ind
+from backtest_service.src.engine.fills import FillModel
+from backtest_service.src.engine.metrics import OnlineMetrics
+from backtest_service.src.engine.optimizers import GridSearch, Optimizer, SuccessiveHalving, TPESearch, TrialPruned
+from backtest_service.src.engine.strategy import Strategy
+from backtest_service.src.engine.windows import WindowPlanner
+from market_data_service.src.storage import MarketDataStore
 
 
 def strategy(df, **kwargs):
@@ -20,3 +29,515 @@ async def test_backtest_metrics():
     res = await engine.run(strategy, data)
     assert isinstance(res.sharpe_ratio, float)
     assert res.total_trades >= 0
+
+
+@pytest.mark.asyncio
+async def test_vectorized_matches_loop():
+    idx = pd.date_range('2024-01-01', periods=500, freq='H')
+    rng = np.random.default_rng(7)
+    data = pd.DataFrame({'close': np.cumsum(rng.standard_normal(500)) + 100, 'volatility': rng.random(500) * 0.01}, index=idx)
+    signals = rng.choice(np.array(['buy', 'sell', 'close', None], dtype=object), size=500, p=[0.05, 0.05, 0.1, 0.8])
+    engine = BacktestEngine()
+    loop = await engine.run(lambda df, **_: signals[len(df) - 1], data, initial_capital=200, size=2.0)
+    vec = await engine.run(lambda df, **_: signals, data, initial_capital=200, size=2.0, vectorized=True)
+    assert vec.trades == loop.trades
+    assert vec.equity_curve.equals(loop.equity_curve)
+    assert vec.sharpe_ratio == loop.sharpe_ratio
+
+
+class MomentumStrategy(Strategy):
+    window_size = 3
+
+    def on_bar(self, bar, state):
+        if len(state.window) < 3: return None
+        closes = state.window['close']
+        if closes[-1] > closes[-2]: return 'buy'
+        return 'close'
+
+
+@pytest.mark.asyncio
+async def test_event_strategy_matches_callable():
+    idx = pd.date_range('2024-01-01', periods=300, freq='H')
+    data = pd.DataFrame({'close': np.cumsum(np.random.randn(300)) + 100}, index=idx)
+    engine = BacktestEngine()
+    event = await engine.run(MomentumStrategy(), data)
+    legacy = await engine.run(strategy, data)
+    assert event.trades == legacy.trades
+    assert event.strategy_name == 'MomentumStrategy'
+
+    class NoBars(Strategy):
+        window_size = 3
+
+    with pytest.raises(TypeError):
+        NoBars()
+
+
+def threshold_strategy(df, window=5, **_):
+    close = df['close'].to_numpy()
+    mean = pd.Series(close).rolling(window, min_periods=1).mean().to_numpy()
+    return np.where(close > mean, 1, 2)
+
+
+threshold_strategy.vectorized = True
+
+
+@pytest.mark.asyncio
+async def test_walk_forward_process_pool_matches_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    idx = pd.date_range('2020-01-01', periods=3 * 365, freq='D')
+    data = pd.DataFrame({'close': np.cumsum(np.random.randn(len(idx))) + 100}, index=idx)
+    space = {'window': [3, 5, 10, 20]}
+    np.random.seed(1)
+    procs = await BacktestEngine().run_walk_forward(threshold_strategy, data, in_sample_years=1, out_sample_months=6, optimization_iterations=8, param_space=space, max_workers=2)
+    np.random.seed(1)
+    threads = await BacktestEngine().run_walk_forward(threshold_strategy, data, in_sample_years=1, out_sample_months=6, optimization_iterations=8, param_space=space, executor_cls=ThreadPoolExecutor)
+    assert len(procs) == len(threads) == 4
+    assert [r.parameters for r in procs] == [r.parameters for r in threads]
+    assert [r.total_return for r in procs] == [r.total_return for r in threads]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_walk_forward_does_not_block_the_event_loop():
+    import asyncio
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    def slow(df, **kwargs):
+        time.sleep(0.5)
+        return threshold_strategy(df, **kwargs)
+
+    slow.vectorized = True
+    idx = pd.date_range('2020-01-01', periods=3 * 365, freq='D')
+    data = pd.DataFrame({'close': np.cumsum(np.random.randn(len(idx))) + 100}, index=idx)
+    run = asyncio.create_task(BacktestEngine().run_walk_forward(slow, data, in_sample_years=1, optimization_iterations=8, param_space={'window': [3, 5]}, executor_cls=ThreadPoolExecutor, max_workers=2))
+    await asyncio.sleep(0.1)
+    run.cancel()
+    started = time.perf_counter()
+    await asyncio.sleep(0.01)
+    assert time.perf_counter() - started < 0.2 and not run.done()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+
+
+@pytest.mark.asyncio
+async def test_monte_carlo_summaries_and_block_bootstrap():
+    trades = [{'pnl': p} for p in (5.0, -3.0, 2.0, -4.0, 1.0, 3.0)]
+    engine = BacktestEngine()
+    res = await engine.monte_carlo(trades, iterations=5000, seed=3, memory_budget_mb=1)
+    assert 'distribution' not in res
+    assert len(res['histogram']['counts']) == 50
+    assert 0.0 <= res['risk_of_ruin'] <= 1.0
+    assert res['max_drawdown']['quantiles']['0.99'] >= res['max_drawdown']['quantiles']['0.5'] >= 0
+    # a single block spanning every trade only rotates the sequence, so every path ends at the same total
+    rotated = await engine.monte_carlo(trades, iterations=200, block_size=len(trades), seed=3)
+    assert rotated['std'] == pytest.approx(0.0, abs=1e-9)
+    assert rotated['mean'] == pytest.approx(4.0)
+
+
+@pytest.mark.asyncio
+async def test_portfolio_asof_alignment_and_single_symbol_parity():
+    rng = np.random.default_rng(11)
+    idx = pd.date_range('2024-01-01', periods=400, freq='H')
+    eurusd = pd.DataFrame({'close': np.cumsum(rng.standard_normal(400)) + 100}, index=idx)
+    gbpusd = pd.DataFrame({'close': np.cumsum(rng.standard_normal(200)) + 100}, index=idx[::2] + pd.Timedelta('30min'))
+    signals = rng.choice(np.array(['buy', 'sell', 'close', None], dtype=object), size=400, p=[0.05, 0.05, 0.1, 0.8])
+    engine = BacktestEngine()
+
+    single = await engine.run(lambda df, **_: signals, eurusd, initial_capital=150, size=2.0, vectorized=True)
+    basket = await engine.run_portfolio(lambda panel, **_: signals[:, None], {'EURUSD': eurusd}, initial_capital=150, size=2.0)
+    assert [{k: v for k, v in t.items() if k != 'symbol'} for t in basket.trades] == single.trades
+
+    def both_long(panel, **_):
+        out = np.zeros(panel.close.shape)
+        out[10::20] = 1
+        out[15::20] = 2
+        return out
+
+    res = await engine.run_portfolio(both_long, {'EURUSD': eurusd, 'GBPUSD': gbpusd})
+    assert res.symbols == ['EURUSD', 'GBPUSD']
+    assert len(res.equity_curve) == 600
+    assert {t['symbol'] for t in res.trades} == {'EURUSD', 'GBPUSD'}
+    opened = [(t['entry_time'], t['symbol']) for t in res.trades]
+    assert len(opened) == len({t for t, _ in opened}) * 2
+
+
+@pytest.mark.asyncio
+async def test_compact_result_matches_full():
+    idx = pd.date_range('2024-01-01', periods=400, freq='H')
+    rng = np.random.default_rng(11)
+    data = pd.DataFrame({'close': np.cumsum(rng.standard_normal(400)) + 100}, index=idx)
+    signals = rng.choice(np.array(['buy', 'sell', 'close', None], dtype=object), size=400, p=[0.05, 0.05, 0.1, 0.8])
+    engine = BacktestEngine()
+    full = await engine.run(lambda df, **_: signals, data, vectorized=True)
+    compact = await engine.run(lambda df, **_: signals, data, vectorized=True, compact=True)
+    lean = await engine.run(lambda df, **_: signals[len(df) - 1], data, compact=True, keep_curves=False)
+    assert isinstance(compact, CompactBacktestResult) and compact.trades.dtype.names[0] == 'symbol'
+    assert compact.trade_records() == full.trades
+    assert lean.equity_curve is None and lean.sharpe_ratio == full.sharpe_ratio and lean.total_trades == full.total_trades
+    restored = compact.to_result()
+    assert restored.equity_curve.equals(full.equity_curve) and restored.trades == full.trades and restored.profit_factor == full.profit_factor
+    mc = await engine.monte_carlo(compact.trades, iterations=200, seed=1)
+    assert mc == await engine.monte_carlo(full.trades, iterations=200, seed=1)
+
+
+@pytest.mark.asyncio
+async def test_result_cache_tiers_and_keys(tmp_path):
+    idx = pd.date_range('2024-01-01', periods=300, freq='H')
+    data = pd.DataFrame({'close': np.cumsum(np.random.default_rng(3).standard_normal(300)) + 100}, index=idx)
+    cache = BacktestCache(max_entries=1, directory=str(tmp_path), max_disk_bytes=10 ** 7)
+    engine = BacktestEngine(cache=cache)
+    first = await engine.run(strategy, data, compact=True)
+    hit = await engine.run(strategy, data, compact=True)
+    assert hit is not first and hit.sharpe_ratio == first.sharpe_ratio and cache.stats()['memory_hits'] == 1
+    hit.trades['pnl'] += 1
+    assert (await engine.run(strategy, data, compact=True)).trades['pnl'].tolist() == first.trades['pnl'].tolist()
+    await engine.run(strategy, data, compact=True, size=2.0)
+    again = await engine.run(strategy, data, compact=True)
+    assert again.sharpe_ratio == first.sharpe_ratio and cache.stats()['disk_hits'] == 1
+    await BacktestEngine(slippage_model=SlippageModel(base_slippage=0.001), cache=cache).run(strategy, data, compact=True)
+    await engine.run(strategy, data.assign(close=data['close'] + 1), compact=True)
+    signals = np.zeros(300)
+    await engine.run(lambda df, **_: signals, data, vectorized=True)
+    await engine.run(lambda df, **_: signals, data, vectorized=True)
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (3, 4)
+    key = cache.key(engine, threshold_strategy, data, {}, {'weights': np.r_[np.zeros(2000), 1.0]})
+    assert key != cache.key(engine, threshold_strategy, data, {}, {'weights': np.r_[np.zeros(2000), 2.0]})
+    BacktestCache(directory=str(tmp_path), max_disk_bytes=0).put('x' * 64, first)
+    assert not list(tmp_path.glob('*.pkl'))
+
+
+@pytest.mark.asyncio
+async def test_strategies_cannot_write_through_to_the_callers_frame():
+    idx = pd.date_range('2024-01-01', periods=100, freq='H')
+    data = pd.DataFrame({'close': np.linspace(100, 110, 100)}, index=idx)
+    original = data.copy()
+
+    def adds_columns(df, **_):
+        df['close'] = df['close'] * 2
+        df['signal'] = 1
+        return df['signal'].to_numpy()
+
+    adds_columns.vectorized = True
+
+    def writes_in_place(df, **_):
+        df.loc[df.index[0], 'close'] = 0.0
+        return np.zeros(len(df))
+
+    writes_in_place.vectorized = True
+    await BacktestEngine().run(adds_columns, data)
+    with pytest.raises(ValueError):
+        await BacktestEngine().run(writes_in_place, data)
+    pd.testing.assert_frame_equal(data, original)
+
+
+def test_strategy_identity_tracks_every_code_edit():
+    def compile_(src):
+        ns = {'np': np, '__name__': 'strategies'}
+        exec(src, ns)
+        return ns['strat']
+
+    base = 'def helper(x):\n    return x * 2\ndef strat(df, fast=10):\n    return np.maximum(helper(df), fast)\n'
+    edits = [base.replace('maximum', 'minimum'), base.replace('fast=10', 'fast=20'), base.replace('x * 2', 'x * 3')]
+    keys = {strategy_identity(compile_(src)) for src in [base] + edits}
+    assert len(keys) == 4 and strategy_identity(compile_(base)) in keys
+
+    def imported(lib_src, limit):
+        import types
+        lib = types.ModuleType('mylib')
+        exec(lib_src, vars(lib))
+        ns = {'np': np, 'mylib': lib, 'LIMIT': limit, '__name__': 'strategies'}
+        exec('def strat(df):\n    return np.minimum(mylib.scale(df), LIMIT)\n', ns)
+        return ns['strat']
+
+    lib = 'def scale(x):\n    return x * 2\n'
+    keys = {strategy_identity(imported(src, limit)) for src, limit in [(lib, 1.0), (lib.replace('2', '3'), 1.0), (lib, 2.0)]}
+    assert len(keys) == 3
+
+    def compile_class(src):
+        ns = {'Strategy': Strategy, '__name__': 'strategies'}
+        exec(src, ns)
+        return ns['Strat']()
+
+    cls = 'class Strat(Strategy):\n    window = 5\n    def on_bar(self, bar):\n        return self.signal(bar)\n    def signal(self, bar):\n        return 1\n'
+    keys = {strategy_identity(compile_class(src)) for src in [cls, cls.replace('return 1', 'return 2'), cls.replace('window = 5', 'window = 6')]}
+    assert len(keys) == 3 and strategy_identity(compile_class(cls)) in keys
+
+
+def test_drawdown_pruning_marks_open_positions_to_market():
+    idx = pd.date_range('2024-01-01', periods=500, freq='H')
+    data = pd.DataFrame({'close': np.linspace(100, 50, 500)}, index=idx)
+    engine = BacktestEngine(slippage_model=SlippageModel(base_slippage=0.0))
+    held_long = np.r_[1, np.zeros(499)]
+    with pytest.raises(TrialPruned):
+        engine._run(lambda df, **_: held_long, data, margin=False, vectorized=True, stop_drawdown=0.05, size=100)
+    with pytest.raises(TrialPruned):
+        engine._run(lambda df, **_: 'buy' if len(df) == 1 else None, data, margin=False, stop_drawdown=0.05, size=100)
+    # the same position held short gains all the way down
+    assert engine._run(lambda df, **_: -held_long, data, margin=False, vectorized=True, stop_drawdown=0.05, size=100).total_trades == 0
+    with pytest.raises(TypeError):
+        Optimizer({'window': [1, 2]}, budget=2)
+
+
+def test_optimizers_dedupe_and_budget():
+    space = {'fast': [2, 4, 4, 8], 'slow': [10, 20, 30, 40, 50], 'kind': ['sma', 'ema']}
+    grid = GridSearch(space, budget=1000)
+    assert len({tuple(t.params.values()) for t in grid.ask()}) == 3 * 5 * 2
+    halving = SuccessiveHalving(space, budget=6)
+    fractions = []
+    while trials := halving.ask():
+        fractions.append((len(trials), trials[0].fraction))
+        halving.tell(trials, [t.params['slow'] - t.params['fast'] for t in trials])
+    assert fractions == [(18, 1 / 9), (6, 1 / 3), (2, 1.0)] and halving.full_evaluations == 2
+    tpe, seen = TPESearch(space, budget=25, seed=0), []
+    while trials := tpe.ask(2):
+        seen += [tuple(t.params.values()) for t in trials]
+        tpe.tell(trials, [-abs(t.params['fast'] - 4) - abs(t.params['slow'] - 30) + (t.params['kind'] == 'ema') for t in trials])
+    assert len(seen) == len(set(seen)) == 25 and tpe.best_params == {'fast': 4, 'slow': 30, 'kind': 'ema'}
+
+
+@pytest.mark.asyncio
+async def test_walk_forward_adaptive_optimizer_and_pruning():
+    from concurrent.futures import ThreadPoolExecutor
+
+    idx = pd.date_range('2020-01-01', periods=3 * 365, freq='D')
+    data = pd.DataFrame({'close': np.cumsum(np.random.default_rng(4).standard_normal(len(idx))) + 100}, index=idx)
+    space = {'window': [3, 5, 10, 20, 40]}
+    np.random.seed(2)
+    tpe = await BacktestEngine().run_walk_forward(threshold_strategy, data, in_sample_years=1, optimization_iterations=4, param_space=space, executor_cls=ThreadPoolExecutor, optimizer='tpe')
+    assert len(tpe) == 4 and all(r.parameters['window'] in space['window'] for r in tpe)
+    pruned = await BacktestEngine().run_walk_forward(threshold_strategy, data, in_sample_years=1, optimization_iterations=4, param_space=space, executor_cls=ThreadPoolExecutor, optimizer='halving', prune_drawdown=0.0)
+    assert all(set(r.parameters) == {'optimization_iterations'} for r in pruned)
+
+
+def band_strategy(df, window=5, band=0.0, **_):
+    close = df['close'].to_numpy()
+    window, band = np.atleast_1d(window), np.atleast_1d(band)
+    mean = np.column_stack([pd.Series(close).rolling(int(w), min_periods=1).mean().to_numpy() for w in window])
+    codes = np.where(close[:, None] > mean * (1 + band), 1, np.where(close[:, None] < mean * (1 - band), 2, 0))
+    return codes if codes.shape[1] > 1 else codes[:, 0]
+
+
+@pytest.mark.asyncio
+async def test_batch_grid_matches_individual_runs():
+    idx = pd.date_range('2024-01-01', periods=600, freq='H')
+    rng = np.random.default_rng(5)
+    data = pd.DataFrame({'close': np.cumsum(rng.standard_normal(600) * 0.3) + 100, 'volatility': rng.random(600) * 0.01}, index=idx)
+    engine = BacktestEngine()
+    grid = {'window': [3, 10, 30], 'band': [0.0, 0.002], 'size': [1.0, 8.0]}
+    table = await engine.run_batch(band_strategy, data, grid, initial_capital=300, memory_budget_mb=0.05)
+    assert len(table) == 12 and table['total_trades'].gt(0).all()
+    for row in table.itertuples():
+        single = await engine.run(band_strategy, data, vectorized=True, initial_capital=300, window=row.window, band=row.band, size=row.size)
+        for name in ('sharpe_ratio', 'sortino_ratio', 'calmar_ratio', 'max_drawdown', 'total_return', 'total_trades', 'win_rate', 'final_capital'):
+            assert np.isclose(getattr(row, name), getattr(single, name), rtol=1e-9, equal_nan=True), name
+
+
+def test_incremental_indicators_match_batch():
+    rng = np.random.default_rng(8)
+    close = 100 * np.exp(np.cumsum(rng.standard_normal(500) * 0.01))
+    high, low = close * (1 + rng.random(500) * 0.01), close * (1 - rng.random(500) * 0.01)
+    sma, ema, atr, rsi, vol = ind.SMA(14), ind.EMA(14), ind.ATR(14), ind.RSI(14), ind.Volatility(14)
+    streamed = np.array([[sma.update(c), ema.update(c), atr.update(h, l, c), rsi.update(c), vol.update(c)] for h, l, c in zip(high, low, close)])
+    batch = np.column_stack([ind.sma(close, 14), ind.ema(close, 14), ind.atr(high, low, close, 14), ind.rsi(close, 14), ind.volatility(close, 14)])
+    assert np.allclose(streamed, batch, rtol=1e-9, equal_nan=True)
+
+
+
+class CrossStrategy(Strategy):
+    window_size = 5
+
+    def on_start(self, state):
+        state.indicator('fast', ind.EMA(5))
+        state.indicator('slow', ind.SMA(20))
+        self.seen = []
+
+    def on_bar(self, bar, state):
+        # registered late: caught up on the 5 bars still in the window, this one included
+        late = state.indicator('atr', ind.ATR(3)) if state.bar_index == 10 else state.indicators.get('atr')
+        self.seen.append((state.indicators['fast'].value, state.indicators['slow'].value, np.nan if late is None else late.value))
+        if state.indicators['fast'].value > state.indicators['slow'].value: return 'buy'
+        return 'close'
+
+
+@pytest.mark.asyncio
+async def test_runner_feeds_registered_indicators_each_bar():
+    idx = pd.date_range('2024-01-01', periods=200, freq='H')
+    rng = np.random.default_rng(11)
+    close = 100 * np.exp(np.cumsum(rng.standard_normal(200) * 0.01))
+    data = pd.DataFrame({'open': close, 'high': close * 1.002, 'low': close * 0.998, 'close': close}, index=idx)
+    strat = CrossStrategy()
+    res = await BacktestEngine().run(strat, data)
+    fast, slow = ind.ema(close, 5), ind.sma(close, 20)
+    seen = np.array(strat.seen)
+    assert np.allclose(seen[:, 0], fast, equal_nan=True) and np.allclose(seen[:, 1], slow, equal_nan=True)
+    assert np.allclose(seen[10:, 2], ind.atr(close[6:] * 1.002, close[6:] * 0.998, close[6:], 3)[4:]) and np.isnan(seen[:10, 2]).all()
+    signals = np.where(fast > slow, 'buy', 'close')
+    assert res.trades == (await BacktestEngine().run(lambda df, **_: signals[len(df) - 1], data)).trades
+
+def sma_band_strategy(df, window=20, band=0.0, **_):
+    mean = ind.indicators(df).sma(window)
+    close = df['close'].to_numpy()
+    return np.where(close > mean * (1 + band), 1, np.where(close < mean * (1 - band), 2, 0))
+
+
+sma_band_strategy.vectorized = True
+
+
+@pytest.mark.asyncio
+async def test_indicator_cache_shared_across_trials():
+    idx = pd.date_range('2024-01-01', periods=300, freq='H')
+    data = pd.DataFrame({'close': np.cumsum(np.random.default_rng(9).standard_normal(300)) + 100}, index=idx)
+    ind.default_cache.clear()
+    before = ind.default_cache.stats()
+    engine = BacktestEngine()
+    for band in np.linspace(0, 0.01, 20):
+        await engine.run(sma_band_strategy, data, window=20, band=band, compact=True, keep_curves=False)
+    stats = ind.default_cache.stats()
+    assert stats['misses'] - before['misses'] == 1 and stats['hits'] - before['hits'] == 19
+
+
+@pytest.mark.asyncio
+async def test_intrabar_sl_tp_and_pending_orders():
+    bars = [(100, 101, 99, 100), (100, 102, 99.5, 101), (101, 104.5, 97, 102), (102, 103, 101, 102), (102, 102.5, 100.5, 101), (101, 101.5, 95, 96), (96, 97, 95, 96), (93, 94, 92, 93), (93, 93, 89, 90), (90, 91, 89, 90)]
+    data = pd.DataFrame(bars, columns=['open', 'high', 'low', 'close'], index=pd.date_range('2024-01-01', periods=10, freq='H'))
+    orders = pd.DataFrame({'signal': [1, 0, 0, 1, 0, 0, -1, 0, 0, 2], 'order_type': ['market', None, None, 'limit', None, None, 'stop', None, None, None],
+                           'price': [np.nan, np.nan, np.nan, 101, np.nan, np.nan, 94.5, np.nan, np.nan, np.nan],
+                           'stop_loss': [98, np.nan, np.nan, 99, np.nan, np.nan, 97, np.nan, np.nan, np.nan], 'take_profit': [104, np.nan, np.nan, 110, np.nan, np.nan, 90, np.nan, np.nan, np.nan]})
+    fills = {}
+    for priority in ('stop_first', 'target_first', 'nearest_open'):
+        res = await BacktestEngine(fill_model=FillModel(intrabar_priority=priority)).run(lambda df, **_: orders, data, vectorized=True, commission=False, slippage=False, margin=False)
+        fills[priority] = [(t['entry_time'].hour, t['exit_time'].hour, t['entry'], t['exit'], t['pnl']) for t in res.trades]
+    assert fills['stop_first'] == fills['nearest_open'] == [(0, 2, 100, 98, -2), (4, 5, 101, 99, -2), (7, 8, 93, 90, 3)]
+    assert fills['target_first'][0] == (0, 2, 100, 104, 4)
+
+
+@pytest.mark.asyncio
+async def test_order_mode_without_levels_matches_bar_close_fills():
+    idx = pd.date_range('2024-01-01', periods=500, freq='H')
+    rng = np.random.default_rng(7)
+    data = pd.DataFrame({'close': np.cumsum(rng.standard_normal(500)) + 100, 'volatility': rng.random(500) * 0.01}, index=idx)
+    signals = rng.choice(np.array(['buy', 'sell', 'close', None], dtype=object), size=500, p=[0.05, 0.05, 0.1, 0.8])
+    engine = BacktestEngine()
+    plain = await engine.run(lambda df, **_: signals, data, initial_capital=200, size=2.0, vectorized=True)
+    orders = await engine.run(lambda df, **_: pd.DataFrame({'signal': signals, 'stop_loss': np.nan}), data, initial_capital=200, size=2.0, vectorized=True)
+    assert orders.trades == plain.trades and orders.equity_curve.equals(plain.equity_curve)
+
+
+@pytest.mark.asyncio
+async def test_tick_mode_chunk_invariant_and_quote_fills():
+    rng = np.random.default_rng(5)
+    n = 3000
+    mid = 1.1 * np.exp(np.cumsum(rng.standard_normal(n) * 2e-5))
+    times = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.cumsum(rng.integers(50, 500, size=n)), unit='ms')
+    ticks = pd.DataFrame({'time': times, 'bid': mid - 1e-5, 'ask': mid + 1e-5})
+    codes = rng.choice([0, 1, -1, 2], size=n, p=[0.97, 0.01, 0.01, 0.01])
+    strat = lambda df, **_: codes[np.searchsorted(times.values, df.index.values)]
+    engine = BacktestEngine()
+    whole = await engine.run_ticks(strat, ticks, initial_capital=1e5, size=1000.0, slippage=False, commission=False)
+    chunked = await engine.run_ticks(strat, ticks, chunk_size=97, initial_capital=1e5, size=1000.0, slippage=False, commission=False)
+    assert whole.total_trades > 10 and chunked.trades == whole.trades
+    assert chunked.equity_curve.equals(whole.equity_curve) and chunked.final_capital == whole.final_capital
+    quotes = ticks.set_index('time')
+    for t in whole.trades:
+        buy_at, sell_at = ('ask', 'bid') if t['side'] == 'buy' else ('bid', 'ask')
+        assert t['entry'] == quotes.at[t['entry_time'], buy_at] and t['exit'] == quotes.at[t['exit_time'], sell_at]
+
+
+@pytest.mark.asyncio
+async def test_columnar_store_slices_are_zero_copy(tmp_path):
+    idx = pd.date_range('2024-01-01', periods=400, freq='H')
+    data = pd.DataFrame({'close': np.cumsum(np.random.default_rng(4).standard_normal(400)) + 100}, index=idx)
+    store = MarketDataStore(tmp_path)
+    store.write('EURUSD', 'H1', data.iloc[::-1])
+    store.append('EURUSD', 'H1', data.iloc[300:].assign(close=data['close'].iloc[300:] + 1))
+    view = store.load('EURUSD', 'H1', idx[100], idx[349])
+    assert len(view) == 250 and view.index.is_monotonic_increasing and view['close'].iloc[-1] == data['close'].iloc[349] + 1
+    assert np.shares_memory(view['close'].to_numpy(), store._matrix('EURUSD', 'H1')) and not view['close'].to_numpy().flags.writeable
+    engine = BacktestEngine()
+    stored = await engine.run(strategy, store.slice('EURUSD', 'H1', idx[100], idx[299]), initial_capital=500)
+    plain = await engine.run(strategy, data.iloc[100:300], initial_capital=500)
+    assert stored.trades == plain.trades and stored.final_capital == plain.final_capital
+
+
+def test_online_metrics_match_curve_formulas():
+    rng = np.random.default_rng(12)
+    eq = pd.Series(1000 * np.exp(np.cumsum(rng.standard_normal(2000) * 0.01)), index=pd.date_range('2024-01-01', periods=2000, freq='H'))
+    pnl = np.round(rng.standard_normal(300), 2)
+    ret = eq.pct_change().fillna(0)
+    dd = eq / eq.cummax() - 1
+    ann = (1 + ret.mean()) ** 252 - 1
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    expected = {'sharpe_ratio': ret.mean() / (ret.std() + 1e-9) * np.sqrt(252), 'sortino_ratio': ret.mean() / (ret[ret < 0].std() + 1e-9) * np.sqrt(252),
+                'annualized_return': ann, 'calmar_ratio': ann / (abs(dd.min()) + 1e-9), 'max_drawdown': abs(dd.min()), 'max_drawdown_duration': int((dd < 0).sum()),
+                'final_capital': eq.iloc[-1], 'profit_factor': wins.sum() / abs(losses.sum()), 'expectancy': pnl.mean(), 'avg_win': wins.mean(), 'avg_loss': losses.mean(),
+                'largest_win': wins.max(), 'largest_loss': losses.min(), 'win_rate': len(wins) / len(pnl)}
+    streaming, chunked = OnlineMetrics(1000), OnlineMetrics(1000)
+    for x in eq:
+        streaming.update(x)
+    for part in np.array_split(eq.to_numpy(), [1, 7, 700, 701, 1500]):
+        chunked.update_array(part)
+    for p in pnl:
+        streaming.add_trade(p)
+    chunked.add_trades(pnl)
+    runs = np.diff(np.flatnonzero(np.diff(np.concatenate([[0], (dd < 0).astype(int), [0]]))))[::2]
+    for m in (streaming, chunked):
+        got = m.summary()
+        for key, value in expected.items():
+            assert got[key] == pytest.approx(value, rel=1e-9), key
+        assert m.longest_drawdown_bars == runs.max()
+
+
+@pytest.mark.asyncio
+async def test_scenarios_table_and_stress_test_parity():
+    idx = pd.date_range('2024-01-01', periods=600, freq='H')
+    rng = np.random.default_rng(21)
+    base = pd.DataFrame({'close': 100 * np.exp(np.cumsum(rng.standard_normal(600) * 0.002)), 'volatility': rng.random(600) * 0.01}, index=idx)
+    before = base.copy()
+    engine = BacktestEngine()
+    scenarios = [{'name': 'crash', 'type': 'price_shock', 'shock': -0.2}, {'name': 'vol', 'type': 'volatility_spike', 'multiplier': 5},
+                 {'name': 'gap', 'type': 'gap', 'size': -0.1, 'at': idx[300]}, {'name': 'wide', 'type': 'spread_widening', 'multiplier': 10},
+                 {'name': 'combo', 'transforms': [{'type': 'gap', 'size': -0.1}, {'type': 'spread_widening', 'multiplier': 10}]}]
+    table = await engine.run_scenarios(threshold_strategy, base, scenarios, max_workers=2, initial_capital=5000)
+    assert list(table['scenario']) == ['baseline', 'crash', 'vol', 'gap', 'wide', 'combo'] and table.loc[5, 'type'] == 'gap+spread_widening'
+    gapped = base.assign(close=np.where(np.arange(600) >= 300, base['close'] * 0.9, base['close']))
+    assert table.loc[3, 'final_capital'] == (await engine.run(threshold_strategy, gapped, initial_capital=5000)).final_capital
+    assert table.loc[4, 'final_capital'] < table.loc[0, 'final_capital']
+    stress = await engine.stress_test(threshold_strategy, base, scenarios[:2])
+    for s, shocked in zip(scenarios[:2], (base.assign(close=base['close'] * 0.8), base.assign(volatility=base['volatility'] * 5))):
+        res = await engine.run(threshold_strategy, shocked)
+        assert stress[s['name']] == {'total_return': res.total_return, 'max_drawdown': res.max_drawdown, 'sharpe': res.sharpe_ratio}
+    assert base.equals(before)
+
+
+def test_equity_curve_blob_roundtrip_and_downsampling():
+    idx = pd.date_range('2024-01-01', periods=50_000, freq='min')
+    eq = 1e4 * np.exp(np.cumsum(np.random.default_rng(4).standard_normal(50_000) * 1e-4))
+    blob = encode_curve(idx, eq)
+    times, values = decode_curve(blob)
+    assert (times == idx.values).all() and (values == eq).all() and len(blob) < eq.nbytes
+    t, v = lttb(idx.values, eq, 500)
+    assert len(t) == 500 and t[0] == idx.values[0] and t[-1] == idx.values[-1] and (np.diff(t.view('i8')) > 0).all()
+    assert set(v) <= set(eq)
+    t, v = minmax(idx.values, eq, 250)
+    assert len(t) <= 500 and v.max() == eq.max() and v.min() == eq.min() and (np.diff(t.view('i8')) > 0).all()
+
+
+def test_window_planner_matches_masks_and_purges():
+    idx = pd.date_range('2015-01-01', '2020-06-30', freq='D')
+    plan = WindowPlanner.walk_forward(idx, pd.DateOffset(years=2), pd.DateOffset(months=6))
+    cursor = idx[0]
+    for w in plan:
+        in_end, out_end = cursor + pd.DateOffset(years=2), cursor + pd.DateOffset(years=2, months=6)
+        assert (np.flatnonzero((idx >= cursor) & (idx < in_end)) == np.arange(w.train_lo, w.train_hi)).all()
+        assert (np.flatnonzero((idx >= in_end) & (idx < out_end)) == np.arange(w.test_lo, w.test_hi)).all()
+        cursor += pd.DateOffset(months=6)
+    assert len(plan) == 7
+    anchored = WindowPlanner.walk_forward(idx, pd.DateOffset(years=2), pd.DateOffset(months=6), anchored=True, purge='10D')
+    assert all(w.train_lo == 0 and idx[w.test_lo] - idx[w.train_hi - 1] > pd.Timedelta('10D') for w in anchored)
+    folds = list(WindowPlanner.kfold(idx, 5, purge=5, embargo=3))
+    assert sum(w.test_hi - w.test_lo for w in folds) == len(idx)
+    for w in folds:
+        train = w.train_positions()
+        assert not np.isin(train, np.arange(w.test_lo - 5, w.test_hi + 3)).any()
+        assert len(train) == len(idx) - (min(w.test_hi + 3, len(idx)) - max(w.test_lo - 5, 0))
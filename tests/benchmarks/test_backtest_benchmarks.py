@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_service.src.engine.backtester import BacktestEngine
+from backtest_service.src.engine.strategy import Strategy
+
+# Opt-in: BACKTEST_BENCHMARKS=1 python -m pytest -q tests/benchmarks
+#   BACKTEST_BENCHMARK_SIZES=10000,100000   restrict the bar counts (default 10k, 100k, 1M)
+#   BACKTEST_BENCHMARK_UPDATE=1             rewrite baseline.json from this machine instead of comparing
+#   BACKTEST_BENCHMARK_TOLERANCE=0.3        allowed slowdown / memory growth over the baseline
+# Wall time comes from an untraced run, peak memory from a second run under tracemalloc. Pools are thread pools
+# so every allocation is visible to tracemalloc; the baseline is only meaningful on the machine that wrote it.
+pytestmark = pytest.mark.skipif(os.getenv('BACKTEST_BENCHMARKS') != '1', reason='set BACKTEST_BENCHMARKS=1 to run benchmarks')
+
+BASELINE = Path(__file__).with_name('baseline.json')
+SIZES = [int(s) for s in os.getenv('BACKTEST_BENCHMARK_SIZES', '10000,100000,1000000').split(',')]
+TOLERANCE = float(os.getenv('BACKTEST_BENCHMARK_TOLERANCE', '0.3'))
+UPDATE = os.getenv('BACKTEST_BENCHMARK_UPDATE') == '1'
+
+
+def synthetic(n, seed=0):
+    # five years of bars whatever the count, so walk-forward always gets the same number of windows
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.standard_normal(n) * 0.001))
+    idx = pd.date_range('2015-01-01', '2020-01-01', periods=n)
+    return pd.DataFrame({'open': close, 'high': close * 1.001, 'low': close * 0.999, 'close': close, 'volume': 1.0, 'volatility': 0.001}, index=idx)
+
+
+def crossover(df, fast=10, slow=50, **_):
+    close = df['close'].to_numpy()
+    f = pd.Series(close).rolling(fast, min_periods=1).mean().to_numpy()
+    s = pd.Series(close).rolling(slow, min_periods=1).mean().to_numpy()
+    return np.where(f > s, 1, 2)
+
+
+crossover.vectorized = True
+
+
+class Breakout(Strategy):
+    window_size = 20
+
+    def on_bar(self, bar, state):
+        w = state.window
+        if not w.full:
+            return None
+        if state.position is None and bar.close >= w['high'].max():
+            return 'buy'
+        if state.position is not None and bar.close <= w['low'].min():
+            return 'close'
+        return None
+
+
+async def bench_run_vectorized(engine, df):
+    await engine.run(crossover, df, initial_capital=1e6)
+
+
+async def bench_run_events(engine, df):
+    await engine.run(Breakout(), df, initial_capital=1e6, compact=True)
+
+
+async def bench_walk_forward(engine, df):
+    await engine.run_walk_forward(crossover, df, in_sample_years=3, out_sample_months=12, optimization_iterations=4, param_space={'fast': [5, 10], 'slow': [50, 100]}, optimizer='grid', executor_cls=ThreadPoolExecutor)
+
+
+async def bench_monte_carlo(engine, df):
+    pnl = np.random.default_rng(1).standard_normal(max(len(df) // 100, 10))
+    await engine.monte_carlo([{'pnl': p} for p in pnl], iterations=2000, seed=1)
+
+
+async def bench_stress_test(engine, df):
+    scenarios = [{'name': 'crash', 'type': 'price_shock', 'shock': -0.2}, {'name': 'vol', 'type': 'volatility_spike', 'multiplier': 5},
+                 {'name': 'gap', 'type': 'gap', 'size': -0.1}, {'name': 'wide', 'type': 'spread_widening', 'multiplier': 10}]
+    await engine.stress_test(crossover, df, scenarios, executor_cls=ThreadPoolExecutor)
+
+
+CASES = {f.__name__[6:]: f for f in (bench_run_vectorized, bench_run_events, bench_walk_forward, bench_monte_carlo, bench_stress_test)}
+
+
+def measure(case, n):
+    df = synthetic(n)
+    started = time.perf_counter()
+    asyncio.run(CASES[case](BacktestEngine(), df))
+    wall = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        asyncio.run(CASES[case](BacktestEngine(), df))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'wall_s': round(wall, 4), 'peak_mb': round(peak / 2**20, 2), 'bars_per_s': round(n / wall)}
+
+
+@pytest.mark.parametrize('n', SIZES)
+@pytest.mark.parametrize('case', list(CASES))
+def test_benchmark(case, n):
+    key = f'{case}[{n}]'
+    result = measure(case, n)
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    if UPDATE:
+        baseline[key] = result
+        BASELINE.write_text(json.dumps(dict(sorted(baseline.items())), indent=2) + '\n')
+        return
+    if key not in baseline:
+        pytest.skip(f'no baseline for {key}; run with BACKTEST_BENCHMARK_UPDATE=1')
+    ref = baseline[key]
+    # small absolute slack so millisecond cases do not flap on scheduler noise
+    assert result['wall_s'] <= ref['wall_s'] * (1 + TOLERANCE) + 0.05, f'{key} wall time regressed: {result} vs baseline {ref}'
+    assert result['peak_mb'] <= ref['peak_mb'] * (1 + TOLERANCE) + 1, f'{key} peak memory regressed: {result} vs baseline {ref}'
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import pandas as pd
 from datetime import datetime
@@ -20,3 +21,113 @@ async def test_walk_forward_and_monte_carlo():
     mc = await engine.monte_carlo([{"pnl": 1.0}, {"pnl": -0.5}], iterations=100)
     assert isinstance(wf, list)
     assert "mean" in mc
+
+
+@pytest.mark.asyncio
+async def test_job_queue_limits_streaming_and_cancel():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from backtest_service.src.jobs import JobLimitExceeded, JobManager, JobStatus
+
+    class Gauge:
+        values = []
+
+        def set(self, v):
+            self.values.append(v)
+
+    manager = JobManager(max_running=1, max_per_user=2, gauge=Gauge())
+    engine = BacktestEngine()
+    idx = pd.date_range(end=datetime.utcnow(), periods=1500, freq="D")
+    data = pd.DataFrame({"open": 1.0, "high": 1.1, "low": 0.9, "close": 1.0}, index=idx)
+
+    def flip(df, **_):
+        return np.where(np.arange(len(df)) % 10 == 0, 1, np.where(np.arange(len(df)) % 10 == 5, 2, 0))
+
+    flip.vectorized = True
+
+    async def walk_forward(job):
+        res = await engine.run_walk_forward(flip, data, in_sample_years=1, optimization_iterations=1, executor_cls=ThreadPoolExecutor, on_segment=lambda i, n, r: job.publish(i, total=n))
+        return len(res)
+
+    release = asyncio.Event()
+
+    async def blocked(job):
+        await release.wait()
+
+    first = manager.submit("alice", "walk_forward", walk_forward)
+    second = manager.submit("alice", "blocked", blocked)
+    with pytest.raises(JobLimitExceeded):
+        manager.submit("alice", "blocked", blocked)
+    streamed = [i async for i in manager.stream(first.id)]
+    assert first.error is None, first.error
+    assert first.status == JobStatus.SUCCEEDED and sorted(streamed) == list(range(first.summary)) and first.progress == 1.0
+    await asyncio.sleep(0)
+    assert second.status == JobStatus.RUNNING and manager.running == 1
+    assert manager.cancel(second.id)
+    await manager.wait(second.id)
+    assert second.status == JobStatus.CANCELLED and manager.running == 0 and max(Gauge.values) == 1 and Gauge.values[-1] == 0
+    third = manager.submit("alice", "blocked", blocked)
+    manager.cancel(third.id)
+    assert (await manager.wait(third.id)).status == JobStatus.CANCELLED
+
+
+def _keys():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return private, public
+
+
+def _token(private, sub, typ="access", aud="mtrader"):
+    import time
+    from jose import jwt
+
+    now = int(time.time())
+    return {"Authorization": "Bearer " + jwt.encode({"sub": sub, "iss": "gateway", "aud": aud, "iat": now, "exp": now + 60, "jti": sub + typ, "typ": typ}, private, algorithm="RS256")}
+
+
+def test_results_are_only_served_to_their_owner(monkeypatch):
+    from fastapi.testclient import TestClient
+    import backtest_service.src.app as service
+
+    class Results:
+        rows = {"r1": "7"}
+
+        async def display(self, result_id, owner):
+            return {"id": result_id} if self.rows.get(result_id) == owner else None
+
+        async def equity(self, result_id, owner, start=None, end=None, points=2000):
+            return {"id": result_id, "equity": []} if self.rows.get(result_id) == owner else None
+
+    private, public = _keys()
+    monkeypatch.setattr(service, "JWT_PUBLIC_KEY", public)
+    monkeypatch.setattr(service, "JWT_ISSUER", "gateway")
+    monkeypatch.setattr(service, "JWT_AUDIENCE", "mtrader")
+    monkeypatch.setattr(service, "results", Results())
+    client = TestClient(service.app)
+    assert client.get("/results/r1", headers=_token(private, "7")).json() == {"id": "r1"}
+    assert client.get("/results/r1", headers=_token(private, "8")).status_code == 404
+    assert client.get("/results/r1/equity", headers=_token(private, "8")).status_code == 404
+
+
+def test_job_endpoints_take_the_user_from_a_verified_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    import backtest_service.src.app as service
+
+    private, public = _keys()
+    other, _ = _keys()
+    monkeypatch.setattr(service, "JWT_PUBLIC_KEY", public)
+    monkeypatch.setattr(service, "JWT_ISSUER", "gateway")
+    monkeypatch.setattr(service, "JWT_AUDIENCE", "mtrader")
+    client = TestClient(service.app)
+    # no token, a spoofed identity header, a foreign signature, a refresh token, the wrong audience
+    assert client.get("/jobs").status_code == 403
+    assert client.get("/jobs", headers={"X-User-Id": "7"}).status_code == 403
+    assert client.get("/jobs", headers=_token(other, "7")).status_code == 401
+    assert client.get("/jobs", headers=_token(private, "7", typ="refresh")).status_code == 401
+    assert client.get("/jobs", headers=_token(private, "7", aud="other")).status_code == 401
+    assert client.get("/jobs", headers=_token(private, "7")).json() == []
+    assert client.get("/results/r1").status_code == 403
@@ -0,0 +1,236 @@
+import asyncio
+import io
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from market_data_service.src import app as service
+from market_data_service.src.hub import TickHub
+from market_data_service.src.providers.base import MT5Provider, TickBatch, _EMPTY_RATES, _EMPTY_TICKS, _Stream
+from market_data_service.src.storage import MarketDataStore
+
+# 3 hours of ticks, one every 20 seconds from 2024-01-01 00:00 UTC
+TICKS = np.zeros(540, dtype=_EMPTY_TICKS.dtype)
+TICKS["time_msc"] = 1_704_067_200_000 + np.arange(540) * 20_000
+TICKS["time"] = TICKS["time_msc"] // 1000
+TICKS["bid"] = 1.1 + np.arange(540) * 1e-5
+TICKS["ask"] = TICKS["bid"] + 2e-5
+
+
+def ticks_range(symbol, lo, hi, flags):
+    # inclusive at both ends, like MetaTrader5.copy_ticks_range
+    t = TICKS["time_msc"]
+    lo_ms, hi_ms = (int(np.datetime64(x, "ms").astype(np.int64)) for x in (lo, hi))
+    return TICKS[(t >= lo_ms) & (t <= hi_ms)]
+
+
+def test_tick_formats_stream_every_row_once():
+    with patch("market_data_service.src.providers.base.mt5") as m, TestClient(service.app) as client:
+        m.copy_ticks_range.side_effect = ticks_range
+        params = {"start": "2024-01-01T00:00:00", "end": "2024-01-01T03:00:00"}
+        rows = client.get("/ticks/EURUSD", params=params).json()
+        assert len(rows) == 540 and rows[1] == {"symbol": "EURUSD", "provider": "mt5", "time": "2024-01-01T00:00:20.000", "bid": TICKS["bid"][1], "ask": TICKS["ask"][1], "volume": 0}
+        assert m.copy_ticks_range.call_count == 3
+        lines = client.get("/ticks/EURUSD", params=params, headers={"Accept": "application/x-ndjson"})
+        assert lines.headers["content-type"] == "application/x-ndjson" and [json.loads(l) for l in lines.text.splitlines()] == rows
+        cols = client.get("/ticks/EURUSD", params={**params, "format": "columnar"}).json()
+        assert cols["count"] == 540 and cols["columns"]["bid"] == TICKS["bid"].tolist()
+        assert client.get("/ticks/EURUSD", params=params, headers={"Accept": "text/csv"}).status_code == 406
+
+
+
+def test_msgpack_frames_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    with patch("market_data_service.src.providers.base.mt5") as m, TestClient(service.app) as client:
+        m.copy_ticks_range.side_effect = ticks_range
+        params = {"start": "2024-01-01T00:00:00", "end": "2024-01-01T03:00:00", "format": "msgpack"}
+        r = client.get("/ticks/EURUSD", params=params)
+        assert r.headers["content-type"] == "application/x-msgpack"
+        frames = list(msgpack.Unpacker(io.BytesIO(r.content)))
+        assert len(frames) == 3 and all(f["symbol"] == "EURUSD" and f["provider"] == "mt5" for f in frames)
+        assert sum((f["columns"]["bid"] for f in frames), []) == TICKS["bid"].tolist()
+        assert sum((f["columns"]["time"] for f in frames), []) == (TICKS["time_msc"] * 1_000_000).tolist()
+        m.copy_ticks_range.side_effect = lambda *a: None
+        (empty,) = msgpack.Unpacker(io.BytesIO(client.get("/ticks/EURUSD", params=params).content))
+        assert empty["columns"] == {"time": [], "bid": [], "ask": [], "volume": []}
+
+
+def test_arrow_stream_round_trips_and_types_empty_responses():
+    pa = pytest.importorskip("pyarrow")
+    with patch("market_data_service.src.providers.base.mt5") as m, TestClient(service.app) as client:
+        m.copy_ticks_range.side_effect = ticks_range
+        params = {"start": "2024-01-01T00:00:00", "end": "2024-01-01T03:00:00"}
+        r = client.get("/ticks/EURUSD", params=params, headers={"Accept": "application/vnd.apache.arrow.stream"})
+        table = pa.ipc.open_stream(r.content).read_all()
+        assert table.num_rows == 540 and table.schema.metadata[b"symbol"] == b"EURUSD"
+        assert table.column("bid").to_pylist() == TICKS["bid"].tolist()
+        assert table.column("time").type == pa.timestamp("ns") and table.column("time").to_numpy().astype(np.int64).tolist() == (TICKS["time_msc"] * 1_000_000).tolist()
+        m.copy_ticks_range.side_effect = lambda *a: None
+        empty = pa.ipc.open_stream(client.get("/ticks/EURUSD", params={**params, "format": "arrow"}).content).read_all()
+        assert empty.num_rows == 0 and empty.schema.names == ["time", "bid", "ask", "volume"] and empty.schema.field("volume").type == pa.uint64()
+
+def test_store_export_feeds_the_backtest_bar_files(tmp_path):
+    rates = np.zeros(48, dtype=_EMPTY_RATES.dtype)
+    rates["time"] = 1_704_067_200 + np.arange(48) * 3600
+    rates["close"] = 1.1 + np.arange(48) * 1e-4
+    rates["open"] = rates["high"] = rates["low"] = rates["close"]
+
+    def rates_range(symbol, tf, lo, hi):
+        t = rates["time"]
+        return rates[(t >= int(lo.timestamp())) & (t <= int(hi.timestamp()))]
+
+    with patch("market_data_service.src.providers.base.mt5") as m, patch.object(service, "store", MarketDataStore(tmp_path)), TestClient(service.app) as client:
+        m.copy_rates_range.side_effect = rates_range
+        body = client.post("/store/EURUSD/H1", params={"start": "2024-01-01T00:00:00", "end": "2024-01-03T00:00:00"}).json()
+        assert body == {"symbol": "EURUSD", "timeframe": "H1", "written": 48, "bars": 48}
+        assert client.post("/store/EURUSD/H1", params={"start": "2024-01-01T12:00:00", "end": "2024-01-02T00:00:00"}).json()["bars"] == 48
+    bars = MarketDataStore(tmp_path).load("EURUSD", "H1")
+    assert len(bars) == 48 and bars["close"].tolist() == rates["close"].tolist()
+
+
+class FakeProvider:
+    def __init__(self):
+        self.calls = []
+        self.callbacks = {}
+
+    async def subscribe_ticks(self, symbols, callback, batch=False):
+        self.calls.append(("subscribe", tuple(symbols)))
+        self.callbacks.update({s: callback for s in symbols})
+        return {s: True for s in symbols}
+
+    async def unsubscribe_ticks(self, symbols):
+        self.calls.append(("unsubscribe", tuple(symbols)))
+        for s in symbols:
+            self.callbacks.pop(s, None)
+
+
+def ticks(symbol, bids):
+    data = np.zeros(len(bids), dtype=_EMPTY_TICKS.dtype)
+    data["time_msc"] = 1_704_067_200_000 + np.arange(len(bids))
+    data["bid"] = data["ask"] = bids
+    return TickBatch(symbol, "mt5", data)
+
+
+@pytest.mark.asyncio
+async def test_tick_hub_fans_out_one_upstream_per_symbol():
+    upstream = FakeProvider()
+    hub = TickHub(upstream, queue_size=4)
+    symbols = [f"SYM{i}" for i in range(30)]
+    clients = [hub.connect() for _ in range(1000)]
+    for i, c in enumerate(clients):
+        await hub.subscribe(c, symbols[i % 3 :: 3])
+    assert len(upstream.calls) == 30 and hub.stats()["subscribers"] == 1000
+    await upstream.callbacks["SYM0"](ticks("SYM0", [1.1]))
+    payloads = [c.queue.get_nowait() for c in clients[::3]]
+    assert all(p is payloads[0] for p in payloads) and json.loads(payloads[0])["bid"] == 1.1
+    assert all(c.queue.empty() for c in clients[1::3])
+    await upstream.callbacks["SYM1"](ticks("SYM1", np.arange(6.0)))
+    assert clients[1].queue.qsize() == 4 and clients[1].dropped == 2 and json.loads(clients[1].queue.get_nowait())["bid"] == 2.0
+    for c in clients[:-3]:
+        await hub.disconnect(c)
+    assert len(upstream.calls) == 30
+    await hub.disconnect(clients[-3])
+    assert {call[1][0] for call in upstream.calls[30:]} == set(symbols[1::3]) and len(hub.stats()["symbols"]) == 20
+    sunk = []
+
+    async def failing(batch):
+        raise RuntimeError("database down")
+
+    async def sink(batch):
+        sunk.append(len(batch))
+
+    await hub.attach(["SYM0"], failing)
+    await hub.attach(["SYM0"], sink)
+    await upstream.callbacks["SYM0"](ticks("SYM0", [1.2, 1.3]))
+    assert sunk == [2] and hub.stats()["sinks"] == {"SYM0": 2}
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_from_last_tick_without_gaps_or_repeats():
+    # ticks land between polls, several share a millisecond, and copy_ticks_from resolves to whole seconds
+    stamps = np.array([0, 10, 10, 10, 400, 999, 1000, 1000, 1500, 2001, 2001, 2001]) + 1_704_067_200_000
+    store = np.zeros(len(stamps), dtype=_EMPTY_TICKS.dtype)
+    store["time_msc"], store["bid"] = stamps, np.arange(len(stamps))
+    visible = [0]
+
+    def copy_ticks_from(symbol, start, count, flags):
+        shown = store[: visible[0]]
+        return shown[shown["time_msc"] >= int(np.datetime64(start, "ms").astype(np.int64))][:count]
+
+    p = MT5Provider(account=0, password="", server="", poll_batch=3)
+    with patch("market_data_service.src.providers.base.mt5") as m:
+        m.copy_ticks_from.side_effect = copy_ticks_from
+        m.symbol_info_tick.return_value = None
+        p._streams["EURUSD"] = _Stream(None, True, int(stamps[0]))
+        delivered = []
+        for shown in (2, 3, 6, 8, 8, 10, 12, 12, 12, 12):
+            visible[0] = shown
+            delivered += [b["bid"] for b in (await p._poll()).values()]
+    assert np.concatenate(delivered).tolist() == list(range(len(stamps)))
+
+
+
+@pytest.mark.asyncio
+async def test_terminal_calls_never_overlap():
+    import threading
+    import time
+
+    active, threads, overlaps = [0], set(), []
+
+    def call(*args, **kwargs):
+        active[0] += 1
+        overlaps.append(active[0])
+        threads.add(threading.current_thread().name)
+        time.sleep(0.002)
+        active[0] -= 1
+        return None
+
+    p = MT5Provider(account=0, password="", server="")
+    with patch("market_data_service.src.providers.base.mt5") as m:
+        for name in ("copy_ticks_from", "copy_ticks_range", "copy_rates_range", "symbol_info", "symbol_info_tick", "symbol_select"):
+            getattr(m, name).side_effect = call
+        p._streams.update({s: _Stream(None, True, 1_704_067_200_000) for s in ("A", "B", "C")})
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 1, 1)
+        await asyncio.gather(*(p._poll() for _ in range(5)), *(p.get_ticks_array("A", start, end) for _ in range(5)), p.get_ohlcv_array("A", "H1", start, end), p.get_instrument_info("A"), p.subscribe_ticks(["D"], lambda t: None))
+        await p.unsubscribe_ticks(["A", "B", "C", "D"])
+    assert max(overlaps) == 1 and len(threads) == 1 and threads.pop().startswith("mt5")
+
+@pytest.mark.asyncio
+async def test_poller_survives_failures_and_skips_the_pre_subscription_tick():
+    store = np.zeros(3, dtype=_EMPTY_TICKS.dtype)
+    store["time_msc"], store["bid"] = np.array([0, 10, 20]) + 1_704_067_200_000, [1.0, 2.0, 3.0]
+    reads = []
+
+    def copy_ticks_from(symbol, start, count, flags):
+        reads.append(symbol)
+        if len(reads) == 1:
+            raise RuntimeError("terminal busy")
+        return store
+
+    def broken(batch):
+        raise ValueError("sink down")
+
+    got = []
+
+    async def collect(batch):
+        got.extend(batch.data["bid"].tolist())
+
+    p = MT5Provider(account=0, password="", server="", min_poll_interval=0.001, max_poll_interval=0.01)
+    p.poll_interval = 0.001
+    with patch("market_data_service.src.providers.base.mt5") as m:
+        m.copy_ticks_from.side_effect = copy_ticks_from
+        m.symbol_info_tick.return_value = SimpleNamespace(time_msc=int(store["time_msc"][0]))
+        await p.subscribe_ticks(["GBPUSD"], broken, batch=True)
+        await p.subscribe_ticks(["EURUSD"], collect, batch=True)
+        for _ in range(100):
+            if got:
+                break
+            await asyncio.sleep(0.01)
+        assert not p._poller.done()
+        await p.unsubscribe_ticks(["GBPUSD", "EURUSD"])
+    assert got == [2.0, 3.0]
@@ -1,6 +1,9 @@
+import numpy as np
+import pandas as pd
 import pytest
 
 from ml_service.src.registry.manager import ModelRegistry
+from ml_service.src.validation import cross_validate, purged_kfold
 
 
 @pytest.mark.asyncio
@@ -19,3 +22,14 @@ async def test_model_training_and_promotion():
     assert model.id
     ok = await r.promote_to_production(model.id, approved_by="tester")
     assert ok
+
+
+def test_purged_cross_validation_folds():
+    idx = pd.date_range("2024-01-01", periods=100, freq="H")
+    data = pd.DataFrame({"x": np.arange(100.0)}, index=idx)
+    folds = list(purged_kfold(idx, n_splits=4, purge=pd.Timedelta(hours=3), embargo=2))
+    assert [len(test) for _, test in folds] == [25, 25, 25, 25]
+    train, test = folds[1]
+    assert 21 in train and 22 not in train and 51 not in train and 52 in train and len(train) == 100 - 25 - 3 - 2
+    report = cross_validate(lambda tr, te: te["x"].mean() - tr["x"].mean(), data, n_splits=4, purge=3, embargo=2)
+    assert len(report["scores"]) == 4 and report["scores"][0] < 0 < report["scores"][-1]
@@ -0,0 +1,30 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from market_data_service.src.providers.base import MT5Provider, Tick, _EMPTY_RATES, _EMPTY_TICKS
+
+
+@pytest.mark.asyncio
+async def test_array_variants_are_views_with_vectorized_times():
+    ticks = np.zeros(3, dtype=_EMPTY_TICKS.dtype)
+    ticks["time_msc"] = [1_700_000_000_000, 1_700_000_000_250, 1_700_000_001_500]
+    ticks["time"] = ticks["time_msc"] // 1000
+    ticks["bid"], ticks["ask"], ticks["volume"] = [1.1, 1.2, 1.3], [1.15, 1.25, 1.35], [1, 2, 3]
+    rates = np.zeros(2, dtype=_EMPTY_RATES.dtype)
+    rates["time"], rates["close"], rates["real_volume"] = [1_700_000_000, 1_700_000_060], [1.5, 1.6], [10, 20]
+    p = MT5Provider(account=0, password="", server="")
+    with patch("market_data_service.src.providers.base.mt5") as m:
+        m.copy_ticks_range.return_value = ticks
+        m.copy_rates_range.return_value = rates
+        batch = await p.get_ticks_array("EURUSD", datetime(2023, 11, 14), datetime(2023, 11, 15))
+        assert batch.data is ticks and np.shares_memory(batch.columns()["bid"], ticks)
+        assert str(batch.times[1]) == "2023-11-14T22:13:20.250000000"
+        rows = await p.get_ticks("EURUSD", datetime(2023, 11, 14), datetime(2023, 11, 15))
+        assert rows[2] == Tick("EURUSD", 1.3, 1.35, datetime(2023, 11, 14, 22, 13, 21, 500000), 3, "mt5")
+        frame = (await p.get_ohlcv_array("EURUSD", "M1", datetime(2023, 11, 14), datetime(2023, 11, 15))).to_frame()
+        assert list(frame["close"]) == [1.5, 1.6] and frame.index[1] == datetime(2023, 11, 14, 22, 14, 20)
+        m.copy_ticks_range.return_value = None
+        assert len(await p.get_ticks_array("EURUSD", datetime(2023, 11, 14), datetime(2023, 11, 15))) == 0
@@ -0,0 +1,98 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from market_data_service.src.providers.base import TickBatch, _EMPTY_TICKS
+from market_data_service.src.storage.ingest import TickIngestor
+from market_data_service.src.storage.timescale import PGCOPY_SIGNATURE
+
+ROW_BYTES = 2 + 4 + 8 + 4 + 6 + 4 + 8 + 4 + 8 + 4 + 8 + 4 + 3
+
+
+class FakePool:
+    def __init__(self):
+        self.copies = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    def acquire(self):
+        pool = self
+
+        class Conn:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def copy_to_table(self, table, source, columns, format):
+                await pool.gate.wait()
+                data = bytes(source)
+                assert table == "ticks" and format == "binary" and data.startswith(PGCOPY_SIGNATURE)
+                pool.copies.append((len(data) - 21) // ROW_BYTES)
+
+        return Conn()
+
+
+class Gauge:
+    value = None
+
+    def set(self, value):
+        self.value = value
+
+
+def ticks(msc, bids, symbol="EURUSD"):
+    data = np.zeros(len(bids), dtype=_EMPTY_TICKS.dtype)
+    data["time_msc"] = 1_704_067_200_000 + np.asarray(msc)
+    data["bid"] = bids
+    data["ask"] = np.asarray(bids) + 1e-4
+    return TickBatch(symbol, "mt5", data)
+
+
+@pytest.mark.asyncio
+async def test_ingestor_dedupes_and_flushes_on_size_and_time():
+    pool, depth = FakePool(), Gauge()
+    ing = TickIngestor(pool, max_rows=4, max_delay=0.05, queue_depth=depth)
+    # a repeated tick inside the batch and a re-delivery of the newest written instant are dropped
+    await ing.submit(ticks([0, 1, 1, 1], [1.0, 1.1, 1.2, 1.1]))
+    assert depth.value == 4
+    await ing.flush()
+    assert pool.copies == [3] and ing.pending == 0 and depth.value == 0
+    await ing.submit(ticks([1, 1, 2], [1.2, 1.3, 1.4]))
+    await ing.flush()
+    assert pool.copies == [3] and ing.stats()["buffers"]["EURUSD:mt5"] == 3
+    await ing.start()
+    await asyncio.sleep(0.15)
+    assert pool.copies == [3, 2] and ing.written == 5 and ing.duplicates == 2
+    await ing.stop()
+
+
+@pytest.mark.asyncio
+async def test_ingestor_blocks_producers_while_the_database_lags():
+    pool = FakePool()
+    ing = TickIngestor(pool, max_rows=2, max_delay=10, max_pending=4)
+    await ing.start()
+    pool.gate.clear()
+    await ing.submit(ticks([0, 1], [1.0, 1.1]))
+    await ing.submit(ticks([2, 3], [1.0, 1.1], symbol="GBPUSD"))
+    blocked = asyncio.create_task(ing.submit(ticks([4, 5], [1.0, 1.1])))
+    await asyncio.sleep(0.05)
+    assert not blocked.done() and ing.pending == 4 and pool.copies == []
+    pool.gate.set()
+    await asyncio.wait_for(blocked, 1)
+    await ing.stop()
+    assert sorted(pool.copies) == [2, 2, 2] and ing.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_ingestor_stop_logs_rows_it_could_not_write(caplog):
+    class DownPool:
+        def acquire(self):
+            raise OSError("connection refused")
+
+    ing = TickIngestor(DownPool(), max_delay=10)
+    await ing.start()
+    await ing.submit(ticks([0, 1, 2], [1.0, 1.1, 1.2]))
+    await ing.stop()
+    assert ing.pending == 3 and "3 buffered ticks unwritten" in caplog.text
@@ -0,0 +1,78 @@
+import struct
+
+import numpy as np
+import pytest
+
+from market_data_service.src.storage.timescale import OHLCV_COLUMNS, PGCOPY_SIGNATURE, TICK_TABLE_COLUMNS, decode_copy, encode_copy
+
+PG_EPOCH_US = 946_684_800_000_000
+
+
+def copy_stream(rows, lengths=None):
+    out = PGCOPY_SIGNATURE + struct.pack(">ii", 0, 0)
+    for i, (ts_us, o, h, l, c, v) in enumerate(rows):
+        out += struct.pack(">h", 6)
+        for j, (fmt, value) in enumerate(zip("qddddq", (ts_us - PG_EPOCH_US, o, h, l, c, v))):
+            out += struct.pack(">i", 8 if lengths is None else lengths[i][j]) + struct.pack(">" + fmt, value)
+    return out + struct.pack(">h", -1)
+
+
+def test_decode_binary_copy_ohlcv():
+    rows = [(1_700_000_000_000_000, 1.1, 1.2, 1.0, 1.15, 10), (1_700_000_060_000_000, 1.15, 1.3, 1.1, 1.25, 7)]
+    out = decode_copy(bytearray(copy_stream(rows)), OHLCV_COLUMNS)
+    assert list(out["time"]) == [np.datetime64(1_700_000_000_000_000, "us"), np.datetime64(1_700_000_060_000_000, "us")]
+    assert out["close"].dtype == np.float64 and out["close"].tolist() == [1.15, 1.25] and out["volume"].tolist() == [10, 7]
+    assert decode_copy(copy_stream([]), OHLCV_COLUMNS)["open"].size == 0
+    with pytest.raises(ValueError):
+        decode_copy(copy_stream(rows)[:-2], OHLCV_COLUMNS)
+    with pytest.raises(ValueError):
+        decode_copy(copy_stream(rows, lengths=[[8] * 6, [8, 8, -1, 8, 8, 8]]), OHLCV_COLUMNS)
+
+
+def test_encode_binary_copy_ticks_matches_row_by_row_packing():
+    times = np.array([1_700_000_000_000_000, 1_700_000_000_250_000], dtype="M8[us]").astype("M8[ns]")
+    out = encode_copy(TICK_TABLE_COLUMNS, {"time": times, "bid": np.array([1.1, 1.2]), "ask": np.array([1.2, 1.3]), "volume": np.array([3, 0])}, {"symbol": "EURUSD", "provider": "mt5"})
+    expected = PGCOPY_SIGNATURE + struct.pack(">ii", 0, 0)
+    for ts_us, bid, ask, volume in [(1_700_000_000_000_000, 1.1, 1.2, 3), (1_700_000_000_250_000, 1.2, 1.3, 0)]:
+        expected += struct.pack(">hiqi6sidid", 6, 8, ts_us - PG_EPOCH_US, 6, b"EURUSD", 8, bid, 8, ask) + struct.pack(">iqi3s", 8, volume, 3, b"mt5")
+    assert out == expected + struct.pack(">h", -1)
+
+
+@pytest.mark.asyncio
+async def test_loader_bounds_each_copy_and_every_chunk_handed_to_the_engine():
+    import asyncio
+    from contextlib import asynccontextmanager
+    from datetime import datetime, timedelta, timezone
+
+    from backtest_service.src.engine.ticks import aiter_chunks
+    from market_data_service.src.storage.timescale import TICK_COLUMNS, TimescaleLoader
+
+    # two 7-day hypertable chunks of one tick every 10 seconds
+    start = datetime(2024, 1, 1)
+    times = np.arange(np.datetime64(start, "ns"), np.datetime64(start + timedelta(days=14), "ns"), np.timedelta64(10, "s"))
+    bids = np.arange(len(times), dtype=float)
+    copies, in_flight = [], [0, 0]
+
+    class Conn:
+        async def fetch(self, sql, table, lo, hi):
+            utc = start.replace(tzinfo=timezone.utc)
+            return [{"range_start": utc + timedelta(days=7 * i), "range_end": utc + timedelta(days=7 * (i + 1))} for i in range(2)]
+
+        async def copy_from_query(self, sql, symbol, lo, hi, output, format):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await asyncio.sleep(0)
+            keep = (times >= np.datetime64(lo.replace(tzinfo=None), "ns")) & (times < np.datetime64(hi.replace(tzinfo=None), "ns"))
+            copies.append(int(keep.sum()))
+            await output(encode_copy(TICK_COLUMNS, {"time": times[keep], "bid": bids[keep], "ask": bids[keep] + 1, "volume": np.zeros(keep.sum(), dtype=np.int64)}))
+            in_flight[0] -= 1
+
+    class Pool:
+        @asynccontextmanager
+        async def acquire(self):
+            yield Conn()
+
+    loader = TimescaleLoader(Pool(), concurrency=3, tick_span=timedelta(hours=6))
+    chunks = [c async for c in aiter_chunks(loader.iter_ticks("EURUSD", start, start + timedelta(days=14)), 1000)]
+    assert len(copies) == 56 and max(copies) == 6 * 360 and in_flight[1] <= 3
+    assert max(len(c) for c in chunks) == 1000 and np.concatenate([c["bid"].to_numpy() for c in chunks]).tolist() == bids.tolist()